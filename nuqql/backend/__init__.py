@@ -5,6 +5,8 @@ Nuqql backend code
 from .backend import Backend
 from .nuqqlbackend import NuqqlBackend
 from .helpers import start_backends, update_buddies, handle_network, \
-    stop_backends
+    supervise_backends, stop_backends
 from .server import BackendServer
+from .outputpump import OUTPUT_PUMP
+from .supervisor import BACKEND_SUPERVISOR
 from .client import BackendClient
@@ -7,7 +7,7 @@ import socket
 import time
 
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import nuqql.config
 import nuqql.conversation
@@ -16,6 +16,7 @@ import nuqql.ui
 from nuqql.account import Account
 from .server import BackendServer
 from .client import BackendClient
+from .supervisor import BACKEND_SUPERVISOR
 from .parse import parse_msg
 
 logger = logging.getLogger(__name__)
@@ -54,6 +55,7 @@ class Backend:
                      self.name, cmd, path)
         self.server = BackendServer(cmd, path)
         self.server.start()
+        BACKEND_SUPERVISOR.add(self)
 
     def stop_server(self) -> None:
         """
@@ -64,6 +66,23 @@ class Backend:
         if self.server:
             self.server.stop()
 
+    def terminate_server(self) -> None:
+        """
+        Tell the server of this backend to stop without waiting for it
+        """
+
+        if self.server:
+            self.server.terminate()
+
+    def get_server_output(self) -> List[str]:
+        """
+        Get the last output lines of the server of this backend
+        """
+
+        if not self.server:
+            return []
+        return self.server.get_output()
+
     def start_client(self) -> None:
         """
         Start the backend's client
@@ -383,9 +402,10 @@ class Backend:
         except FileNotFoundError:
             return ""
 
-    def stop(self) -> None:
+    def stop(self, intentional: bool = True) -> None:
         """
-        Stop the backend, Note: changes BACKENDS
+        Stop the backend, intentional is False if it is stopped because of an
+        error and may be restarted, Note: changes BACKENDS
         """
 
         logger.debug("stopping backend %s", self.name)
@@ -394,6 +414,10 @@ class Backend:
         log_msg = f"Stopping client and server for backend \"{self.name}\"."
         nuqql.conversation.log_nuqql_conv(log_msg)
 
+        # stop supervising the server, so it does not get restarted unless it
+        # crashed
+        BACKEND_SUPERVISOR.remove(self, intentional)
+
         # stop client and server
         self.stop_client()
         self.stop_server()
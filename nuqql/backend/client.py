@@ -48,6 +48,12 @@ class BackendClient:
         self.port = port
         self.buffer = ""
 
+        # messages and bytes read from and sent to the server
+        self.msgs_read = 0
+        self.bytes_read = 0
+        self.msgs_sent = 0
+        self.bytes_sent = 0
+
     def _connect(self) -> None:
         """
         Helper for connecting to the server
@@ -106,14 +112,14 @@ class BackendClient:
             nuqql.conversation.log_nuqql_conv(BACKEND_ERROR)
             logger.error("read error (select)")
             if self.backend:
-                self.backend.stop()
+                self.backend.stop(intentional=False)
             return None
 
         if self.sock in errs:
             # something is wrong
             logger.error("read error (socket)")
             if self.backend:
-                self.backend.stop()
+                self.backend.stop(intentional=False)
             return None
 
         if self.sock in reads:
@@ -124,8 +130,9 @@ class BackendClient:
                 nuqql.conversation.log_nuqql_conv(BACKEND_ERROR)
                 logger.error("read error (recv)")
                 if self.backend:
-                    self.backend.stop()
+                    self.backend.stop(intentional=False)
                 return None
+            self.bytes_read += len(data)
             self.buffer += data.decode()
 
         # get next message from buffer and return it
@@ -138,6 +145,7 @@ class BackendClient:
         msg = self.buffer[:eom]
         # remove message including "\r\n" from buffer
         self.buffer = self.buffer[eom + 2:]
+        self.msgs_read += 1
 
         logger.debug("read message: %s", msg)
         return msg
@@ -151,13 +159,16 @@ class BackendClient:
             return
 
         try:
-            self.sock.sendall(msg.encode())
+            data = msg.encode()
+            self.sock.sendall(data)
+            self.msgs_sent += 1
+            self.bytes_sent += len(data)
             logger.debug("sent message: %s", msg)
         except OSError:
             nuqql.conversation.log_nuqql_conv(BACKEND_ERROR)
             logger.error("send error")
             if self.backend:
-                self.backend.stop()
+                self.backend.stop(intentional=False)
             return
 
     def send_command(self, cmd: str) -> None:
@@ -3,11 +3,10 @@ Backend helpers
 """
 
 import logging
-import shutil
 import os
 import time
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 
 import nuqql.config
 import nuqql.conversation
@@ -15,6 +14,8 @@ from nuqql import VERSION
 
 from .backend import Backend
 from .nuqqlbackend import NuqqlBackend
+from .outputpump import OUTPUT_PUMP
+from .supervisor import BACKEND_SUPERVISOR
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +34,10 @@ BACKEND_BLACKLIST = ["nuqql-keys", "nuqql-based"]
 # dictionary for all active backends
 BACKENDS: Dict[str, "Backend"] = {}
 
+# executable backend files found in directories, cached until the mtime of
+# the directory changes: directory -> (mtime, backend filename -> path)
+BACKEND_FILES: Dict[str, Tuple[int, Dict[str, str]]] = {}
+
 
 def update_buddies() -> None:
     """
@@ -52,6 +57,14 @@ def handle_network() -> None:
         backend.handle_network()
 
 
+def supervise_backends() -> None:
+    """
+    Helper for restarting crashed backends
+    """
+
+    BACKEND_SUPERVISOR.check(restart_backend)
+
+
 def start_backend(backend_name: str, backend_exe: str, backend_path: str,
                   backend_cmd_fmt: str,
                   backend_sockfile: str) -> Optional[Backend]:
@@ -63,10 +76,8 @@ def start_backend(backend_name: str, backend_exe: str, backend_path: str,
                  "sockfile %s", backend_name, backend_exe, backend_path,
                  backend_cmd_fmt, backend_sockfile)
 
-    # check if backend exists in path
-    exe = shutil.which(backend_exe, path=os.getcwd())
-    if exe is None:
-        exe = shutil.which(backend_exe)
+    # check if backend exists in current directory or path
+    exe = _find_backend_exe(backend_exe)
     if exe is None:
         # does not exist, stop here
         return None
@@ -142,23 +153,65 @@ def _get_backend_name(filename: str) -> str:
     return filename[6:]
 
 
+def _get_backend_files(path_dir: str) -> Dict[str, str]:
+    """
+    Get executable backend files in directory path_dir. The directory is
+    only scanned again if its mtime changed.
+    """
+
+    try:
+        mtime = os.stat(path_dir).st_mtime_ns
+    except OSError:
+        # PATH may contain directories that do not exist, skip them
+        BACKEND_FILES.pop(path_dir, None)
+        return {}
+
+    cached = BACKEND_FILES.get(path_dir)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    logger.debug("scanning directory %s for backends", path_dir)
+    files: Dict[str, str] = {}
+    try:
+        with os.scandir(path_dir) as path:
+            for entry in path:
+                if _is_backend_filename(entry.name) and \
+                   entry.is_file() and \
+                   os.access(entry.path, os.X_OK):
+                    files[entry.name] = entry.path
+    except OSError as error:
+        logger.debug("cannot scan directory %s: %s", path_dir, error)
+        return {}
+    BACKEND_FILES[path_dir] = (mtime, files)
+    return files
+
+
+def _find_backend_exe(filename: str) -> Optional[str]:
+    """
+    Find path of executable backend file filename in the current directory
+    or in PATH
+    """
+
+    for path_dir in [os.getcwd()] + os.get_exec_path():
+        exe = _get_backend_files(path_dir).get(filename)
+        if exe:
+            return exe
+    return None
+
+
 def get_backends_from_path() -> List[str]:
     """
     Get a list of backends found in PATH.
     """
 
     backends: List[str] = []
+    found: Set[str] = set()
     for path_dir in os.get_exec_path():
-        if not os.path.isdir(path_dir):
-            # PATH may contain directories that do not exist, skip them
-            continue
-        with os.scandir(path_dir) as path:
-            for entry in path:
-                if entry.is_file() and \
-                   _is_backend_filename(entry.name) and \
-                   entry.name not in BACKEND_BLACKLIST and \
-                   entry.name not in backends:
-                    backends.append(entry.name)
+        for filename in _get_backend_files(path_dir):
+            if filename not in found and \
+               filename not in BACKEND_BLACKLIST:
+                found.add(filename)
+                backends.append(filename)
     return backends
 
 
@@ -194,7 +247,7 @@ def start_backend_client(backend: Backend) -> None:
         log_msg = f"Could not connect to backend \"{backend.name}\"."
         logger.error("could not connect to backend %s", backend.name)
         nuqql.conversation.log_nuqql_conv(log_msg)
-        backend.stop()
+        backend.stop(intentional=False)
         return
 
     # request accounts from backend
@@ -228,6 +281,9 @@ def restart_backend(backend_name: str) -> None:
 
     logger.debug("restarting backend %s", backend_name)
 
+    # backend is (re)started now, drop pending restart
+    BACKEND_SUPERVISOR.cancel(backend_name)
+
     if backend_name in BACKENDS:
         # backend already running
         return
@@ -294,5 +350,17 @@ def stop_backends() -> None:
     """
 
     logger.debug("stopping all backends")
-    for backend in dict(BACKENDS).values():
+
+    # tell all servers to stop first, so they exit at the same time and
+    # stopping the backends only waits for the slowest server
+    backends = list(BACKENDS.values())
+    for backend in backends:
+        backend.terminate_server()
+    for backend in backends:
         backend.stop()  # changes BACKENDS
+
+    # stop supervising backends, drop pending restarts
+    BACKEND_SUPERVISOR.close()
+
+    # stop reading output of the backends' server processes
+    OUTPUT_PUMP.stop()
@@ -2,17 +2,66 @@
 Dummy Nuqql Backend
 """
 
+import datetime
+import functools
 import logging
+import time
 
 from pathlib import Path
-from typing import Callable, List
+from typing import Callable, Dict, List, NamedTuple, Tuple, TYPE_CHECKING
 
 import nuqql.config
+import nuqql.conversation
 from .backend import Backend
+from .supervisor import BACKEND_SUPERVISOR
+
+if TYPE_CHECKING:   # imports for typing
+    # pylint: disable=cyclic-import
+    from nuqql.conversation import Conversation  # noqa
+    from nuqql.conversation.historyindex import SearchResult  # noqa
 
 logger = logging.getLogger(__name__)
 
 
+class TopSample(NamedTuple):
+    """
+    Sample of a backend's resource usage and client counters for the top
+    command
+    """
+
+    tstamp: float
+    pid: int
+    cpu_time: float = 0.0
+    msgs_read: int = 0
+    bytes_read: int = 0
+    msgs_sent: int = 0
+    bytes_sent: int = 0
+
+
+def _format_size(size: float) -> str:
+    """
+    Format size in bytes for the top command
+    """
+
+    if size < 1024:
+        return f"{size:.0f} B"
+    for unit in ("KiB", "MiB"):
+        size /= 1024
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+    size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def _search_history(terms: List[str]) -> List["SearchResult"]:
+    """
+    Search history of all conversations for terms, runs in the history thread
+    """
+
+    nuqql.conversation.HISTORY_WRITER.sync()
+    return nuqql.conversation.HISTORY_INDEX.search(terms)
+
+
 class NuqqlBackend(Backend):
     """
     Class for the nuqql dummy backend
@@ -25,6 +74,12 @@ class NuqqlBackend(Backend):
         # function for (re)starting backends
         self.restart_func: Callable[[str], None]
 
+        # results of last history search
+        self.search_results: List["SearchResult"] = []
+
+        # samples of the backends for the last top command
+        self.top_samples: Dict[str, TopSample] = {}
+
     def _handle_nuqql_global_status(self, parts: List[str]) -> None:
         """
         Handle nuqql command: global-status
@@ -114,6 +169,7 @@ class NuqqlBackend(Backend):
 
         backend_name = parts[0]
         logger.debug("stopping backend %s", backend_name)
+        BACKEND_SUPERVISOR.cancel(backend_name)
         if backend_name in self.backends:
             self.backends[backend_name].stop()
 
@@ -164,6 +220,188 @@ class NuqqlBackend(Backend):
         if self.conversation:
             self.conversation.log("nuqql", msg)
 
+    def _handle_search(self, parts: List[str]) -> None:
+        """
+        Handle search command, search history of all conversations
+        """
+
+        if not parts:
+            return
+
+        # search in the history thread and show results in the main loop
+        logger.debug("searching history for %s", parts)
+        terms = " ".join(parts)
+        if self.conversation:
+            self.conversation.log("nuqql", (f"search: searching for "
+                                            f"\"{terms}\"..."))
+        nuqql.conversation.HISTORY_WORKER.submit(
+            _search_history, parts,
+            callback=functools.partial(self._show_search_results, terms))
+
+    def _show_search_results(self, terms: str,
+                             results: List["SearchResult"]) -> None:
+        """
+        Show results of search for terms in the nuqql conversation
+        """
+
+        self.search_results = results
+        if not self.conversation:
+            return
+
+        # log results
+        self.conversation.log("nuqql", (f"search: {len(self.search_results)} "
+                                        f"results for \"{terms}\""))
+        for num, result in enumerate(self.search_results, start=1):
+            tstamp = datetime.datetime.fromtimestamp(result.tstamp)
+            tstamp_str = tstamp.strftime("%Y-%m-%d %H:%M:%S")
+            self.conversation.log("nuqql", (f"[{num}] {result.backend} "
+                                            f"{result.account} {result.name} "
+                                            f"{tstamp_str} {result.sender}: "
+                                            f"{result.snippet}"))
+        if self.search_results:
+            self.conversation.log("nuqql", ("search: enter \"search-jump "
+                                            "<number>\" to jump to a result"))
+
+    def _handle_search_jump(self, parts: List[str]) -> None:
+        """
+        Handle search-jump command, jump to a result of the last search
+        """
+
+        if not parts or not self.conversation:
+            return
+
+        try:
+            result = self.search_results[int(parts[0]) - 1]
+        except (ValueError, IndexError):
+            self.conversation.log("nuqql", "search-jump: invalid result")
+            return
+
+        # find conversation of the search result
+        logger.debug("jumping to search result %s", result)
+        for conv in nuqql.conversation.CONVERSATIONS:
+            if not isinstance(conv, nuqql.conversation.BuddyConversation):
+                continue
+            assert conv.backend and conv.account
+            if conv.backend.name == result.backend and \
+               conv.account.aid == result.account and \
+               conv.name == result.name:
+                break
+        else:
+            self.conversation.log("nuqql", (f"search-jump: conversation "
+                                            f"{result.name} not found"))
+            return
+
+        # leave nuqql conversation and switch to the history of the other
+        # conversation
+        self.conversation.wins.input_win.go_back()
+        conv.wins.list_win.jump_to_conv(conv)
+        conv.activate_log()
+
+        # show message when the history is loaded into the conversation's
+        # log: history jobs run in order, so an empty job finishes after the
+        # history was read. Its result -1 searches the whole log.
+        nuqql.conversation.HISTORY_WORKER.submit(
+            lambda: -1, callback=functools.partial(self._show_search_result,
+                                                   conv, result))
+
+    def _show_search_result(self, conv: "Conversation",
+                            result: "SearchResult", end: int) -> None:
+        """
+        Show message of search result in the log of conversation conv, search
+        the first end log entries or the whole log if end is -1, and load
+        older messages if necessary
+        """
+
+        if end == -1:
+            end = len(conv.history.log)
+        for index in range(end - 1, -1, -1):
+            log_msg = conv.history.log[index]
+            if log_msg.msg == result.msg and \
+               log_msg.epoch == result.tstamp:
+                conv.wins.log_win.show_msg(index)
+                return
+
+        # message not in the log, load older messages. If there are none, the
+        # history changed since it was indexed, e.g., it was replaced
+        if end and conv.wins.log_win.load_older(
+                functools.partial(self._show_search_result, conv, result),
+                result.tstamp):
+            return
+        logger.debug("search result %s not found", result)
+        if self.conversation:
+            self.conversation.log("nuqql", "search-jump: message not found")
+
+    def _get_top_lines(self, backend: Backend,
+                       now: float) -> Tuple[float, List[str]]:
+        """
+        Sample resource usage and client counters of backend for the top
+        command. Return cpu usage since the last sample and the output lines
+        """
+
+        assert backend.server and backend.server.proc
+        name = backend.name
+        restarts = BACKEND_SUPERVISOR.get_restarts(name)
+        stat = backend.server.get_stat()
+        if stat is None:
+            return -1, [f"top: {name}: no process statistics, {restarts} "
+                        f"restarts"]
+
+        # rates since the last sample or the start of the backend
+        sample = TopSample(now, backend.server.proc.pid, stat.cpu_time)
+        if backend.client:
+            sample = sample._replace(msgs_read=backend.client.msgs_read,
+                                     bytes_read=backend.client.bytes_read,
+                                     msgs_sent=backend.client.msgs_sent,
+                                     bytes_sent=backend.client.bytes_sent)
+        last = self.top_samples.get(name)
+        if not last or last.pid != sample.pid:
+            last = TopSample(backend.server.start_time, sample.pid)
+        self.top_samples[name] = sample
+        elapsed = max(now - last.tstamp, 0.001)
+        cpu = (sample.cpu_time - last.cpu_time) / elapsed * 100
+
+        def rate(count: int, last_count: int) -> float:
+            return (count - last_count) / elapsed
+
+        return cpu, [
+            (f"top: {name}: {stat.procs} processes, cpu {stat.cpu_time:.2f} s "
+             f"({cpu:.1f}%), rss {_format_size(stat.rss)}, {stat.fds} fds, "
+             f"{restarts} restarts"),
+            (f"top: {name}: read "
+             f"{rate(sample.msgs_read, last.msgs_read):.1f} msg/s "
+             f"{_format_size(rate(sample.bytes_read, last.bytes_read))}/s, "
+             f"sent {rate(sample.msgs_sent, last.msgs_sent):.1f} msg/s "
+             f"{_format_size(rate(sample.bytes_sent, last.bytes_sent))}/s"),
+        ]
+
+    def _handle_top(self, _parts: List[str]) -> None:
+        """
+        Handle top command, show resource usage of the backends' server
+        processes and message rates of their clients
+        """
+
+        if not self.conversation:
+            return
+
+        logger.debug("getting resource usage of backends")
+        now = time.monotonic()
+        results = []
+        for backend in self.backends.values():
+            if backend.server and backend.server.proc:
+                results.append(self._get_top_lines(backend, now))
+
+        # forget samples of stopped backends
+        for name in list(self.top_samples):
+            if name not in self.backends:
+                del self.top_samples[name]
+
+        # show backends with the highest cpu usage first
+        self.conversation.log("nuqql", f"top: {len(results)} backends")
+        results.sort(key=lambda result: result[0], reverse=True)
+        for _cpu, lines in results:
+            for line in lines:
+                self.conversation.log("nuqql", line)
+
     def handle_nuqql_command(self, msg: str) -> None:
         """
         Handle a nuqql command (from the nuqql conversation)
@@ -183,6 +421,9 @@ class NuqqlBackend(Backend):
             "start": self._handle_start,
             "restart": self._handle_restart,
             "quit": self._handle_quit,
+            "search": self._handle_search,
+            "search-jump": self._handle_search_jump,
+            "top": self._handle_top,
             "version": self._handle_version,
         }
         command = parts[0]
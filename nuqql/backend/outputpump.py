@@ -0,0 +1,223 @@
+"""
+Output pump: reads the output of all backend server processes
+"""
+
+import collections
+import logging
+import os
+import queue
+import selectors
+import threading
+
+from typing import Deque, IO, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# number of output lines kept per backend server process
+OUTPUT_LINES = 200
+
+# maximum size of a single read from an output pipe; longer incomplete lines
+# are split
+OUTPUT_READ_SIZE = 65536
+
+# time in seconds shutdown waits for the pump thread
+OUTPUT_STOP_TIMEOUT = 0.5
+
+
+class OutputBuffer:
+    """
+    Ring buffer with the last output lines of a backend server process. Lines
+    are added by the output pump thread and read in the main loop.
+    """
+
+    def __init__(self, name: str, max_lines: int = OUTPUT_LINES) -> None:
+        self.name = name
+        self.lines: Deque[bytes] = collections.deque(maxlen=max_lines)
+        self.rest = b""
+        self.lock = threading.Lock()
+
+    def add(self, data: bytes) -> None:
+        """
+        Add output data, keep complete lines and the last incomplete line
+        """
+
+        data = self.rest + data
+        end = data.rfind(b"\n")
+        if end == -1 and len(data) < OUTPUT_READ_SIZE:
+            self.rest = data
+            return
+        if end == -1:
+            # too long incomplete line, split it
+            end = len(data)
+        self.rest = data[end + 1:]
+        lines = data[:end].split(b"\n")
+
+        with self.lock:
+            self.lines.extend(lines)
+
+        # only decode lines for the log if they are logged
+        if logger.isEnabledFor(logging.DEBUG):
+            for line in lines:
+                logger.debug("got backend subprocess %s output:\n %s",
+                             self.name, line.decode(errors="replace"))
+
+    def close(self) -> None:
+        """
+        Add the last incomplete line after the output ended
+        """
+
+        if self.rest:
+            self.add(b"\n")
+
+    def get_lines(self) -> List[str]:
+        """
+        Get the output lines in the buffer
+        """
+
+        with self.lock:
+            lines = list(self.lines)
+        return [line.decode(errors="replace").rstrip("\r") for line in lines]
+
+
+class OutputPump:
+    """
+    Single background thread that reads the output pipes of all backend
+    server processes with a selector and adds their output to output
+    buffers. Pipes are closed when their output ends or the pump is stopped.
+    """
+
+    def __init__(self) -> None:
+        self.requests: "queue.Queue[Tuple[IO[bytes], OutputBuffer]]" = \
+            queue.Queue()
+        self.thread: Optional[threading.Thread] = None
+        self.selector: Optional[selectors.BaseSelector] = None
+        self.wakeup: Tuple[int, int] = (-1, -1)
+        self.stopping = False
+
+    def _start(self) -> None:
+        """
+        Start thread if it is not running yet
+        """
+
+        if self.thread:
+            return
+
+        logger.debug("starting output pump thread")
+        self.stopping = False
+        self.wakeup = os.pipe()
+        os.set_blocking(self.wakeup[0], False)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.wakeup[0], selectors.EVENT_READ)
+        self.thread = threading.Thread(target=self._run,
+                                       name="nuqql-output", daemon=True)
+        self.thread.start()
+
+    def _wake(self) -> None:
+        """
+        Wake up thread, e.g., after a new request
+        """
+
+        try:
+            os.write(self.wakeup[1], b"\0")
+        except OSError:
+            pass
+
+    def _handle_requests(self) -> None:
+        """
+        Register new output pipes, runs in the pump thread
+        """
+
+        assert self.selector
+        try:
+            while os.read(self.wakeup[0], 4096):
+                pass
+        except BlockingIOError:
+            pass
+        while True:
+            try:
+                pipe, buf = self.requests.get_nowait()
+            except queue.Empty:
+                return
+            self.selector.register(pipe, selectors.EVENT_READ, buf)
+
+    def _close_pipe(self, pipe: IO[bytes], buf: OutputBuffer) -> None:
+        """
+        Unregister and close an output pipe, runs in the pump thread
+        """
+
+        assert self.selector
+        logger.debug("output of backend subprocess %s ended", buf.name)
+        self.selector.unregister(pipe)
+        pipe.close()
+        buf.close()
+
+    def _close(self) -> None:
+        """
+        Close all output pipes and the selector, runs in the pump thread
+        """
+
+        assert self.selector
+        for key in list(self.selector.get_map().values()):
+            if key.data is not None:
+                self._close_pipe(key.fileobj, key.data)  # type: ignore
+        self.selector.close()
+        os.close(self.wakeup[0])
+        os.close(self.wakeup[1])
+
+    def _run(self) -> None:
+        """
+        Main loop of the thread: wait for output and read it
+        """
+
+        assert self.selector
+        while True:
+            for key, _events in self.selector.select():
+                if key.data is None:
+                    # wakeup pipe
+                    self._handle_requests()
+                    continue
+
+                try:
+                    data = os.read(key.fd, OUTPUT_READ_SIZE)
+                except OSError as error:
+                    logger.error("error reading subprocess %s output: %s",
+                                 key.data.name, error)
+                    data = b""
+                if data:
+                    key.data.add(data)
+                else:
+                    self._close_pipe(key.fileobj, key.data)  # type: ignore
+
+            if self.stopping:
+                self._close()
+                return
+
+    def add(self, pipe: IO[bytes], buf: OutputBuffer) -> None:
+        """
+        Read output from pipe into output buffer buf until the output ends
+        """
+
+        self._start()
+        self.requests.put((pipe, buf))
+        self._wake()
+
+    def stop(self) -> None:
+        """
+        Stop the thread and close all output pipes. Waits only a short time
+        for the thread, so it never blocks shutdown.
+        """
+
+        if not self.thread:
+            return
+
+        logger.debug("stopping output pump thread")
+        self.stopping = True
+        self._wake()
+        self.thread.join(OUTPUT_STOP_TIMEOUT)
+        if self.thread.is_alive():
+            logger.error("output pump thread did not stop in time")
+        self.thread = None
+
+
+# pump for the output of all backend server processes
+OUTPUT_PUMP = OutputPump()
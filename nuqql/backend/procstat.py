@@ -0,0 +1,92 @@
+"""
+Process statistics of backend server processes from /proc
+"""
+
+import logging
+import os
+
+from typing import List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# clock ticks per second and page size for the values in /proc/<pid>/stat
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+class ProcStat(NamedTuple):
+    """
+    Resource usage of a group of processes
+    """
+
+    procs: int = 0
+    # user and system cpu time in seconds
+    cpu_time: float = 0.0
+    # resident set size in bytes
+    rss: int = 0
+    # open file descriptors
+    fds: int = 0
+
+
+def _read_stat_fields(pid: int) -> Optional[List[bytes]]:
+    """
+    Read fields after the command name from /proc/<pid>/stat: state, ppid,
+    pgrp, ... Return None if the process does not exist
+    """
+
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as stat_file:
+            stat = stat_file.read()
+    except OSError:
+        return None
+    return stat[stat.rfind(b")") + 2:].split()
+
+
+def get_group_processes(pgid: int) -> Optional[List[int]]:
+    """
+    Get processes in process group pgid that are not zombies. Return None if
+    /proc is not available.
+    """
+
+    try:
+        pids = [int(name) for name in os.listdir("/proc") if name.isdigit()]
+    except OSError:
+        return None
+
+    procs = []
+    for pid in pids:
+        fields = _read_stat_fields(pid)
+        if fields and int(fields[2]) == pgid and fields[0] != b"Z":
+            procs.append(pid)
+    return procs
+
+
+def get_group_stat(pgid: int) -> Optional[ProcStat]:
+    """
+    Get resource usage of all processes in process group pgid, e.g., a
+    backend server and the processes started by its shell. Return None if
+    /proc is not available.
+    """
+
+    pids = get_group_processes(pgid)
+    if pids is None:
+        return None
+
+    procs = 0
+    ticks = 0
+    pages = 0
+    fds = 0
+    for pid in pids:
+        fields = _read_stat_fields(pid)
+        if not fields:
+            # process exited in the meantime
+            continue
+        procs += 1
+        # utime, stime, and rss fields
+        ticks += int(fields[11]) + int(fields[12])
+        pages += int(fields[21])
+        try:
+            fds += len(os.listdir(f"/proc/{pid}/fd"))
+        except OSError as error:
+            logger.debug("cannot read fds of process %d: %s", pid, error)
+    return ProcStat(procs, ticks / CLOCK_TICKS, pages * PAGE_SIZE, fds)
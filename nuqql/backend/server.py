@@ -3,17 +3,34 @@ Backend server
 """
 
 import logging
+import os
+import select
+import signal
 import subprocess
-import threading
+import time
 
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
+
+from .outputpump import OUTPUT_PUMP, OutputBuffer
+from .procstat import ProcStat, get_group_processes, get_group_stat
 
 logger = logging.getLogger(__name__)
 
 # enable/disable logging of subprocess output
 SUBPROCESS_LOGGING = True
 
+# time in seconds a stopping server gets after SIGTERM before it is killed
+SERVER_STOP_TIMEOUT = 2
+
+# time in seconds to wait for servers after SIGKILL, counted from the end of
+# the stop timeout
+SERVER_KILL_TIMEOUT = 1
+
+# interval in seconds for checking if other processes in the server's process
+# group exited
+SERVER_GROUP_POLL_INTERVAL = 0.05
+
 
 class BackendServer:
     """
@@ -26,30 +43,32 @@ class BackendServer:
         self.server_path = path
         self.server_cmd = cmd
 
-        # subprocess output logging thread
-        self.output_logger: Optional[threading.Thread] = None
-        self.stop_logger = threading.Event()
+        # process file descriptor for detecting the server's exit, -1 if
+        # pidfds are not available
+        self.pidfd = -1
+        self.start_time = 0.0
+
+        # time until a terminated server must exit before it is killed
+        self.stop_deadline = 0.0
+
+        # last output lines of the subprocess
+        self.output = OutputBuffer(cmd.split()[0] if cmd else "")
 
     def _start_logging(self) -> None:
         """
-        Start logging the backend server's output to the nuqql log
+        Start logging the backend server's output to the nuqql log and the
+        output buffer
         """
 
-        name = self.server_cmd.split()[0]
+        assert self.proc and self.proc.stdout
+        OUTPUT_PUMP.add(self.proc.stdout, self.output)
 
-        def proc_logger() -> None:
-            assert self.proc and self.proc.stdout
-            while not self.stop_logger.is_set():
-                try:
-                    for line in iter(self.proc.stdout.readline, b''):
-                        logger.debug("got backend subprocess %s output:\n %s",
-                                     name, line.decode())
-                except OSError:
-                    logger.error("error reading subprocess %s output (read)",
-                                 name)
-                    return
-        self.output_logger = threading.Thread(target=proc_logger)
-        self.output_logger.start()
+    def get_output(self) -> List[str]:
+        """
+        Get the last output lines of the backend server
+        """
+
+        return self.output.get_lines()
 
     def start(self) -> None:
         """
@@ -79,21 +98,172 @@ class BackendServer:
                                         # subprocess
         )
 
+        self.start_time = time.monotonic()
+        self._open_pidfd()
+
         if SUBPROCESS_LOGGING:
             self._start_logging()
 
+    def _open_pidfd(self) -> None:
+        """
+        Open a process file descriptor for the server process, it becomes
+        readable when the process exits
+        """
+
+        assert self.proc
+        try:
+            self.pidfd = os.pidfd_open(self.proc.pid)   # type: ignore
+        except (AttributeError, OSError) as error:
+            # not supported by python or the kernel, fall back to polling
+            logger.debug("cannot open pidfd of server: %s", error)
+            self.pidfd = -1
+
+    def _close_pidfd(self) -> None:
+        """
+        Close the process file descriptor of the server process
+        """
+
+        if self.pidfd != -1:
+            os.close(self.pidfd)
+            self.pidfd = -1
+
+    def _signal(self, sig: int) -> None:
+        """
+        Send signal sig to the server's process group. The server runs in its
+        own session, so this also reaches the processes started by the shell
+        """
+
+        assert self.proc
+        try:
+            os.killpg(self.proc.pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def _group_alive(self) -> bool:
+        """
+        Check if there are processes left in the server's process group
+        """
+
+        assert self.proc
+        try:
+            os.killpg(self.proc.pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+
+        # orphaned processes of the group may be zombies until their new
+        # parent reaps them, ignore them
+        procs = get_group_processes(self.proc.pid)
+        return procs is None or bool(procs)
+
+    def _wait(self, timeout: float) -> bool:
+        """
+        Wait up to timeout seconds until the server process exits and reap
+        it, and until the other processes in its process group exit. Return
+        whether all of them exited.
+        """
+
+        assert self.proc
+        timeout = max(timeout, 0)
+        deadline = time.monotonic() + timeout
+        if self.wait_exit(timeout) is None:
+            return False
+
+        # the process group id is not reused while the group has processes,
+        # so it is safe to poll it after the server process was reaped
+        while self._group_alive():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(SERVER_GROUP_POLL_INTERVAL)
+        return True
+
+    def wait_exit(self, timeout: float) -> Optional[int]:
+        """
+        Wait up to timeout seconds until the server process exits and reap
+        it. Return its return code or None if it is still running
+        """
+
+        if not self.proc:
+            return None
+        timeout = max(timeout, 0)
+        if self.pidfd == -1:
+            try:
+                return self.proc.wait(timeout)
+            except subprocess.TimeoutExpired:
+                return None
+        select.select([self.pidfd], [], [], timeout)
+        return self.proc.poll()
+
+    def poll(self) -> Optional[int]:
+        """
+        Reap the server process if it exited. Return its return code or None
+        if it is still running
+        """
+
+        if not self.proc:
+            return None
+        return self.proc.poll()
+
+    def get_stat(self) -> Optional[ProcStat]:
+        """
+        Get resource usage of the server process and the other processes in
+        its process group. Return None if it is not available.
+        """
+
+        if not self.proc or self.proc.poll() is not None:
+            return None
+        return get_group_stat(self.proc.pid)
+
+    def get_uptime(self) -> float:
+        """
+        Get the time in seconds since the server process was started
+        """
+
+        return time.monotonic() - self.start_time
+
+    def _is_running(self) -> bool:
+        """
+        Check if the server process or other processes in its process group
+        are still running
+        """
+
+        if not self.proc:
+            return False
+        return self.proc.poll() is None or self._group_alive()
+
+    def terminate(self) -> None:
+        """
+        Send SIGTERM to the server's process group without waiting for it to
+        exit, so several servers can exit at the same time. stop() waits for
+        the server.
+        """
+
+        if self.stop_deadline or not self._is_running():
+            return
+
+        logger.debug("terminating server")
+        self._signal(signal.SIGTERM)
+        self.stop_deadline = time.monotonic() + SERVER_STOP_TIMEOUT
+
     def stop(self) -> None:
         """
-        Stop the backend's server process
+        Stop the backend's server process: send SIGTERM to its process group
+        and SIGKILL if it does not exit in time
         """
 
         logger.debug("stopping server")
 
-        # stop running server
-        if self.proc:
-            self.proc.terminate()
-
-        # stop output logger
-        if self.output_logger:
-            self.stop_logger.set()
-            self.output_logger.join()
+        # stop running server, the output pump closes its output pipe when
+        # the output ends
+        self.terminate()
+        if self.stop_deadline and \
+           not self._wait(self.stop_deadline - time.monotonic()):
+            logger.error("server %s did not stop in time, killing it",
+                         self.output.name)
+            self._signal(signal.SIGKILL)
+            kill_deadline = self.stop_deadline + SERVER_KILL_TIMEOUT
+            if not self._wait(kill_deadline - time.monotonic()):
+                logger.error("server %s did not exit after SIGKILL",
+                             self.output.name)
+        self._close_pidfd()
@@ -0,0 +1,198 @@
+"""
+Backend supervisor: detects exits of backend server processes and restarts
+them
+"""
+
+import logging
+import selectors
+import time
+
+from typing import Callable, Dict, List, Optional, TYPE_CHECKING
+
+import nuqql.conversation
+
+if TYPE_CHECKING:   # imports for typing
+    # pylint: disable=cyclic-import
+    from .backend import Backend  # noqa
+
+logger = logging.getLogger(__name__)
+
+# time in seconds a backend server must run until its crashes are forgotten
+SUPERVISOR_STABLE_TIME = 60
+
+# delay in seconds before the first restart of a crashed backend, doubled
+# after each crash up to the maximum delay
+SUPERVISOR_RESTART_DELAY = 1
+SUPERVISOR_MAX_RESTART_DELAY = 60
+
+# time in seconds to wait for the server of a backend to exit when the
+# backend is stopped because of an error, e.g., on its client connection
+SUPERVISOR_EXIT_WAIT = 0.5
+
+
+class BackendSupervisor:
+    """
+    Supervisor for the server processes of all backends. Exits are detected
+    with the servers' process file descriptors in a selector, or by polling
+    the servers if pidfds are not available. Backends that exit without being
+    stopped by nuqql are stopped and restarted after a delay that grows with
+    the number of crashes in a row.
+    """
+
+    def __init__(self) -> None:
+        self.selector: Optional[selectors.BaseSelector] = None
+        self.backends: Dict[str, "Backend"] = {}
+
+        # crashes in a row, restarts, and pending restart times per backend
+        self.crashes: Dict[str, int] = {}
+        self.restarts: Dict[str, int] = {}
+        self.pending: Dict[str, float] = {}
+
+    def add(self, backend: "Backend") -> None:
+        """
+        Start supervising the server process of backend
+        """
+
+        assert backend.server
+        logger.debug("supervising backend %s", backend.name)
+        self.backends[backend.name] = backend
+        if backend.server.pidfd != -1:
+            if not self.selector:
+                self.selector = selectors.DefaultSelector()
+            self.selector.register(backend.server.pidfd, selectors.EVENT_READ,
+                                   backend)
+
+    def _unregister(self, backend: "Backend") -> None:
+        """
+        Stop supervising the server process of backend
+        """
+
+        assert backend.server
+        del self.backends[backend.name]
+        if self.selector and backend.server.pidfd != -1:
+            self.selector.unregister(backend.server.pidfd)
+
+    def _handle_exit(self, backend: "Backend", returncode: int) -> None:
+        """
+        Handle unexpected exit of the server process of backend, schedule
+        restart of the backend
+        """
+
+        assert backend.server
+        name = backend.name
+
+        # count crashes in a row, a server that ran long enough starts over
+        crashes = self.crashes.get(name, 0) + 1
+        if backend.server.get_uptime() >= SUPERVISOR_STABLE_TIME:
+            crashes = 1
+        self.crashes[name] = crashes
+        delay = min(SUPERVISOR_RESTART_DELAY * 2 ** (crashes - 1),
+                    SUPERVISOR_MAX_RESTART_DELAY)
+        self.pending[name] = time.monotonic() + delay
+
+        if returncode < 0:
+            reason = f"was killed by signal {-returncode}"
+        else:
+            reason = f"exited with code {returncode}"
+        logger.error("server of backend %s %s, crash %d, restarting in %d "
+                     "seconds", name, reason, crashes, delay)
+        log_msg = (f"Backend \"{name}\" {reason}. Restarting it in {delay} "
+                   f"seconds.")
+        nuqql.conversation.log_nuqql_conv(log_msg)
+
+    def remove(self, backend: "Backend", intentional: bool = True) -> None:
+        """
+        Stop supervising the server process of backend, e.g., before the
+        backend is stopped. If the backend is not stopped intentionally by
+        the user or nuqql but because of an error, wait briefly for its
+        server to exit. If it exits, the backend crashed and is restarted
+        later.
+        """
+
+        if self.backends.get(backend.name) is not backend:
+            return
+
+        assert backend.server
+        self._unregister(backend)
+        if intentional:
+            return
+        returncode = backend.server.wait_exit(SUPERVISOR_EXIT_WAIT)
+        if returncode is not None:
+            self._handle_exit(backend, returncode)
+
+    def cancel(self, name: str) -> None:
+        """
+        Cancel pending restart of backend identified by name
+        """
+
+        if self.pending.pop(name, None) is not None:
+            logger.debug("cancelled restart of backend %s", name)
+
+    def _get_exited(self) -> List["Backend"]:
+        """
+        Get backends with exited server processes
+        """
+
+        exited = []
+        if self.selector and self.backends:
+            for key, _events in self.selector.select(0):
+                exited.append(key.data)
+        for backend in self.backends.values():
+            assert backend.server
+            if backend.server.pidfd == -1 and \
+               backend.server.poll() is not None:
+                exited.append(backend)
+        return exited
+
+    def _restart(self, name: str,
+                 restart_func: Callable[[str], None]) -> None:
+        """
+        Restart backend identified by name
+        """
+
+        restarts = self.restarts.get(name, 0) + 1
+        self.restarts[name] = restarts
+        logger.debug("restarting backend %s, restart %d", name, restarts)
+        log_msg = f"Restarting backend \"{name}\" (restart {restarts})."
+        nuqql.conversation.log_nuqql_conv(log_msg)
+        restart_func(name)
+
+    def check(self, restart_func: Callable[[str], None]) -> None:
+        """
+        Check for exited server processes, stop their backends, and restart
+        backends with restart_func when their restart delay is over
+        """
+
+        # stop backends with exited servers, this schedules their restart
+        for backend in self._get_exited():
+            backend.stop(intentional=False)  # changes BACKENDS
+
+        # restart backends
+        now = time.monotonic()
+        for name, restart_time in list(self.pending.items()):
+            if restart_time <= now:
+                del self.pending[name]
+                self._restart(name, restart_func)
+
+    def get_restarts(self, name: str) -> int:
+        """
+        Get number of restarts of backend identified by name
+        """
+
+        return self.restarts.get(name, 0)
+
+    def close(self) -> None:
+        """
+        Stop supervising all backends, drop pending restarts
+        """
+
+        logger.debug("closing backend supervisor")
+        self.pending.clear()
+        if self.selector:
+            self.selector.close()
+            self.selector = None
+        self.backends.clear()
+
+
+# supervisor for the server processes of all backends
+BACKEND_SUPERVISOR = BackendSupervisor()
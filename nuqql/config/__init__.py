@@ -3,6 +3,7 @@ nuqql config
 """
 
 from .config import \
+        get_history_setting, \
         init, \
         parse_args
 from .configs import get
@@ -21,6 +21,35 @@ DEFAULT_CONVERSATION_CONFIG = {
     "sort_key": "last_send",
 }
 
+# default history settings
+DEFAULT_HISTORY_CONFIG = {
+    # store history in text files ("text") or in a database ("sqlite")
+    "store": "text",
+    # maximum number of history files kept open for writing and mapped for
+    # reading at the same time
+    "max_open_files": "64",
+    # number of messages loaded from history files at once
+    "load_messages": "1000",
+    # durability of history writes: only write them to the files ("none"),
+    # also flush them to the operating system ("flush"), or also sync them to
+    # disk ("fsync")
+    "durability": "flush",
+    # maximum time in milliseconds history writes are delayed
+    "flush_interval": "1000",
+    # number of delayed bytes that triggers writing the history
+    "flush_size": "65536",
+    # rotate history files into compressed archives: never ("none"), when
+    # they reach rotate_size bytes ("size"), or every month ("month")
+    "rotate": "size",
+    "rotate_size": "8388608",
+    # compression of archived history files: "gzip" or "lzma"
+    "compression": "gzip",
+    # maximum number of messages kept in memory per conversation and in all
+    # conversations; older messages are reloaded from history on demand
+    "max_messages": "10000",
+    "max_total_messages": "100000",
+}
+
 
 def init_win(screen: Any) -> None:
     """
@@ -103,6 +132,53 @@ def init_conversation_settings() -> None:
     logger.debug("initialized conversation settings")
 
 
+def _get_history_config() -> Dict[str, str]:
+    """
+    Initialize/get history configuration
+    """
+
+    # init configuration from defaults
+    history_config = dict(DEFAULT_HISTORY_CONFIG)
+
+    # parse config read from file
+    config = read_from_file()
+    if "history" in config.sections():
+        # overwrite default history config entries
+        for key in config["history"]:
+            if key in history_config:
+                history_config[key] = config["history"][key]
+
+    # write (updated) config to file again
+    config["history"] = history_config
+    write_to_file(config)
+
+    # return config
+    return history_config
+
+
+def init_history_settings() -> None:
+    """
+    Initialize history settings
+    """
+
+    settings = _get_history_config()
+    CONFIGS["history"] = settings
+    logger.debug("initialized history settings")
+
+
+def get_history_setting(name: str) -> int:
+    """
+    Get numeric history setting identified by name, fall back to default
+    value if setting is invalid
+    """
+
+    try:
+        return int(get("history")[name])
+    except (KeyError, ValueError):
+        logger.error("invalid history setting %s", name)
+        return int(DEFAULT_HISTORY_CONFIG[name])
+
+
 def init_path() -> None:
     """
     Initialize configuration path. Make sure config directories exist.
@@ -122,6 +198,7 @@ def init(screen: Any) -> None:
     init_path()
     init_win(screen)
     init_conversation_settings()
+    init_history_settings()
 
 
 def init_logging() -> None:
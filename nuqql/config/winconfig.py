@@ -176,7 +176,11 @@ DEFAULT_LIST_WIN_CONFIG: Dict[str, Any] = {
     "show_title": True,
 }
 
-DEFAULT_LOG_WIN_CONFIG = DEFAULT_LIST_WIN_CONFIG
+DEFAULT_LOG_WIN_CONFIG: Dict[str, Any] = {
+    "show_title": True,
+    "search_regex": False,
+    "search_ignore_case": False,
+}
 DEFAULT_INPUT_WIN_CONFIG = DEFAULT_LIST_WIN_CONFIG
 
 
@@ -9,7 +9,15 @@ from .helper import \
         log_main_window, \
         log_nuqql_conv, \
         remove_backend_conversations, \
-        resize_main_window
+        resize_main_window, \
+        trim_logs
+from .historyindex import HISTORY_INDEX
+from .historyreader import HISTORY_READER
+from .historystate import HISTORY_STATE
+from .historystore import HISTORY_STORE
+from .historywriter import HISTORY_WRITER
+from .historyworker import HISTORY_WORKER
+from .logbudget import LOG_BUDGET
 from .buddyconversation import BuddyConversation
 from .backendconversation import BackendConversation
 from .nuqqlconversation import NuqqlConversation
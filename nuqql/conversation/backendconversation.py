@@ -52,7 +52,7 @@ class BackendConversation(Conversation):
 
         # return tuple of sort keys:
         # notify, used, type, status, name
-        return 0 - self.notification, 0, 1, 0, self.name
+        return 0 - min(self.notification, 1), 0, 1, 0, self.name
 
     @staticmethod
     def _check_chat_command(backend: "Backend", account: "Account", cmd: str,
@@ -125,6 +125,18 @@ class BackendConversation(Conversation):
             self._check_chat_command(self.backend, account, parts[3], parts[4])
             return
 
+    def _show_output(self) -> None:
+        """
+        Show the last output lines of the backend's server process
+        """
+
+        assert self.backend
+        lines = self.backend.get_server_output()
+        self.log("nuqql", f"output: {len(lines)} lines of backend server "
+                          f"{self.name}")
+        for line in lines:
+            self.log("nuqql", line)
+
     def send_msg(self, msg: str) -> None:
         """
         Send message coming from the UI/input window
@@ -134,6 +146,11 @@ class BackendConversation(Conversation):
 
         self._send_msg_prepare(msg)
 
+        # show output of the backend's server process
+        if msg == "/output":
+            self._show_output()
+            return
+
         # send command message to backend
         if self.backend and self.backend.client:
             # check for special commands to handle in nuqql first
@@ -50,7 +50,7 @@ class BuddyConversation(Conversation):
         self._create_windows_common(log_title, input_title)
 
         # try to read old messages from message history
-        self.history.init_log_from_file()
+        self.history.init_log_from_file(self._add_history)
 
         # if this conversation belongs to a group chat invite, display special
         # event to the user
@@ -62,6 +62,23 @@ class BuddyConversation(Conversation):
                         "this invite.>"
                 self.log("<event>", msg, own=True)
 
+    def _add_history(self, count: int) -> None:
+        """
+        Helper that updates the log window after count log entries were added
+        to the beginning of the log from the message history
+        """
+
+        if not count:
+            return
+
+        logger.debug("added %d log entries from history to conversation %s",
+                     count, self.name)
+        self.wins.log_win.add_older(count)
+        if self.is_log_win_active() or self.is_input_win_active():
+            self.wins.log_win.redraw()
+        if self.is_input_win_active():
+            self.wins.input_win.redraw_pad()    # keep cursor in input_win
+
     def get_name(self) -> str:
         """
         Get the name of the conversation, depending on type
@@ -81,7 +98,7 @@ class BuddyConversation(Conversation):
         """
 
         # defaults
-        sort_notify = 0 - self.notification
+        sort_notify = 0 - min(self.notification, 1)
         sort_used = 0.0
         sort_type = 0
         sort_status = 0
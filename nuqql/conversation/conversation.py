@@ -2,6 +2,7 @@
 Nuqql Conversations
 """
 
+import collections
 import curses
 import datetime
 import logging
@@ -13,6 +14,7 @@ import nuqql.config
 
 from nuqql.win import InputWin, LogWin
 from .history import History
+from .logbudget import LOG_BUDGET
 from .logmessage import LogMessage
 
 if TYPE_CHECKING:   # imports for typing
@@ -30,6 +32,11 @@ logger = logging.getLogger(__name__)
 # list of active conversations
 CONVERSATIONS: List["Conversation"] = []
 
+# conversations with unread messages in the order their first unread message
+# arrived
+NEW_CONVERSATIONS: "collections.OrderedDict[Conversation, None]" = \
+    collections.OrderedDict()
+
 
 class Conversation:
     """
@@ -38,7 +45,7 @@ class Conversation:
 
     def __init__(self, backend: Optional["Backend"], account:
                  Optional["Account"], name: str) -> None:
-        # general
+        # general, notification is the number of unread messages
         self.name = name
         self.notification = 0
 
@@ -127,9 +134,10 @@ class Conversation:
         get notification prefix for name
         """
 
-        # check if there are pending notifications
+        # check if there are pending notifications, show number of unread
+        # messages
         if self.notification > 0:
-            notify = "# "
+            notify = f"#{self.notification} "
         else:
             notify = ""
 
@@ -155,7 +163,8 @@ class Conversation:
         # create a log message
         if tstamp is None:
             tstamp = datetime.datetime.now()
-        log_msg = LogMessage(tstamp, sender, msg, own=own)
+        log_msg = LogMessage(tstamp, self.history.intern_sender(sender), msg,
+                             own=own)
 
         # if conversation has not been initialized yet, stop here.
         # Messages must be loaded from the history file first
@@ -163,30 +172,71 @@ class Conversation:
             return log_msg
 
         # put message into conversation's history
+        log_size = len(self.history.log)
         if self.history.log:
             last_msg = self.history.log[-1]
-            if last_msg.tstamp.date() != tstamp.date():
+            if last_msg.get_date() != log_msg.get_date():
                 date_change_msg = LogMessage(
-                    log_msg.tstamp, "<event>", (f"<Date changed to "
-                                                f"{log_msg.tstamp.date()}>"),
+                    log_msg.epoch, "<event>", (f"<Date changed to "
+                                               f"{log_msg.get_date()}>"),
                     own=True)
                 date_change_msg.is_read = True
                 self.history.log.append(date_change_msg)
         self.history.log.append(log_msg)
+        LOG_BUDGET.add(len(self.history.log) - log_size, len(self.history.log))
 
-        # if conversation is already active, redraw the log
+        # if conversation is already active, add message to the log window
         if self.is_input_win_active():
-            self.wins.log_win.redraw_pad()
+            self.wins.log_win.append_pad()
             self.wins.input_win.redraw_pad()    # keep cursor in input_win
 
         return log_msg
 
-    def notify(self) -> None:
+    def get_log(self) -> List[LogMessage]:
+        """
+        Get log shown in the conversation's log window
+        """
+
+        return self.history.log
+
+    def _evict_log(self, count: int) -> int:
+        """
+        Remove up to count oldest entries from the conversation's log, return
+        the number of removed entries
+        """
+
+        return self.history.evict(count)
+
+    def trim_log(self, keep: int) -> int:
         """
-        Notify this conversation about new messages
+        Remove old entries from the conversation's log, so it only keeps the
+        newest keep entries, but do not remove entries the user is looking
+        at. Return the number of removed entries.
         """
 
-        self.notification = 1
+        count = len(self.get_log()) - keep
+        log_win = self.wins.log_win
+        if log_win and log_win.view.cur != -1:
+            count = min(count, log_win.view.cur)
+        if count <= 0:
+            return 0
+
+        count = self._evict_log(count)
+        if count and log_win:
+            log_win.remove_older(count)
+        return count
+
+    def notify(self, count: int = 1) -> None:
+        """
+        Notify this conversation about count new messages
+        """
+
+        if count <= 0:
+            return
+
+        self.notification += count
+        if self not in NEW_CONVERSATIONS:
+            NEW_CONVERSATIONS[self] = None
 
         if self.wins.list_win:
             self.wins.list_win.redraw_pad()
@@ -197,6 +247,7 @@ class Conversation:
         """
 
         self.notification = 0
+        NEW_CONVERSATIONS.pop(self, None)
         if self.wins.list_win:
             self.wins.list_win.redraw_pad()
 
@@ -270,14 +321,14 @@ class Conversation:
 
     def get_new(self) -> Optional["Conversation"]:
         """
-        Check if there is any conversation with new messages and return it
+        Check if there is any conversation with new messages and return the
+        one with the oldest unread message
         """
 
-        for conv in CONVERSATIONS:
-            if conv.notification > 0:
-                logger.debug("found new conversation in conversation %s: %s",
-                             self.name, conv.name)
-                return conv
+        for conv in NEW_CONVERSATIONS:
+            logger.debug("found new conversation in conversation %s: %s",
+                         self.name, conv.name)
+            return conv
 
         return None
 
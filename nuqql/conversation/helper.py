@@ -10,6 +10,7 @@ from typing import TYPE_CHECKING
 import nuqql.win
 
 from .conversation import CONVERSATIONS
+from .logbudget import LOG_BUDGET, LOG_MIN_ENTRIES
 from .logmessage import LogMessage
 
 if TYPE_CHECKING:   # imports for typing
@@ -25,13 +26,21 @@ def remove_backend_conversations(backend: "Backend") -> None:
     """
 
     logger.debug("removing all conversations of backend %s", backend.name)
+    list_wins = []
     for conv in CONVERSATIONS[:]:
         if conv.backend == backend:
+            conv.clear_notifications()
+            LOG_BUDGET.remove(len(conv.get_log()))
             conv.wins.list_win.remove(conv)
-            conv.wins.list_win.redraw()
+            if conv.wins.list_win not in list_wins:
+                list_wins.append(conv.wins.list_win)
             logger.debug("removed conversation %s of backend %s",
                          conv.name, backend.name)
 
+    # redraw list windows once after removing all conversations
+    for list_win in list_wins:
+        list_win.redraw()
+
 
 def log_main_window(msg: str) -> None:
     """
@@ -41,7 +50,9 @@ def log_main_window(msg: str) -> None:
     logger.debug("logging message to main window: %s", msg)
     now = datetime.datetime.now()
     log_msg = LogMessage(now, "nuqql", msg)
-    nuqql.win.MAIN_WINS["log"].add(log_msg)
+    main_log_win = nuqql.win.MAIN_WINS["log"]
+    main_log_win.add(log_msg)
+    LOG_BUDGET.add(1, len(main_log_win.list))
 
 
 def log_nuqql_conv(msg: str) -> None:
@@ -56,6 +67,42 @@ def log_nuqql_conv(msg: str) -> None:
             return
 
 
+def trim_logs() -> None:
+    """
+    Remove old entries from the logs of conversations that exceed the
+    per-conversation message budget, and from the least recently used
+    conversations if all logs exceed the global message budget. Only needed
+    if LOG_BUDGET is exceeded.
+    """
+
+    max_messages = LOG_BUDGET.max_messages
+    max_total = LOG_BUDGET.max_total
+    convs = list(CONVERSATIONS)
+    main_log_win = nuqql.win.MAIN_WINS.get("log")
+    if main_log_win:
+        convs.append(main_log_win.conversation)
+
+    total = 0
+    for conv in convs:
+        if len(conv.get_log()) > max_messages:
+            conv.trim_log(max_messages * 3 // 4)
+        total += len(conv.get_log())
+    if total <= max_total:
+        LOG_BUDGET.reset(total)
+        return
+
+    # trim least recently used conversations first
+    logger.debug("%d log entries exceed global budget of %d", total,
+                 max_total)
+    for conv in sorted(convs, key=lambda conv: conv.stats["last_used"]):
+        if conv.is_active():
+            continue
+        total -= conv.trim_log(LOG_MIN_ENTRIES)
+        if total <= max_total * 3 // 4:
+            break
+    LOG_BUDGET.reset(total)
+
+
 def resize_main_window() -> None:
     """
     Resize main window
@@ -3,13 +3,22 @@ History: (file) logging for nuqql conversations
 """
 
 import datetime
+import functools
 import logging
-import pathlib
 import os
 
-from typing import List, Optional, TYPE_CHECKING
+from typing import Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
 
 import nuqql.config
+from .historyarchive import HistoryArchive
+from .historyindex import HISTORY_INDEX
+from .historyoffsets import OFFSETS_FILE_SUFFIX, HistoryOffsets
+from .historyreader import HISTORY_READER
+from .historystate import HISTORY_STATE, UNREAD_UNKNOWN, get_fingerprint
+from .historystore import HISTORY_STORE
+from .historywriter import HISTORY_WRITER
+from .historyworker import HISTORY_WORKER
+from .logbudget import LOG_BUDGET
 from .logmessage import LogMessage
 
 if TYPE_CHECKING:   # imports for typing
@@ -30,78 +39,67 @@ class History:
     def __init__(self, conv: "Conversation") -> None:
         self.conv = conv
         self.conv_path = ""
+        self.conv_key = ""
         self.log: List[LogMessage] = []
-        self.logger: Optional[logging.Logger] = None
         self.log_file = ""
         # self.lastread_file = None
 
+        # offset of the first message in the log in the history file, and
+        # last read message, if it was not found in the log yet
+        self.log_start = 0
+        self.lastread_pending: Optional[LogMessage] = None
+
+        # log messages from history file added to the log? Older messages
+        # being loaded from the history file?
+        self.log_loaded = False
+        self.loading = False
+
+        # offsets index and archive of the history file, loaded on first use
+        self.offsets: Optional[HistoryOffsets] = None
+        self.archive: Optional[HistoryArchive] = None
+
+        # use history store instead of history files?
+        self.use_store = False
+
+        # sender names of the log messages, so all messages of a sender share
+        # the same string
+        self.senders: Dict[str, str] = {}
+
     def _get_conv_path(self) -> str:
         """
-        Get path for conversation history as a string and make sure it exists
+        Get path for conversation history as a string
         """
 
         # construct directory path
         assert self.conv.backend and self.conv.account
+        self.conv_key = (f"{self.conv.backend.name}/{self.conv.account.aid}/"
+                         f"{self.conv.name}")
         conv_dir = str(nuqql.config.get("dir")) + \
-            (f"/conversation/{self.conv.backend.name}/"
-             f"{self.conv.account.aid}/{self.conv.name}")
-
-        # make sure directory exists
-        pathlib.Path(conv_dir).mkdir(parents=True, exist_ok=True)
+            f"/conversation/{self.conv_key}"
 
         return conv_dir
 
-    @staticmethod
-    def _get_logger(name, file_name: str) -> logging.Logger:
-        """
-        Create a logger for a conversation
-        """
-
-        # create logger
-        conv_logger = logging.getLogger(name)
-        conv_logger.propagate = False
-        conv_logger.setLevel(logging.DEBUG)
-
-        # create handler
-        fileh = logging.FileHandler(file_name)
-        fileh.setLevel(logging.DEBUG)
-        fileh.terminator = "\r\n"
-
-        # create formatter
-        formatter = logging.Formatter(
-            # fmt="%(asctime)s %(levelname)-5.5s [%(name)s] %(message)s",
-            fmt="%(message)s",
-            datefmt="%s")
-
-        # add formatter to handler
-        fileh.setFormatter(formatter)
-
-        # add handler to logger
-        if not conv_logger.hasHandlers():
-            conv_logger.addHandler(fileh)
-
-        # return logger to caller
-        return conv_logger
-
     def init_logger(self) -> None:
         """
-        Init logger for a conversation
+        Init logger for a conversation. The history file is only opened when
+        the first message is written to it.
         """
 
         logger.debug("initializing logger of conversation %s", self.conv.name)
 
-        # get log dir and make sure it exists
-        assert self.conv.backend and self.conv.account
+        # get log dir
         self.conv_path = self._get_conv_path()
-
-        # create logger with log name and log file
-        log_name = (f"nuqql.history.{self.conv.backend.name}."
-                    f"{self.conv.account.aid}.{self.conv.name}")
         self.log_file = self.conv_path + HISTORY_FILE
-        self.logger = self._get_logger(log_name, self.log_file)
+        self.use_store = HISTORY_STORE.is_enabled()
 
-    @staticmethod
-    def _parse_log_line(line: str) -> LogMessage:
+    def intern_sender(self, sender: str) -> str:
+        """
+        Get the shared string of sender name sender in this conversation
+        """
+
+        return self.senders.setdefault(sender, sender)
+
+    def _parse_log_line(self, line: str) -> LogMessage:
         """
         Parse line from log file and return a LogMessage
         """
@@ -113,12 +111,14 @@ class History:
         is_own = False
         if direction == "OUT":
             is_own = True
-        sender = parts[2]
-        msg = parts[3][:-2]
-        tstamp = datetime.datetime.fromtimestamp(int(parts[0]))
+        sender = self.intern_sender(parts[2])
+        msg = parts[3]
+        if msg.endswith("\r\n"):
+            msg = msg[:-2]
 
         # create and return LogMessage
-        log_msg = LogMessage(tstamp, sender, msg, own=is_own)
+        log_msg = LogMessage(int(parts[0]), sender, msg, own=is_own)
+        log_msg.in_history = True
         return log_msg
 
     @staticmethod
@@ -128,7 +128,7 @@ class History:
         """
 
         # determine log line contents
-        tstamp = round(log_msg.tstamp.timestamp())
+        tstamp = log_msg.epoch
         direction = "IN"
         sender = log_msg.sender
         if log_msg.own:
@@ -144,7 +144,20 @@ class History:
         """
 
         logger.debug("getting lastread of conversation %s", self.conv.name)
+        if self.use_store:
+            line = HISTORY_STORE.get_lastread(self.conv_key)
+            if not line:
+                return None
+            log_msg = self._parse_log_line(line)
+            log_msg.is_read = True
+            return log_msg
+
         lastread_file = self.conv_path + LASTREAD_FILE
+        pending = HISTORY_WRITER.get_pending_replace(lastread_file)
+        if pending:
+            log_msg = self._parse_log_line(pending)
+            log_msg.is_read = True
+            return log_msg
         try:
             with open(lastread_file, encoding='UTF-8',
                       newline="\r\n") as in_file:
@@ -160,6 +173,20 @@ class History:
                          self.conv.name)
             return None
 
+    def _set_lastread_line(self, line: str) -> None:
+        """
+        Set last read message in "lastread" file of the conversation from a
+        line, runs in the history thread
+        """
+
+        HISTORY_STATE.set_read(self.conv_key, line)
+        if self.use_store:
+            HISTORY_STORE.set_lastread(self.conv_key, line)
+            return
+
+        # replace lastread file with the next commit of the history writer
+        HISTORY_WRITER.replace(self.conv_path + LASTREAD_FILE, line + "\r\n")
+
     def set_lastread(self, log_msg: LogMessage) -> None:
         """
         Set last read message in "lastread" file of the conversation
@@ -167,14 +194,90 @@ class History:
 
         logger.debug("setting lastread of conversation %s", self.conv.name)
 
-        # create log line and write it to lastread file
-        line = self._create_log_line(log_msg) + "\r\n"
-        lines = []
-        lines.append(line)
+        # create log line and write it to lastread file in history thread
+        line = self._create_log_line(log_msg)
+        HISTORY_WORKER.submit(self._set_lastread_line, line)
 
-        lastread_file = self.conv_path + LASTREAD_FILE
-        with open(lastread_file, "w+", encoding='UTF-8') as out_file:
-            out_file.writelines(lines)
+    def _get_offsets(self) -> HistoryOffsets:
+        """
+        Get offsets index of the history file, load it if necessary
+        """
+
+        if not self.offsets:
+            HISTORY_WRITER.sync_file(self.log_file)
+            self.offsets = HistoryOffsets(self.log_file)
+            self.offsets.load()
+        return self.offsets
+
+    def _has_offsets(self) -> bool:
+        """
+        Check if the offsets index of the history file exists or is not
+        needed, so reading the history does not index the whole file
+        """
+
+        if self.use_store or self.offsets:
+            return True
+        return not os.path.exists(self.log_file) or \
+            os.path.exists(self.log_file + OFFSETS_FILE_SUFFIX)
+
+    def _get_archive(self) -> HistoryArchive:
+        """
+        Get archive of rotated parts of the history file, load it if
+        necessary
+        """
+
+        if not self.archive:
+            self.archive = HistoryArchive(self.log_file)
+            self.archive.load()
+        return self.archive
+
+    def _rotate(self, tstamp: int) -> None:
+        """
+        Rotate history file into a compressed archive segment if it is too
+        big or, in monthly rotation, the new line with timestamp tstamp
+        starts a new month
+        """
+
+        offsets = self._get_offsets()
+        if not offsets.count:
+            return
+
+        rotate = nuqql.config.get("history")["rotate"]
+        if rotate == "size":
+            max_size = nuqql.config.get_history_setting("rotate_size")
+            if max_size <= 0 or offsets.size < max_size:
+                return
+        elif rotate == "month":
+            first = datetime.datetime.fromtimestamp(offsets.first_tstamp)
+            new = datetime.datetime.fromtimestamp(tstamp)
+            if (first.year, first.month) == (new.year, new.month):
+                return
+        else:
+            return
+
+        # write pending lines, make sure the full-text index contains all
+        # lines, and move the history file into the archive
+        HISTORY_WRITER.close_file(self.log_file)
+        HISTORY_INDEX.rotate(self.conv_key, self.log_file)
+        HISTORY_READER.close_file(self.log_file)
+        try:
+            self._get_archive().rotate(
+                nuqql.config.get("history")["compression"],
+                offsets.first_tstamp, offsets.last_tstamp)
+        except OSError as error:
+            logger.error("error rotating history file %s: %s",
+                         self.log_file, error)
+            return
+        offsets.remove()
+
+    def _read_lines(self, start: int, end: int) -> List[str]:
+        """
+        Read complete lines between offsets start and end from history file
+        """
+
+        HISTORY_WRITER.sync_file(self.log_file)
+        _end, lines = HISTORY_READER.read_lines(self.log_file, start, end)
+        return lines
 
     def get_last_log_line(self) -> Optional[LogMessage]:
         """
@@ -183,74 +286,256 @@ class History:
 
         logger.debug("getting last log line of conversation %s",
                      self.conv.name)
-        history_file = self.conv_path + HISTORY_FILE
-        try:
-            # negative seeking requires binary mode
-            with open(history_file, "rb") as in_file:
-                # check if file contains at least 2 bytes
-                in_file.seek(0, os.SEEK_END)
-                if in_file.tell() < 3:
-                    logger.debug("log of conversation %s seems to be empty",
-                                 self.conv.name)
-                    return None
-
-                # try to find last line
-                in_file.seek(-3, os.SEEK_END)
-                while in_file.read(2) != b"\r\n":
-                    try:
-                        in_file.seek(-3, os.SEEK_CUR)
-                    except IOError:
-                        in_file.seek(-2, os.SEEK_CUR)
-                        if in_file.tell() == 0:
-                            break
-
-                # read and return last line as LogMessage
-                last_line = in_file.read()
-                log_msg = self._parse_log_line(last_line.decode())
-                return log_msg
-        except FileNotFoundError:
-            logger.debug("log file of conversation %s not found",
+        if self.use_store:
+            line = HISTORY_STORE.get_last_line(self.conv_key)
+            if not line:
+                return None
+            return self._parse_log_line(line)
+
+        # read and return last line as LogMessage
+        end = self._get_end()
+        if not end:
+            logger.debug("log of conversation %s seems to be empty",
                          self.conv.name)
             return None
+        _start, lines = self._read_lines_before(end, 1)
+        if not lines:
+            return None
+        return self._parse_log_line(lines[-1])
 
-    def init_log_from_file(self) -> None:
+    def _read_unread(self, last_read: str) -> Tuple[str, int]:
         """
-        Initialize a conversation's log from the conversation's log file
+        Count the messages after the last read message with fingerprint
+        last_read in the history, at most max_messages. If the last read
+        message is not found, all messages are unread. Return fingerprint of
+        the last logged message and the number of unread messages.
         """
 
-        logger.debug("initializing log of conversation %s from file %s",
-                     self.conv.name, self.log_file)
+        last_logged = ""
+        unread = 0
+        max_unread = max(nuqql.config.get_history_setting("max_messages"), 1)
+        count = max(nuqql.config.get_history_setting("load_messages"), 1)
+        start = self._get_end()
+        while start > 0 and unread < max_unread:
+            start, lines = self._read_lines_before(start, count)
+            if not lines:
+                break
+            if not last_logged:
+                last_logged = get_fingerprint(lines[-1])
+            for line in reversed(lines):
+                if get_fingerprint(line) == last_read:
+                    return last_logged, unread
+                unread += 1
+        return last_logged, min(unread, max_unread)
+
+    def _count_unread(self) -> int:
+        """
+        Get the number of unread messages of the conversation. Uses the
+        history state and only reads the history if the conversation is not
+        in the state yet or the number is unknown. Runs in the history thread.
+        """
 
-        # get last read log message
-        last_read = self.get_lastread()
-        is_read = True
+        state = HISTORY_STATE.get(self.conv_key)
+        if state is None or state[2] == UNREAD_UNKNOWN:
+            if not self._has_offsets():
+                # history file was not indexed yet, e.g., on first start with
+                # existing histories. Do not index it just for counting, this
+                # happens when the conversation is opened.
+                return UNREAD_UNKNOWN
+
+            # number of unread messages not in history state, count them in
+            # the history
+            last_read = ""
+            last_read_msg = self.get_lastread()
+            if last_read_msg:
+                last_read = get_fingerprint(
+                    self._create_log_line(last_read_msg))
+            last_logged, unread = self._read_unread(last_read)
+            HISTORY_STATE.set(self.conv_key, last_logged, last_read, unread)
+            return unread
+
+        return state[2]
+
+    def count_unread(self, callback: Callable[[int], None]) -> None:
+        """
+        Count unread messages of the conversation in the history thread and
+        pass the number to callback in the main loop
+        """
+
+        HISTORY_WORKER.submit(self._count_unread, callback=callback)
 
-        with open(self.log_file, encoding='UTF-8', newline="\r\n") as in_file:
-            prev_msg = None
-            for line in in_file:
-                # parse log line and create log message
-                log_msg = self._parse_log_line(line)
-                log_msg.is_read = is_read
+    def _read_lines_before(self, end: int, count: int) -> \
+            Tuple[int, List[str]]:
+        """
+        Read up to count lines before offset end from the history file or,
+        if end is in an archived part of the history, from the archive.
+        Return offset of the first line and the lines.
+        """
 
-                # check if date changed between two messages, and print event
-                if prev_msg and \
-                   prev_msg.tstamp.date() != log_msg.tstamp.date():
+        if self.use_store:
+            return HISTORY_STORE.get_lines_before(self.conv_key, end, count)
+
+        # offsets in the history file start after the archived parts
+        base = self._get_archive().size
+        if end <= base:
+            return self._get_archive().read_lines_before(end, count)
+
+        # search lines backwards from the end in the mapped history file. The
+        # log does not page back through the archive, drop its cache
+        self._get_archive().drop_cache()
+        HISTORY_WRITER.sync_file(self.log_file)
+        start, lines = HISTORY_READER.read_lines_before(self.log_file,
+                                                        end - base, count)
+        return base + start, lines
+
+    def _read_lines_since(self, tstamp: int,
+                          end: int) -> Tuple[int, List[str]]:
+        """
+        Read at least all lines with a timestamp of tstamp or later before
+        offset end from the history file and, if necessary, from the archive.
+        Return offset of the first line and the lines.
+        """
+
+        if self.use_store:
+            return HISTORY_STORE.get_lines_since(self.conv_key, tstamp, end)
+
+        # offsets in the history file start after the archived parts
+        archive = self._get_archive()
+        offsets = self._get_offsets()
+        base = archive.size
+        if not archive.segments or \
+           (offsets.count and tstamp >= offsets.first_tstamp):
+            start = offsets.find_tstamp(tstamp)
+            if base + start >= end:
+                return end, []
+            return base + start, self._read_lines(start, end - base)
+
+        # read archived lines, decompress only segments containing tstamp or
+        # later lines, and add lines of the history file
+        start, lines = archive.read_lines_since(tstamp, min(end, base))
+        if end > base and offsets.count:
+            lines.extend(self._read_lines(0, end - base))
+        return start, lines
+
+    def _get_end(self) -> int:
+        """
+        Get offset of the end of the history file, 0 if the history is empty
+        """
+
+        if self.use_store:
+            return HISTORY_STORE.get_end(self.conv_key)
+
+        base = self._get_archive().size
+        offsets = self._get_offsets()
+        if not offsets.count:
+            return base
+        return base + offsets.size
+
+    def _get_first_tstamp(self) -> int:
+        """
+        Get timestamp of the first message in the history file
+        """
+
+        if self.use_store:
+            return HISTORY_STORE.get_first_tstamp(self.conv_key)
+        if self._get_archive().segments:
+            return self._get_archive().first_tstamp
+        return self._get_offsets().first_tstamp
+
+    def _mark_read(self, msgs: List[LogMessage]) -> None:
+        """
+        Mark messages read from the history file as read or unread depending
+        on the last read message. Messages are read from the end of the file,
+        so msgs are older than all messages in the log.
+        """
+
+        last_read = self.lastread_pending
+        is_read = True
+        if last_read:
+            for index in range(len(msgs) - 1, -1, -1):
+                if last_read.is_equal(msgs[index]):
+                    # found last read message, only newer messages are unread
+                    for log_msg in msgs[:index + 1]:
+                        log_msg.is_read = True
+                    self.lastread_pending = None
+                    return
+            first_tstamp = self._get_first_tstamp()
+            if msgs and self.log_start > 0 and \
+               first_tstamp <= last_read.epoch < msgs[0].epoch:
+                # last read message is in an older part of the file
+                is_read = False
+            else:
+                # last read message is not in the file
+                self.lastread_pending = None
+
+        for log_msg in msgs:
+            log_msg.is_read = is_read
+
+    def _add_date_changes(self, msgs: List[LogMessage],
+                          next_msg: Optional[LogMessage]) -> List[LogMessage]:
+        """
+        Add date change events between messages and between the last message
+        and next_msg
+        """
+
+        log: List[LogMessage] = []
+        prev_epoch, prev_date = -1, None
+        for log_msg in msgs + ([next_msg] if next_msg else []):
+            # check if date changed between two messages, and add event. Only
+            # get the date if the timestamp changed
+            if log_msg.epoch != prev_epoch:
+                date = log_msg.get_date()
+                if prev_date and prev_date != date:
                     date_change_msg = LogMessage(
-                        log_msg.tstamp,
-                        "<event>", (f"<Date changed to "
-                                    f"{log_msg.tstamp.date()}>"), own=True)
+                        log_msg.epoch, "<event>",
+                        f"<Date changed to {date}>", own=True)
                     date_change_msg.is_read = True
-                    self.log.append(date_change_msg)
-                prev_msg = log_msg
+                    log.append(date_change_msg)
+                prev_epoch, prev_date = log_msg.epoch, date
+            if log_msg is not next_msg:
+                log.append(log_msg)
 
-                # add log message to the conversation's log
-                self.log.append(log_msg)
+        return log
 
-                # if this is the last read message, following message will be
-                # marked as unread
-                if last_read and last_read.is_equal(log_msg):
-                    is_read = False
-        if self.log:
+    def _read_log_before(self, end: int) -> List[LogMessage]:
+        """
+        Read the configured number of messages before offset end from the
+        history file
+        """
+
+        count = max(nuqql.config.get_history_setting("load_messages"), 1)
+        self.log_start, lines = self._read_lines_before(end, count)
+        msgs = [self._parse_log_line(line) for line in lines]
+        self._mark_read(msgs)
+        return msgs
+
+    def _read_log(self) -> List[LogMessage]:
+        """
+        Read last messages from the conversation's log file, runs in the
+        history thread
+        """
+
+        # get last read log message
+        self.lastread_pending = self.get_lastread()
+
+        end = self._get_end()
+        if not end:
+            logger.debug("log of conversation %s is empty", self.conv.name)
+            return []
+
+        # read last messages
+        return self._read_log_before(end)
+
+    def _add_log(self, callback: Callable[[int], None],
+                 msgs: List[LogMessage]) -> None:
+        """
+        Add messages read from the conversation's log file to the beginning
+        of the log and pass the number of added log entries to callback
+        """
+
+        self.log_loaded = True
+        log = self._add_date_changes(msgs, None)
+        if log:
             # if there were any log messages in the log file, put a marker in
             # the log where the new messages start
             tstamp = datetime.datetime.now()
@@ -258,7 +543,132 @@ class History:
             new_conv_msg = f"<Started new conversation at {tstamp_str}.>"
             log_msg = LogMessage(tstamp, "<event>", new_conv_msg, own=True)
             log_msg.is_read = True
-            self.log.append(log_msg)
+            log.append(log_msg)
+        self.log[0:0] = log
+        LOG_BUDGET.add(len(log), len(self.log))
+        callback(len(log))
+
+    def init_log_from_file(self, callback: Callable[[int], None]) -> None:
+        """
+        Initialize a conversation's log from the end of the conversation's log
+        file. The messages are read in the history thread and added to the
+        beginning of the log in the main loop, then callback is called with
+        the number of added log entries. Older messages are loaded on demand
+        with load_older().
+        """
+
+        logger.debug("initializing log of conversation %s from file %s",
+                     self.conv.name, self.log_file)
+        HISTORY_WORKER.submit(self._read_log,
+                              callback=functools.partial(self._add_log,
+                                                         callback))
+
+    def _read_older(self, tstamp: int) -> List[LogMessage]:
+        """
+        Read messages from the history file that are older than the messages
+        in the log, runs in the history thread
+        """
+
+        start, lines = self.log_start, []
+        if tstamp != -1:
+            # read all messages from the timestamp on
+            start, lines = self._read_lines_since(tstamp, self.log_start)
+        if lines:
+            self.log_start = start
+            msgs = [self._parse_log_line(line) for line in lines]
+            self._mark_read(msgs)
+            return msgs
+        return self._read_log_before(self.log_start)
+
+    def _add_older(self, callback: Callable[[int], None],
+                   msgs: List[LogMessage]) -> None:
+        """
+        Add older messages read from the history file to the beginning of the
+        log and pass the number of added log entries to callback
+        """
+
+        self.loading = False
+        log = self._add_date_changes(msgs, self.log[0] if self.log else None)
+        self.log[0:0] = log
+        LOG_BUDGET.add(len(log), len(self.log))
+        callback(len(log))
+
+    def load_older(self, callback: Callable[[int], None],
+                   tstamp: int = -1) -> bool:
+        """
+        Load messages from the history file that are older than the messages
+        in the log. The messages are read in the history thread and added to
+        the beginning of the log in the main loop, then callback is called
+        with the number of added log entries. If tstamp is given, load at
+        least all messages back to this timestamp. Return False if there are
+        no older messages or older messages are already being loaded.
+        """
+
+        if not self.log_file or not self.log_loaded or self.log_start == 0 \
+           or self.loading:
+            return False
+
+        logger.debug("loading older messages of conversation %s",
+                     self.conv.name)
+        self.loading = True
+        HISTORY_WORKER.submit(self._read_older, tstamp,
+                              callback=functools.partial(self._add_older,
+                                                         callback))
+        return True
+
+    def _find_start(self, count: int) -> int:
+        """
+        Find offset of the line count lines before the end of the history,
+        runs in the history thread
+        """
+
+        start = self._get_end()
+        while count > 0 and start > 0:
+            start, lines = self._read_lines_before(start, count)
+            if not lines:
+                break
+            count -= len(lines)
+
+        # older messages were removed from the log, drop the archive cache
+        # until the log pages back again
+        self._get_archive().drop_cache()
+        return start
+
+    def _set_log_start(self, start: int) -> None:
+        """
+        Set offset of the first message in the log after log entries were
+        evicted
+        """
+
+        self.log_start = start
+        self.log_loaded = True
+
+    def evict(self, count: int) -> int:
+        """
+        Remove up to count oldest entries from the log to save memory and
+        return the number of removed entries. If the conversation has a
+        history file, they are loaded again on demand with load_older().
+        """
+
+        if self.log_file and (not self.log_loaded or self.loading):
+            # log not loaded from history yet, already evicting, or older
+            # messages are being loaded
+            return 0
+        count = min(count, len(self.log))
+        if count <= 0:
+            return 0
+
+        logger.debug("evicting %d log entries of conversation %s", count,
+                     self.conv.name)
+        kept = sum(1 for log_msg in self.log[count:] if log_msg.in_history)
+        del self.log[:count]
+        LOG_BUDGET.remove(count)
+        if self.log_file:
+            # find start of the kept messages in the history file
+            self.log_loaded = False
+            HISTORY_WORKER.submit(self._find_start, kept,
+                                  callback=self._set_log_start)
+        return count
 
     def log_to_file(self, log_msg: LogMessage) -> None:
         """
@@ -267,12 +677,32 @@ class History:
 
         logger.debug("logging msg to log file of conversation %s: %s",
                      self.conv.name, log_msg)
-        # create line and write it to history
+        # create line and write it to history in history thread
         line = self._create_log_line(log_msg)
-        assert self.logger
-        self.logger.info(line)
+        log_msg.in_history = True
+        HISTORY_WORKER.submit(self._log_line, line, log_msg.own)
+
+    def _log_line(self, line: str, own: bool) -> None:
+        """
+        Write line to history log file and set lastread message if it is an
+        own message, runs in the history thread
+        """
+
+        # write line to history, add it to the offsets index
+        if self.use_store:
+            HISTORY_STORE.append(self.conv_key, line)
+        else:
+            tstamp = int(line[:line.find(" ")])
+            self._rotate(tstamp)
+            offsets = self._get_offsets()
+            offsets.append(len(line.encode()) + 2, tstamp)
+            HISTORY_WRITER.write(self.log_file, line, offsets)
+
+            # add line to the full-text index of all histories
+            HISTORY_INDEX.add(self.conv_key, line)
+        HISTORY_STATE.set_logged(self.conv_key, line)
 
         # assume user read all previous messages when user sends a message and
         # set lastread accordingly
-        if log_msg.own:
-            self.set_lastread(log_msg)
+        if own:
+            self._set_lastread_line(line)
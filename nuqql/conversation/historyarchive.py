@@ -0,0 +1,357 @@
+"""
+History archive: compressed segments of rotated history files
+"""
+
+import array
+import bisect
+import collections
+import gzip
+import logging
+import lzma
+import os
+import shutil
+
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, \
+    Tuple
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FILE_SUFFIX = ".archive"
+
+# file name extensions and open functions of the compression formats
+COMPRESSION_FORMATS: Dict[str, Tuple[str, Callable[..., Any]]] = {
+    "gzip": (".gz", gzip.open),
+    "lzma": (".xz", lzma.open),
+}
+
+# size of chunks read when decompressing segments
+ARCHIVE_CHUNK_SIZE = 1024 * 1024
+
+# maximum size of the decompressed part of a segment kept for paging back
+ARCHIVE_CACHE_SIZE = 1024 * 1024
+
+
+class Segment(NamedTuple):
+    """
+    Archived part of a history file: file name, position of its first byte
+    in the history, uncompressed size, and first and last timestamp
+    """
+
+    file_name: str
+    start: int
+    size: int
+    first_tstamp: int
+    last_tstamp: int
+
+
+def _get_opener(file_name: str) -> Callable[..., Any]:
+    """
+    Get open function for a segment file based on its extension
+    """
+
+    for ext, opener in COMPRESSION_FORMATS.values():
+        if file_name.endswith(ext):
+            return opener
+    return open
+
+
+class HistoryArchive:
+    """
+    Compressed segments of a history file that were split off by rotation.
+    Together with the current history file they form one history: positions
+    in the history are offsets into the concatenation of the uncompressed
+    segments and the history file. Segments are listed in an archive file
+    next to the history file and decompressed as a stream when they are read.
+    """
+
+    def __init__(self, history_file: str) -> None:
+        self.history_file = history_file
+        self.file_name = history_file + ARCHIVE_FILE_SUFFIX
+        self.segments: List[Segment] = []
+
+        # total uncompressed size of all segments, i.e., position of the
+        # first byte of the current history file
+        self.size = 0
+
+        # decompressed part of the segment last read by read_lines_before(),
+        # so paging back through a segment does not decompress it for every
+        # page: segment path and modification time, position of the part in
+        # the history, its data, and the positions of its lines in the data
+        self.cache_key: Optional[Tuple[str, int]] = None
+        self.cache_start = 0
+        self.cache_data = b""
+        self.cache_offsets = array.array("Q")
+
+    @property
+    def first_tstamp(self) -> int:
+        """
+        Timestamp of the first archived line, 0 if there are no segments
+        """
+
+        if not self.segments:
+            return 0
+        return self.segments[0].first_tstamp
+
+    def load(self) -> None:
+        """
+        Load list of segments from archive file
+        """
+
+        self.segments = []
+        self.size = 0
+        try:
+            with open(self.file_name, encoding="UTF-8") as in_file:
+                for line in in_file:
+                    parts = line.split()
+                    if len(parts) != 5:
+                        continue
+                    try:
+                        segment = Segment(parts[0], int(parts[1]),
+                                          int(parts[2]), int(parts[3]),
+                                          int(parts[4]))
+                    except ValueError:
+                        continue
+                    if segment.start != self.size:
+                        logger.error("invalid segment %s in history archive "
+                                     "%s", segment.file_name, self.file_name)
+                        break
+                    self.segments.append(segment)
+                    self.size += segment.size
+        except FileNotFoundError:
+            return
+
+    def _save(self) -> None:
+        """
+        Write list of segments to archive file
+        """
+
+        tmp_file = self.file_name + ".tmp"
+        with open(tmp_file, "w", encoding="UTF-8") as out_file:
+            for segment in self.segments:
+                out_file.write(" ".join(str(part) for part in segment) +
+                               "\n")
+        os.replace(tmp_file, self.file_name)
+
+    def _get_path(self, segment: Segment) -> str:
+        """
+        Get path of a segment file
+        """
+
+        return os.path.join(os.path.dirname(self.history_file),
+                            segment.file_name)
+
+    def rotate(self, compression: str, first_tstamp: int,
+               last_tstamp: int) -> None:
+        """
+        Compress the current history file into a new segment and remove it
+        """
+
+        ext, opener = COMPRESSION_FORMATS.get(compression,
+                                              COMPRESSION_FORMATS["gzip"])
+        size = os.path.getsize(self.history_file)
+        base_name = os.path.basename(self.history_file)
+        segment = Segment(f"{base_name}.{len(self.segments) + 1}{ext}",
+                          self.size, size, first_tstamp, last_tstamp)
+        logger.debug("rotating history file %s into %s", self.history_file,
+                     segment.file_name)
+
+        # write compressed segment, add it to the archive file, remove the
+        # history file
+        path = self._get_path(segment)
+        with open(self.history_file, "rb") as in_file:
+            with opener(path + ".tmp", "wb") as out_file:
+                shutil.copyfileobj(in_file, out_file, ARCHIVE_CHUNK_SIZE)
+        os.replace(path + ".tmp", path)
+        self.segments.append(segment)
+        self.size += size
+        self._save()
+        os.remove(self.history_file)
+
+    def _iter_segment(self, segment: Segment) -> Iterator[Tuple[int, bytes]]:
+        """
+        Decompress segment and iterate over its lines and their positions
+        """
+
+        logger.debug("reading history segment %s", segment.file_name)
+        path = self._get_path(segment)
+        with _get_opener(path)(path, "rb") as in_file:
+            offset = segment.start
+            rest = b""
+            while True:
+                chunk = in_file.read(ARCHIVE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                data = rest + chunk
+                start = 0
+                end = data.find(b"\r\n")
+                while end != -1:
+                    yield offset + start, data[start:end]
+                    start = end + 2
+                    end = data.find(b"\r\n", start)
+                offset += start
+                rest = data[start:]
+
+    def drop_cache(self) -> None:
+        """
+        Drop decompressed part of the last read segment, e.g., if the log
+        does not page back through the archive anymore
+        """
+
+        self.cache_key = None
+        self.cache_start = 0
+        self.cache_data = b""
+        self.cache_offsets = array.array("Q")
+
+    def _read_window(self, segment: Segment, key: Tuple[str, int],
+                     end: int) -> None:
+        """
+        Decompress segment up to position end and cache the complete lines in
+        the last ARCHIVE_CACHE_SIZE bytes before end
+        """
+
+        # keep only the last chunks before end
+        path = self._get_path(segment)
+        chunks: "collections.deque[bytes]" = collections.deque()
+        size = 0
+        pos = 0
+        with _get_opener(path)(path, "rb") as in_file:
+            while pos < end - segment.start:
+                chunk = in_file.read(min(ARCHIVE_CHUNK_SIZE,
+                                         end - segment.start - pos))
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                size += len(chunk)
+                pos += len(chunk)
+                while size - len(chunks[0]) >= ARCHIVE_CACHE_SIZE:
+                    size -= len(chunks.popleft())
+        data = b"".join(chunks)
+
+        # cut data to cache size at the start of a line
+        skip = max(len(data) - ARCHIVE_CACHE_SIZE, 0)
+        if pos - len(data) + skip > 0:
+            skip = data.find(b"\r\n", max(skip - 2, 0)) + 2
+            if skip == 1:
+                # no complete line in the data
+                skip = len(data)
+
+        offsets = array.array("Q")
+        start = skip
+        line_end = data.find(b"\r\n", start)
+        while line_end != -1:
+            offsets.append(start - skip)
+            start = line_end + 2
+            line_end = data.find(b"\r\n", start)
+
+        self.cache_key = key
+        self.cache_start = segment.start + pos - len(data) + skip
+        self.cache_data = data[skip:start]
+        self.cache_offsets = offsets
+
+    def _get_cached_lines(self, end: int, count: int) -> Tuple[int, int]:
+        """
+        Get index of the first and after the last cached line of up to count
+        lines before position end
+        """
+
+        last = bisect.bisect_left(self.cache_offsets, end - self.cache_start)
+        first = max(last - count, 0)
+        return first, last
+
+    def read_lines_before(self, end: int,
+                          count: int) -> Tuple[int, List[str]]:
+        """
+        Read up to count lines before position end from the segment
+        containing end. Return position of the first line and the lines.
+        """
+
+        index = bisect.bisect_left([segment.start for segment in
+                                    self.segments], end) - 1
+        if index < 0:
+            return 0, []
+        segment = self.segments[index]
+
+        # decompress the segment again, unless the cached part of it contains
+        # the lines or all lines before end
+        path = self._get_path(segment)
+        try:
+            key = (path, os.stat(path).st_mtime_ns)
+            first, last = self._get_cached_lines(end, count)
+            if key != self.cache_key or \
+               end > self.cache_start + len(self.cache_data) or \
+               (last - first < count and self.cache_start > segment.start):
+                self._read_window(segment, key, end)
+                first, last = self._get_cached_lines(end, count)
+        except (OSError, EOFError, lzma.LZMAError) as error:
+            logger.error("error reading history segment %s: %s",
+                         segment.file_name, error)
+            self.drop_cache()
+            return segment.start, []
+
+        # get lines from the cached data
+        offsets = self.cache_offsets
+        lines = []
+        for line in range(first, last):
+            line_end = offsets[line + 1] if line + 1 < len(offsets) else \
+                len(self.cache_data)
+            lines.append(self.cache_data[offsets[line]:line_end - 2].decode(
+                errors="replace"))
+        if not lines:
+            return segment.start, lines
+        return self.cache_start + offsets[first], lines
+
+    def read_lines_since(self, tstamp: int,
+                         end: int) -> Tuple[int, List[str]]:
+        """
+        Read at least all lines with a timestamp of tstamp or later before
+        position end from the segments. Return position of the first line and
+        the lines.
+        """
+
+        for index, segment in enumerate(self.segments):
+            if segment.last_tstamp >= tstamp:
+                break
+        else:
+            return end, []
+
+        start = self.segments[index].start
+        lines = []
+        for segment in self.segments[index:]:
+            if segment.start >= end:
+                break
+            try:
+                for offset, line in self._iter_segment(segment):
+                    if offset + len(line) + 2 > end:
+                        break
+                    lines.append(line.decode(errors="replace"))
+            except (OSError, EOFError, lzma.LZMAError) as error:
+                logger.error("error reading history segment %s: %s",
+                             segment.file_name, error)
+        return start, lines
+
+    def iter_lines(self) -> Iterator[str]:
+        """
+        Iterate over the lines of all segments
+        """
+
+        for segment in self.segments:
+            for _offset, line in self._iter_segment(segment):
+                yield line.decode(errors="replace")
+
+    def remove(self) -> None:
+        """
+        Remove all segments and the archive file
+        """
+
+        for segment in self.segments:
+            try:
+                os.remove(self._get_path(segment))
+            except FileNotFoundError:
+                pass
+        try:
+            os.remove(self.file_name)
+        except FileNotFoundError:
+            pass
+        self.segments = []
+        self.size = 0
+        self.drop_cache()
@@ -0,0 +1,381 @@
+"""
+History index: full-text search over the history of all conversations
+"""
+
+import logging
+import os
+import sqlite3
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import nuqql.config
+from .historyarchive import HistoryArchive
+from .historyreader import HISTORY_READER
+from .historystore import HISTORY_STORE
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "/history.db"
+
+# key in files table for messages in the history store
+STORE_KEY = "<store>"
+
+# maximum number of search results
+SEARCH_LIMIT = 20
+
+
+class SearchResult(NamedTuple):
+    """
+    Search result: message in history of a conversation
+    """
+
+    backend: str
+    account: str
+    name: str
+    tstamp: int
+    sender: str
+    msg: str
+    snippet: str
+
+
+def _parse_line(line: str) -> Optional[Tuple[int, str, str, str]]:
+    """
+    Parse line from history file and return timestamp, direction, sender,
+    and message
+    """
+
+    parts = line.split(sep=" ", maxsplit=3)
+    if len(parts) < 4:
+        return None
+    try:
+        tstamp = int(parts[0])
+    except ValueError:
+        return None
+    return tstamp, parts[1], parts[2], parts[3]
+
+
+class HistoryIndex:
+    """
+    Full-text index over the history files of all conversations
+    """
+
+    def __init__(self) -> None:
+        self.conn: Optional[sqlite3.Connection] = None
+
+        # lines written to history files but not added to the index yet
+        self.pending: List[Tuple[str, str]] = []
+
+    def _open(self) -> sqlite3.Connection:
+        """
+        Open index database and make sure tables exist
+        """
+
+        if self.conn:
+            return self.conn
+
+        index_file = self._get_index_file()
+        logger.debug("opening history index %s", index_file)
+        # the connection is only used by one thread at a time, but it is closed
+        # in its own thread on shutdown
+        conn = sqlite3.connect(index_file, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS messages USING fts5("
+                     "msg, conv UNINDEXED, tstamp UNINDEXED, "
+                     "direction UNINDEXED, sender UNINDEXED)")
+        # how much of each conversation's history file is in the index
+        conn.execute("CREATE TABLE IF NOT EXISTS files ("
+                     "conv TEXT PRIMARY KEY, offset INTEGER)")
+        conn.commit()
+        self.conn = conn
+        return conn
+
+    def _open_existing(self) -> Optional[sqlite3.Connection]:
+        """
+        Open index database only if it exists. The index is created by the
+        first search, until then there is nothing to update.
+        """
+
+        if self.conn is None and not os.path.exists(self._get_index_file()):
+            return None
+        return self._open()
+
+    @staticmethod
+    def _get_index_file() -> str:
+        """
+        Get path of the index database
+        """
+
+        return str(nuqql.config.get("dir")) + INDEX_FILE
+
+    @staticmethod
+    def _get_conv_dir() -> str:
+        """
+        Get directory containing the conversation histories
+        """
+
+        return str(nuqql.config.get("dir")) + "/conversation"
+
+    def add(self, conv: str, line: str) -> None:
+        """
+        Add a line written to the history file of the conversation conv to
+        the index. Lines are added to the index in batches by flush(). Files
+        that are not in the index yet are added completely by the next sync.
+        """
+
+        self.pending.append((conv, line))
+
+    def flush(self) -> None:
+        """
+        Add pending lines to the index
+        """
+
+        if not self.pending:
+            return
+
+        pending: Dict[str, List[str]] = {}
+        for conv, line in self.pending:
+            pending.setdefault(conv, []).append(line)
+        self.pending = []
+
+        try:
+            conn = self._open_existing()
+            if conn is None:
+                # no index yet, the lines are added when it is created
+                return
+            logger.debug("adding lines of %d conversations to history index",
+                         len(pending))
+            for conv, lines in pending.items():
+                row = conn.execute("SELECT offset FROM files WHERE conv = ?",
+                                   (conv, )).fetchone()
+                if row is None:
+                    continue
+                offset = row[0]
+                rows = []
+                for line in lines:
+                    offset += len((line + "\r\n").encode())
+                    parsed = _parse_line(line)
+                    if parsed is None:
+                        continue
+                    rows.append((parsed[3], conv, parsed[0], parsed[1],
+                                 parsed[2]))
+                conn.executemany("INSERT INTO messages (msg, conv, tstamp, "
+                                 "direction, sender) VALUES (?, ?, ?, ?, ?)",
+                                 rows)
+                conn.execute("UPDATE files SET offset = ? WHERE conv = ?",
+                             (offset, conv))
+            conn.commit()
+        except sqlite3.Error as error:
+            logger.error("error adding lines to history index: %s", error)
+
+    @staticmethod
+    def _sync_archive(conn: sqlite3.Connection, conv: str,
+                      file_name: str) -> None:
+        """
+        Add archived lines of a history file that is not in the index yet
+        """
+
+        archive = HistoryArchive(file_name)
+        archive.load()
+        if not archive.segments:
+            return
+
+        logger.debug("indexing archived history of conversation %s", conv)
+        rows = []
+        for line in archive.iter_lines():
+            parsed = _parse_line(line)
+            if parsed is None:
+                continue
+            rows.append((parsed[3], conv, parsed[0], parsed[1], parsed[2]))
+        conn.executemany("INSERT INTO messages (msg, conv, tstamp, direction, "
+                         "sender) VALUES (?, ?, ?, ?, ?)", rows)
+
+    def _sync_file(self, conn: sqlite3.Connection, conv: str,
+                   file_name: str) -> None:
+        """
+        Add new lines of a history file to the index
+        """
+
+        row = conn.execute("SELECT offset FROM files WHERE conv = ?",
+                           (conv, )).fetchone()
+        offset = row[0] if row else 0
+        size = os.path.getsize(file_name)
+        if size < offset:
+            # file is shorter than expected, index it again
+            logger.debug("reindexing history of conversation %s", conv)
+            conn.execute("DELETE FROM messages WHERE conv = ?", (conv, ))
+            row = None
+            offset = 0
+        if row is None:
+            # new file, index archived lines first
+            self._sync_archive(conn, conv, file_name)
+            conn.execute("INSERT OR REPLACE INTO files (conv, offset) "
+                         "VALUES (?, 0)", (conv, ))
+        if size == offset:
+            return
+
+        logger.debug("indexing history of conversation %s from offset %d",
+                     conv, offset)
+
+        # only index complete lines
+        end, lines = HISTORY_READER.read_lines(file_name, offset, size)
+        if not lines:
+            return
+        rows = []
+        for line in lines:
+            parsed = _parse_line(line)
+            if parsed is None:
+                continue
+            rows.append((parsed[3], conv, parsed[0], parsed[1], parsed[2]))
+        conn.executemany("INSERT INTO messages (msg, conv, tstamp, direction, "
+                         "sender) VALUES (?, ?, ?, ?, ?)", rows)
+        conn.execute("INSERT OR REPLACE INTO files (conv, offset) "
+                     "VALUES (?, ?)", (conv, end))
+
+    @staticmethod
+    def _sync_store(conn: sqlite3.Connection) -> None:
+        """
+        Add new messages in the history store to the index
+        """
+
+        row = conn.execute("SELECT offset FROM files WHERE conv = ?",
+                           (STORE_KEY, )).fetchone()
+        offset = row[0] if row else 0
+        rows = []
+        for row_id, conv, tstamp, direction, sender, msg in \
+                HISTORY_STORE.get_rows_after(offset):
+            rows.append((msg, conv, tstamp, direction, sender))
+            offset = row_id
+        if not rows:
+            return
+
+        logger.debug("indexing %d messages in history store", len(rows))
+        conn.executemany("INSERT INTO messages (msg, conv, tstamp, direction, "
+                         "sender) VALUES (?, ?, ?, ?, ?)", rows)
+        conn.execute("INSERT OR REPLACE INTO files (conv, offset) "
+                     "VALUES (?, ?)", (STORE_KEY, offset))
+
+    @staticmethod
+    def _switch_sink(conn: sqlite3.Connection, store: bool) -> None:
+        """
+        Clear the index if it contains messages of the history files but the
+        history store is enabled or vice versa, e.g., after the history files
+        were migrated to the store. Messages in both are the same, so they
+        would show up twice in search results. The index is filled again from
+        the enabled history sink.
+        """
+
+        if store:
+            query = "SELECT 1 FROM files WHERE conv != ? LIMIT 1"
+        else:
+            query = "SELECT 1 FROM files WHERE conv = ? LIMIT 1"
+        if conn.execute(query, (STORE_KEY, )).fetchone() is None:
+            return
+
+        logger.debug("history sink changed, clearing history index")
+        conn.execute("DELETE FROM messages")
+        conn.execute("DELETE FROM files")
+
+    def sync(self) -> None:
+        """
+        Add all history files or the history store and new lines in them to
+        the index
+        """
+
+        logger.debug("syncing history index")
+        self.flush()
+        conv_dir = self._get_conv_dir()
+        try:
+            conn = self._open()
+            self._switch_sink(conn, HISTORY_STORE.is_enabled())
+            if HISTORY_STORE.is_enabled():
+                self._sync_store(conn)
+            else:
+                for dir_path, _dirs, files in os.walk(conv_dir):
+                    if "history" not in files:
+                        continue
+                    conv = os.path.relpath(dir_path, conv_dir)
+                    self._sync_file(conn, conv, dir_path + "/history")
+            conn.commit()
+        except (OSError, sqlite3.Error) as error:
+            logger.error("error syncing history index: %s", error)
+
+    def search(self, terms: List[str]) -> List[SearchResult]:
+        """
+        Search the index for messages containing all terms, newest first
+        """
+
+        logger.debug("searching history index for %s", terms)
+        self.sync()
+
+        # quote terms, so special characters are not interpreted by sqlite
+        query = " ".join('"' + term.replace('"', '""') + '"'
+                         for term in terms)
+        results = []
+        try:
+            conn = self._open()
+            rows = conn.execute("SELECT conv, tstamp, sender, msg, "
+                                "snippet(messages, 0, '[', ']', '...', 8) "
+                                "FROM messages WHERE messages MATCH ? "
+                                "ORDER BY tstamp DESC LIMIT ?",
+                                (query, SEARCH_LIMIT)).fetchall()
+        except sqlite3.Error as error:
+            logger.error("error searching history index: %s", error)
+            return results
+
+        for conv, tstamp, sender, msg, snippet in rows:
+            parts = conv.split("/", maxsplit=2)
+            if len(parts) < 3:
+                continue
+            results.append(SearchResult(parts[0], parts[1], parts[2],
+                                        int(tstamp), sender, msg, snippet))
+        return results
+
+    def rotate(self, conv: str, file_name: str) -> None:
+        """
+        Add remaining lines of history file file_name of conversation conv to
+        the index before the file is rotated, and start indexing the new
+        history file from the beginning. Archived lines stay in the index.
+        """
+
+        self.flush()
+        try:
+            conn = self._open_existing()
+            if conn is None:
+                return
+            self._sync_file(conn, conv, file_name)
+            conn.execute("INSERT OR REPLACE INTO files (conv, offset) "
+                         "VALUES (?, 0)", (conv, ))
+            conn.commit()
+        except (OSError, sqlite3.Error) as error:
+            logger.error("error rotating history index: %s", error)
+
+    def remove(self, conv: str) -> None:
+        """
+        Remove history of conversation conv from the index, e.g., because its
+        history file was replaced. It is added again by the next sync.
+        """
+
+        try:
+            conn = self._open_existing()
+            if conn is None:
+                return
+            conn.execute("DELETE FROM messages WHERE conv = ?", (conv, ))
+            conn.execute("DELETE FROM files WHERE conv = ?", (conv, ))
+            conn.commit()
+        except sqlite3.Error as error:
+            logger.error("error removing history from index: %s", error)
+
+    def close(self) -> None:
+        """
+        Close index database
+        """
+
+        self.flush()
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+
+# index of all conversation histories
+HISTORY_INDEX = HistoryIndex()
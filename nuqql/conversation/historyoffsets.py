@@ -0,0 +1,258 @@
+"""
+History offsets: sidecar index with line offsets of a history file
+"""
+
+import bisect
+import logging
+import os
+import struct
+
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+OFFSETS_FILE_SUFFIX = ".idx"
+
+# index file format: header with magic, stride, number of lines, indexed size
+# of the history file, offset of the last line, and first and last timestamp,
+# followed by offset and timestamp of every stride-th line
+OFFSETS_MAGIC = b"NQIX"
+OFFSETS_HEADER = struct.Struct("<4sIQQQqq")
+OFFSETS_ENTRY = struct.Struct("<Qq")
+
+# number of lines between two index entries
+OFFSETS_STRIDE = 256
+
+# size of chunks read when indexing a history file
+INDEX_CHUNK_SIZE = 1024 * 1024
+
+
+def _parse_tstamp(line: bytes) -> int:
+    """
+    Get timestamp of a line in a history file
+    """
+
+    try:
+        return int(line[:line.find(b" ")])
+    except ValueError:
+        return 0
+
+
+class HistoryOffsets:
+    """
+    Offsets of every stride-th line of a history file together with the
+    number of lines and the first and last timestamp. The index is kept in a
+    sidecar file next to the history file, updated on appends and rebuilt if
+    it does not match the history file.
+    """
+
+    def __init__(self, history_file: str) -> None:
+        self.history_file = history_file
+        self.file_name = history_file + OFFSETS_FILE_SUFFIX
+
+        # number of lines, indexed size of history file, offset of last line,
+        # first and last timestamp
+        self.count = 0
+        self.size = 0
+        self.last_offset = 0
+        self.first_tstamp = 0
+        self.last_tstamp = 0
+
+        # offsets and timestamps of every stride-th line
+        self.offsets: List[int] = []
+        self.tstamps: List[int] = []
+
+        # number of index entries in the sidecar file
+        self.saved_entries = 0
+
+    def _reset(self) -> None:
+        """
+        Reset index to an empty history file
+        """
+
+        self.count = 0
+        self.size = 0
+        self.last_offset = 0
+        self.first_tstamp = 0
+        self.last_tstamp = 0
+        self.offsets = []
+        self.tstamps = []
+        self.saved_entries = 0
+
+    def _read(self) -> bool:
+        """
+        Read index from sidecar file, return False if it is invalid
+        """
+
+        try:
+            with open(self.file_name, "rb") as in_file:
+                data = in_file.read()
+        except FileNotFoundError:
+            return False
+
+        if len(data) < OFFSETS_HEADER.size:
+            return False
+        magic, stride, count, size, last_offset, first_tstamp, \
+            last_tstamp = OFFSETS_HEADER.unpack_from(data)
+        num_entries = (len(data) - OFFSETS_HEADER.size) // OFFSETS_ENTRY.size
+        if magic != OFFSETS_MAGIC or stride != OFFSETS_STRIDE or \
+           num_entries != (count + stride - 1) // stride:
+            return False
+
+        self.count, self.size, self.last_offset = count, size, last_offset
+        self.first_tstamp, self.last_tstamp = first_tstamp, last_tstamp
+        self.offsets, self.tstamps = [], []
+        for offset, tstamp in OFFSETS_ENTRY.iter_unpack(
+                data[OFFSETS_HEADER.size:]):
+            self.offsets.append(offset)
+            self.tstamps.append(tstamp)
+        self.saved_entries = len(self.offsets)
+        return True
+
+    def _get_header(self) -> bytes:
+        """
+        Get header of the sidecar file
+        """
+
+        return OFFSETS_HEADER.pack(OFFSETS_MAGIC, OFFSETS_STRIDE, self.count,
+                                   self.size, self.last_offset,
+                                   self.first_tstamp, self.last_tstamp)
+
+    def _write(self) -> None:
+        """
+        Write complete index to sidecar file
+        """
+
+        tmp_file = self.file_name + ".tmp"
+        with open(tmp_file, "wb") as out_file:
+            out_file.write(self._get_header())
+            for entry in zip(self.offsets, self.tstamps):
+                out_file.write(OFFSETS_ENTRY.pack(*entry))
+        os.replace(tmp_file, self.file_name)
+        self.saved_entries = len(self.offsets)
+
+    def _add_line(self, offset: int, length: int, tstamp: int) -> bool:
+        """
+        Add line with length in bytes at offset to the index. Return True if
+        a new index entry was created.
+        """
+
+        new_entry = self.count % OFFSETS_STRIDE == 0
+        if new_entry:
+            self.offsets.append(offset)
+            self.tstamps.append(tstamp)
+        if self.count == 0:
+            self.first_tstamp = tstamp
+        self.count += 1
+        self.size = offset + length
+        self.last_offset = offset
+        self.last_tstamp = tstamp
+        return new_entry
+
+    def _index_file(self) -> None:
+        """
+        Add lines of the history file that are not in the index yet
+        """
+
+        logger.debug("indexing history file %s from offset %d",
+                     self.history_file, self.size)
+        with open(self.history_file, "rb") as in_file:
+            in_file.seek(self.size)
+            offset = self.size
+            rest = b""
+            while True:
+                chunk = in_file.read(INDEX_CHUNK_SIZE)
+                if not chunk:
+                    break
+                data = rest + chunk
+                start = 0
+                end = data.find(b"\r\n")
+                while end != -1:
+                    line = data[start:end]
+                    self._add_line(offset + start, len(line) + 2,
+                                   _parse_tstamp(line))
+                    start = end + 2
+                    end = data.find(b"\r\n", start)
+                offset += start
+                rest = data[start:]
+
+    def load(self) -> None:
+        """
+        Load index from sidecar file and update it, so it matches the history
+        file. Rebuild index if necessary.
+        """
+
+        try:
+            size = os.path.getsize(self.history_file)
+        except FileNotFoundError:
+            self._reset()
+            return
+
+        if not self._read() or self.size > size:
+            logger.debug("rebuilding offsets of history file %s",
+                         self.history_file)
+            self._reset()
+        if self.size < size:
+            try:
+                self._index_file()
+                self._write()
+            except OSError as error:
+                logger.error("error indexing history file %s: %s",
+                             self.history_file, error)
+
+    def append(self, length: int, tstamp: int) -> None:
+        """
+        Add a line with length in bytes appended to the history file. New
+        index entries are written to the sidecar file by save().
+        """
+
+        self._add_line(self.size, length, tstamp)
+
+    def save(self) -> None:
+        """
+        Write new index entries and header to the sidecar file. Lines since
+        the last index entry are indexed again when the index is loaded.
+        """
+
+        if len(self.offsets) == self.saved_entries:
+            return
+
+        try:
+            if not os.path.exists(self.file_name):
+                self._write()
+                return
+            with open(self.file_name, "r+b") as out_file:
+                out_file.seek(OFFSETS_HEADER.size +
+                              self.saved_entries * OFFSETS_ENTRY.size)
+                for entry in zip(self.offsets[self.saved_entries:],
+                                 self.tstamps[self.saved_entries:]):
+                    out_file.write(OFFSETS_ENTRY.pack(*entry))
+                out_file.seek(0)
+                out_file.write(self._get_header())
+            self.saved_entries = len(self.offsets)
+        except OSError as error:
+            logger.error("error writing offsets of history file %s: %s",
+                         self.history_file, error)
+
+    def remove(self) -> None:
+        """
+        Remove sidecar file and reset index, e.g., after the history file was
+        rotated
+        """
+
+        self._reset()
+        try:
+            os.remove(self.file_name)
+        except FileNotFoundError:
+            pass
+
+    def find_tstamp(self, tstamp: int) -> int:
+        """
+        Find offset of the index entry before the first line with a timestamp
+        of at least tstamp, assuming the lines are sorted by timestamp
+        """
+
+        if not self.offsets:
+            return 0
+        entry = max(bisect.bisect_left(self.tstamps, tstamp) - 1, 0)
+        return self.offsets[entry]
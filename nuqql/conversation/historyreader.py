@@ -0,0 +1,158 @@
+"""
+History reader: reads lines from the history files of all conversations
+"""
+
+import collections
+import logging
+import mmap
+import os
+
+from typing import List, Optional, Tuple
+
+import nuqql.config
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryReader:
+    """
+    Reader for history files with a pool of memory mapped files. Line
+    boundaries are searched directly in the mapped files, so reading the end
+    of a file, a range of lines, or searching lines backwards does not need
+    any read buffers and only copies the lines that are returned. Files are
+    mapped on the first read and mapped again if they grew. The least
+    recently used files are unmapped if there are too many mapped files.
+    History files must only be appended to while they are mapped; files that
+    are rotated or removed must be closed first.
+    """
+
+    def __init__(self) -> None:
+        self.maps: "collections.OrderedDict[str, mmap.mmap]" = \
+            collections.OrderedDict()
+
+    @staticmethod
+    def _get_max_files() -> int:
+        """
+        Get maximum number of mapped history files
+        """
+
+        return max(nuqql.config.get_history_setting("max_open_files"), 1)
+
+    def _get_map(self, file_name: str, size: int = -1) -> Optional[mmap.mmap]:
+        """
+        Get mapped file for file_name that contains at least size bytes, map
+        it if necessary. If size is not given, make sure the complete file is
+        mapped. Return None if the file is empty or does not exist.
+        """
+
+        # file already mapped and big enough, mark it as recently used
+        file_map = self.maps.get(file_name)
+        if file_map is not None:
+            if size == -1:
+                try:
+                    size = os.path.getsize(file_name)
+                except FileNotFoundError:
+                    size = 0
+            if len(file_map) >= size:
+                self.maps.move_to_end(file_name)
+                return file_map
+            self.close_file(file_name)
+
+        # unmap least recently used files
+        max_files = self._get_max_files()
+        while len(self.maps) >= max_files:
+            old_name, old_map = self.maps.popitem(last=False)
+            logger.debug("unmapping history file %s", old_name)
+            old_map.close()
+
+        # map file
+        try:
+            with open(file_name, "rb") as in_file:
+                if os.fstat(in_file.fileno()).st_size == 0:
+                    return None
+                logger.debug("mapping history file %s", file_name)
+                file_map = mmap.mmap(in_file.fileno(), 0,
+                                     access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+        self.maps[file_name] = file_map
+        return file_map
+
+    @staticmethod
+    def _split_lines(data: bytes) -> List[str]:
+        """
+        Split data containing complete lines without the last line break
+        into lines
+        """
+
+        return [line.decode(errors="replace")
+                for line in data.split(b"\r\n")]
+
+    def read_lines(self, file_name: str, start: int,
+                   end: int = -1) -> Tuple[int, List[str]]:
+        """
+        Read complete lines between offsets start and end, or the end of the
+        file, from history file file_name. Return offset after the last line
+        and the lines.
+        """
+
+        file_map = self._get_map(file_name, end)
+        if file_map is None:
+            return start, []
+        if end == -1 or end > len(file_map):
+            end = len(file_map)
+
+        # ignore incomplete last line
+        line_end = file_map.rfind(b"\r\n", start, end)
+        if line_end == -1:
+            return start, []
+        return line_end + 2, self._split_lines(file_map[start:line_end])
+
+    def read_lines_before(self, file_name: str, end: int,
+                          count: int) -> Tuple[int, List[str]]:
+        """
+        Read up to count complete lines before offset end from history file
+        file_name. Return offset of the first line and the lines.
+        """
+
+        file_map = self._get_map(file_name, end)
+        if file_map is None:
+            return 0, []
+        end = min(end, len(file_map))
+
+        # ignore incomplete last line, then search line breaks backwards
+        # until count lines are found or the file starts
+        line_end = file_map.rfind(b"\r\n", 0, end)
+        if line_end == -1:
+            return 0, []
+        start = line_end
+        for _ in range(count):
+            start = file_map.rfind(b"\r\n", 0, start)
+            if start == -1:
+                break
+        start = start + 2 if start != -1 else 0
+        return start, self._split_lines(file_map[start:line_end])
+
+    def close_file(self, file_name: str) -> None:
+        """
+        Unmap history file file_name, e.g., before it is rotated
+        """
+
+        file_map = self.maps.pop(file_name, None)
+        if file_map is not None:
+            logger.debug("unmapping history file %s", file_name)
+            file_map.close()
+
+    def close(self) -> None:
+        """
+        Unmap all history files
+        """
+
+        logger.debug("unmapping all history files")
+        while self.maps:
+            _file_name, file_map = self.maps.popitem()
+            file_map.close()
+
+
+# reader for the history files of all conversations
+HISTORY_READER = HistoryReader()
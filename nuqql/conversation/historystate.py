@@ -0,0 +1,165 @@
+"""
+History state: last logged and last read message and number of unread
+messages of all conversations
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+from typing import Any, Dict, List, Optional
+
+import nuqql.config
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = "/history.state"
+
+
+def get_fingerprint(line: str) -> str:
+    """
+    Get fingerprint of a message from its line in history file format. The
+    direction is ignored, so a message and its last read entry match.
+    """
+
+    parts = line.split(sep=" ", maxsplit=3)
+    data = f"{parts[0]} {parts[2]} {parts[3]}".encode()
+    return hashlib.sha1(data).hexdigest()[:16]
+
+
+# number of unread messages in a state that is not known and must be counted
+# in the history
+UNREAD_UNKNOWN = -1
+
+
+def _is_valid(state: Any) -> bool:
+    """
+    Check if state read from the state file is valid
+    """
+
+    return isinstance(state, list) and len(state) == 3 and \
+        isinstance(state[0], str) and isinstance(state[1], str) and \
+        isinstance(state[2], int)
+
+
+class HistoryState:
+    """
+    Fingerprints of the last logged and last read message and the number of
+    unread messages of all conversations. The state is kept in memory and
+    written to a single state file when it changed, so counting unread
+    messages does not need to read the history of each conversation.
+    """
+
+    def __init__(self) -> None:
+        # conversation -> fingerprints of last logged and last read message,
+        # number of unread messages
+        self.states: Dict[str, List[Any]] = {}
+        self.loaded = False
+        self.changed = False
+
+    def _load(self) -> None:
+        """
+        Load state from state file if necessary
+        """
+
+        if self.loaded:
+            return
+        self.loaded = True
+
+        state_file = str(nuqql.config.get("dir")) + STATE_FILE
+        try:
+            with open(state_file, encoding="UTF-8") as in_file:
+                states = json.load(in_file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as error:
+            logger.error("error reading history state %s: %s", state_file,
+                         error)
+            return
+        if isinstance(states, dict):
+            # states of older versions without unread counts are dropped and
+            # created again from the history
+            self.states = {conv: state for conv, state in states.items()
+                           if _is_valid(state)}
+
+    def get(self, conv: str) -> Optional[List[Any]]:
+        """
+        Get fingerprints of last logged and last read message and number of
+        unread messages of conversation conv, None if the conversation is not
+        in the state yet
+        """
+
+        self._load()
+        return self.states.get(conv)
+
+    def set(self, conv: str, last_logged: str, last_read: str,
+            unread: int) -> None:
+        """
+        Set fingerprints of last logged and last read message and number of
+        unread messages of conversation conv
+        """
+
+        self._load()
+        self.states[conv] = [last_logged, last_read, unread]
+        self.changed = True
+
+    def set_logged(self, conv: str, line: str) -> None:
+        """
+        Set last logged message of conversation conv from a line, the message
+        is unread until set_read() is called
+        """
+
+        self._load()
+        state = self.states.get(conv)
+        if state is None:
+            # conversation not in state yet, count unread messages in the
+            # history when they are requested
+            return
+        state[0] = get_fingerprint(line)
+        if state[2] != UNREAD_UNKNOWN:
+            state[2] += 1
+        self.changed = True
+
+    def set_read(self, conv: str, line: str) -> None:
+        """
+        Set last read message of conversation conv from a line. Messages
+        after it are unread.
+        """
+
+        self._load()
+        state = self.states.get(conv)
+        if state is None:
+            return
+        state[1] = get_fingerprint(line)
+        if state[1] == state[0]:
+            state[2] = 0
+        else:
+            # last read message is not the last logged message, count unread
+            # messages in the history when they are requested
+            state[2] = UNREAD_UNKNOWN
+        self.changed = True
+
+    def save(self) -> None:
+        """
+        Write state to state file if it changed, replace the old file
+        atomically
+        """
+
+        if not self.changed:
+            return
+        self.changed = False
+
+        state_file = str(nuqql.config.get("dir")) + STATE_FILE
+        tmp_file = state_file + ".tmp"
+        try:
+            with open(tmp_file, "w", encoding="UTF-8") as out_file:
+                json.dump(self.states, out_file, separators=(",", ":"))
+            os.replace(tmp_file, state_file)
+        except OSError as error:
+            logger.error("error writing history state %s: %s", state_file,
+                         error)
+
+
+# state of the history of all conversations
+HISTORY_STATE = HistoryState()
@@ -0,0 +1,297 @@
+"""
+History store: optional SQLite database for the history of all conversations
+"""
+
+import logging
+import sqlite3
+
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import nuqql.config
+
+logger = logging.getLogger(__name__)
+
+STORE_FILE = "/history.sqlite"
+
+# number of pending messages that triggers writing them to the database
+STORE_BATCH_SIZE = 256
+
+# database synchronous modes for the history durability levels
+SYNCHRONOUS_MODES = {
+    "none": "OFF",
+    "flush": "NORMAL",
+    "fsync": "FULL",
+}
+
+
+def _parse_line(line: str) -> Tuple[int, str, str, str]:
+    """
+    Parse line in history file format and return timestamp, direction,
+    sender, and message
+    """
+
+    parts = line.split(sep=" ", maxsplit=3)
+    return int(parts[0]), parts[1], parts[2], parts[3]
+
+
+def _create_line(row: Tuple) -> str:
+    """
+    Create line in history file format from timestamp, direction, sender, and
+    message in a database row
+    """
+
+    tstamp, direction, sender, msg = row
+    return f"{tstamp} {direction} {sender} {msg}"
+
+
+class HistoryStore:
+    """
+    SQLite database containing the messages and last read messages of all
+    conversations. Messages are identified by increasing row ids and written
+    to the database in batches.
+    """
+
+    def __init__(self) -> None:
+        self.conn: Optional[sqlite3.Connection] = None
+
+        # messages and last read messages not written to the database yet
+        self.pending: List[Tuple[str, int, str, str, str]] = []
+        self.pending_lastread: Dict[str, Tuple[int, str, str, str]] = {}
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """
+        Check if the history is stored in the database instead of text files
+        """
+
+        return nuqql.config.get("history")["store"] == "sqlite"
+
+    @staticmethod
+    def _get_synchronous() -> str:
+        """
+        Get database synchronous mode matching the history durability
+        """
+
+        durability = nuqql.config.get("history")["durability"]
+        return SYNCHRONOUS_MODES.get(durability, "NORMAL")
+
+    def _open(self) -> sqlite3.Connection:
+        """
+        Open database and make sure tables exist
+        """
+
+        if self.conn:
+            return self.conn
+
+        store_file = str(nuqql.config.get("dir")) + STORE_FILE
+        logger.debug("opening history store %s", store_file)
+        # the connection is only used by one thread at a time, but it is closed
+        # in its own thread on shutdown
+        conn = sqlite3.connect(store_file, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=" + self._get_synchronous())
+        conn.execute("CREATE TABLE IF NOT EXISTS messages ("
+                     "id INTEGER PRIMARY KEY, conv TEXT, tstamp INTEGER, "
+                     "direction TEXT, sender TEXT, msg TEXT)")
+        conn.execute("CREATE INDEX IF NOT EXISTS messages_conv "
+                     "ON messages (conv)")
+        conn.execute("CREATE INDEX IF NOT EXISTS messages_conv_tstamp "
+                     "ON messages (conv, tstamp)")
+        conn.execute("CREATE TABLE IF NOT EXISTS lastread ("
+                     "conv TEXT PRIMARY KEY, tstamp INTEGER, "
+                     "direction TEXT, sender TEXT, msg TEXT)")
+        conn.commit()
+        self.conn = conn
+        return conn
+
+    def flush(self) -> None:
+        """
+        Write pending messages and last read messages to the database
+        """
+
+        if not self.pending and not self.pending_lastread:
+            return
+
+        logger.debug("writing %d messages to history store",
+                     len(self.pending))
+        try:
+            conn = self._open()
+            conn.executemany("INSERT INTO messages (conv, tstamp, direction, "
+                             "sender, msg) VALUES (?, ?, ?, ?, ?)",
+                             self.pending)
+            conn.executemany("INSERT OR REPLACE INTO lastread (conv, tstamp, "
+                             "direction, sender, msg) VALUES (?, ?, ?, ?, ?)",
+                             [(conv, ) + row for conv, row in
+                              self.pending_lastread.items()])
+            conn.commit()
+        except sqlite3.Error as error:
+            logger.error("error writing to history store: %s", error)
+        self.pending = []
+        self.pending_lastread = {}
+
+    def append(self, conv: str, line: str) -> None:
+        """
+        Add line in history file format to the history of conversation conv
+        """
+
+        self.pending.append((conv, ) + _parse_line(line))
+        if len(self.pending) >= STORE_BATCH_SIZE:
+            self.flush()
+
+    def get_lines_before(self, conv: str, end: int,
+                         count: int) -> Tuple[int, List[str]]:
+        """
+        Get up to count lines before row id end from the history of
+        conversation conv. Return row id of the first line or 0 if there are
+        no older lines, and the lines.
+        """
+
+        self.flush()
+        rows = self._open().execute(
+            "SELECT id, tstamp, direction, sender, msg FROM messages "
+            "WHERE conv = ? AND id < ? ORDER BY id DESC LIMIT ?",
+            (conv, end, count)).fetchall()
+        rows.reverse()
+        if len(rows) < count:
+            return 0, [_create_line(row[1:]) for row in rows]
+        return rows[0][0], [_create_line(row[1:]) for row in rows]
+
+    def get_lines_since(self, conv: str, tstamp: int,
+                        end: int) -> Tuple[int, List[str]]:
+        """
+        Get all lines with a timestamp of at least tstamp before row id end
+        from the history of conversation conv. Return row id of the first line
+        and the lines.
+        """
+
+        self.flush()
+        conn = self._open()
+        row = conn.execute("SELECT min(id) FROM messages WHERE conv = ? AND "
+                           "tstamp >= ? AND id < ?",
+                           (conv, tstamp, end)).fetchone()
+        if row[0] is None:
+            return end, []
+        rows = conn.execute(
+            "SELECT tstamp, direction, sender, msg FROM messages "
+            "WHERE conv = ? AND id >= ? AND id < ? ORDER BY id",
+            (conv, row[0], end)).fetchall()
+        return row[0], [_create_line(row) for row in rows]
+
+    def get_end(self, conv: str) -> int:
+        """
+        Get row id after the last line in the history of conversation conv,
+        or 0 if the history is empty
+        """
+
+        self.flush()
+        row = self._open().execute(
+            "SELECT max(id) FROM messages WHERE conv = ?", (conv, )).fetchone()
+        if row[0] is None:
+            return 0
+        return row[0] + 1
+
+    def get_first_tstamp(self, conv: str) -> int:
+        """
+        Get timestamp of the first line in the history of conversation conv
+        """
+
+        self.flush()
+        row = self._open().execute(
+            "SELECT tstamp FROM messages WHERE conv = ? ORDER BY id LIMIT 1",
+            (conv, )).fetchone()
+        if row is None:
+            return 0
+        return row[0]
+
+    def get_last_line(self, conv: str) -> Optional[str]:
+        """
+        Get last line in the history of conversation conv
+        """
+
+        self.flush()
+        row = self._open().execute(
+            "SELECT tstamp, direction, sender, msg FROM messages "
+            "WHERE conv = ? ORDER BY id DESC LIMIT 1", (conv, )).fetchone()
+        if row is None:
+            return None
+        return _create_line(row)
+
+    def get_lastread(self, conv: str) -> Optional[str]:
+        """
+        Get last read message of conversation conv as a line
+        """
+
+        if conv in self.pending_lastread:
+            return _create_line(self.pending_lastread[conv])
+        row = self._open().execute(
+            "SELECT tstamp, direction, sender, msg FROM lastread "
+            "WHERE conv = ?", (conv, )).fetchone()
+        if row is None:
+            return None
+        return _create_line(row)
+
+    def set_lastread(self, conv: str, line: str) -> None:
+        """
+        Set last read message of conversation conv from a line
+        """
+
+        self.pending_lastread[conv] = _parse_line(line)
+
+    def get_convs(self) -> List[str]:
+        """
+        Get all conversations in the database
+        """
+
+        self.flush()
+        rows = self._open().execute(
+            "SELECT DISTINCT conv FROM messages UNION "
+            "SELECT conv FROM lastread").fetchall()
+        return [row[0] for row in rows]
+
+    def get_lines(self, conv: str) -> Iterator[str]:
+        """
+        Get all lines in the history of conversation conv
+        """
+
+        self.flush()
+        for row in self._open().execute(
+                "SELECT tstamp, direction, sender, msg FROM messages "
+                "WHERE conv = ? ORDER BY id", (conv, )):
+            yield _create_line(row)
+
+    def get_rows_after(self, start: int) -> Iterator[Tuple]:
+        """
+        Get id, conversation, timestamp, direction, sender, and message of all
+        messages with a row id greater than start
+        """
+
+        self.flush()
+        yield from self._open().execute(
+            "SELECT id, conv, tstamp, direction, sender, msg FROM messages "
+            "WHERE id > ? ORDER BY id", (start, ))
+
+    def delete(self, conv: str) -> None:
+        """
+        Delete history and last read message of conversation conv
+        """
+
+        self.flush()
+        conn = self._open()
+        conn.execute("DELETE FROM messages WHERE conv = ?", (conv, ))
+        conn.execute("DELETE FROM lastread WHERE conv = ?", (conv, ))
+        conn.commit()
+
+    def close(self) -> None:
+        """
+        Write pending messages and close database
+        """
+
+        if self.conn or self.pending or self.pending_lastread:
+            self.flush()
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+
+# store for the history of all conversations
+HISTORY_STORE = HistoryStore()
@@ -0,0 +1,249 @@
+"""
+History worker: background thread for the history I/O of all conversations
+"""
+
+import logging
+import queue
+import threading
+import time
+
+from typing import Any, Callable, List, Optional, Tuple
+
+from .historyindex import HISTORY_INDEX
+from .historyreader import HISTORY_READER
+from .historystore import HISTORY_STORE
+from .historywriter import HISTORY_WRITER
+
+logger = logging.getLogger(__name__)
+
+# time in seconds the thread waits for jobs before it checks if pending
+# history writes are due
+WORKER_TIMEOUT = 0.1
+
+# time in seconds call() waits for the result of a job
+WORKER_CALL_TIMEOUT = 30
+
+Job = Tuple[Callable[..., Any], Tuple, Optional[Callable[[Any], None]]]
+
+
+class HistoryWorker:
+    """
+    Background thread that runs history jobs in the order they are submitted,
+    so reads always see the writes submitted before them. Results of jobs are
+    passed to callbacks in the main loop. The history writer, store, index,
+    and state are only used from this thread while it is running. Jobs
+    submitted after the thread was told to stop run in the calling thread.
+    """
+
+    def __init__(self) -> None:
+        self.jobs: "queue.Queue[Optional[Job]]" = queue.Queue()
+        self.results: "queue.Queue[Tuple[Callable[[Any], None], Any]]" = \
+            queue.Queue()
+        self.thread: Optional[threading.Thread] = None
+        self.stopping = False
+
+    def _start(self) -> None:
+        """
+        Start thread if it is not running yet
+        """
+
+        if self.thread:
+            return
+
+        logger.debug("starting history thread")
+        self.thread = threading.Thread(target=self._run,
+                                       name="nuqql-history", daemon=True)
+        self.thread.start()
+
+    def _run(self) -> None:
+        """
+        Main loop of the thread: run jobs and commit pending history writes
+        """
+
+        while True:
+            try:
+                job = self.jobs.get(timeout=WORKER_TIMEOUT)
+            except queue.Empty:
+                HISTORY_WRITER.commit_if_due()
+                continue
+            if job is None:
+                break
+
+            func, args, callback = job
+            try:
+                result = func(*args)
+            except Exception:   # pylint: disable=broad-except
+                logger.exception("error in history job %s", func)
+                continue
+            if callback:
+                self.results.put((callback, result))
+            HISTORY_WRITER.commit_if_due()
+
+    def _run_inline(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run job func(*args) in the calling thread while the thread is
+        stopping. Wait until the thread finished all jobs submitted before and
+        closed the history, run the job, and close the history again.
+        """
+
+        logger.debug("running history job %s while history thread stops",
+                     func)
+        if self.thread:
+            self.thread.join(WORKER_CALL_TIMEOUT)
+            if self.thread.is_alive():
+                logger.error("history thread did not stop, dropping history "
+                             "job %s", func)
+                raise TimeoutError(f"history job {func} timed out")
+        try:
+            return func(*args)
+        finally:
+            self._close()
+
+    def submit(self, func: Callable[..., Any], *args: Any,
+               callback: Optional[Callable[[Any], None]] = None) -> None:
+        """
+        Submit job func(*args) to the thread. If callback is given, it is
+        called with the result of the job in the main loop. If the thread is
+        stopping, run the job in the calling thread.
+        """
+
+        if self.stopping:
+            try:
+                result = self._run_inline(func, *args)
+            except Exception:   # pylint: disable=broad-except
+                logger.exception("error in history job %s", func)
+                return
+            if callback:
+                self.results.put((callback, result))
+            return
+
+        self._start()
+        self.jobs.put((func, args, callback))
+
+    def call(self, func: Callable[..., Any], *args: Any,
+             timeout: float = WORKER_CALL_TIMEOUT) -> Any:
+        """
+        Run job func(*args) in the thread after all jobs submitted before,
+        wait for it at most timeout seconds and return its result. If the
+        thread is stopping, run the job in the calling thread. Raise
+        TimeoutError if the job did not finish in time.
+        """
+
+        if self.stopping:
+            return self._run_inline(func, *args)
+
+        done = threading.Event()
+        result: List[Any] = [None, None]
+
+        def run_job() -> None:
+            try:
+                result[0] = func(*args)
+            except Exception as error:  # pylint: disable=broad-except
+                result[1] = error
+            finally:
+                done.set()
+
+        self.submit(run_job)
+        if not done.wait(timeout):
+            logger.error("history job %s did not finish in %s seconds", func,
+                         timeout)
+            raise TimeoutError(f"history job {func} timed out")
+        if result[1]:
+            raise result[1]
+        return result[0]
+
+    def handle_results(self) -> None:
+        """
+        Pass results of finished jobs to their callbacks, called in the main
+        loop
+        """
+
+        while True:
+            try:
+                callback, result = self.results.get_nowait()
+            except queue.Empty:
+                return
+            callback(result)
+
+    def wait(self) -> None:
+        """
+        Wait until all jobs submitted so far are finished and pass their
+        results to their callbacks
+        """
+
+        # run an empty job, so all jobs submitted before are finished
+        self.call(lambda: None)
+        self.handle_results()
+
+    @staticmethod
+    def _close_timed(name: str, func: Callable[[], None]) -> None:
+        """
+        Run close function func and log how long it took
+        """
+
+        start = time.monotonic()
+        try:
+            func()
+        except Exception:   # pylint: disable=broad-except
+            logger.exception("error closing %s", name)
+        logger.debug("closed %s in %.3f seconds", name,
+                     time.monotonic() - start)
+
+    def _close(self) -> None:
+        """
+        Commit pending history writes, close history files and databases. The
+        full-text index and the history store write their pending data in
+        their own threads while the history files are written.
+        """
+
+        threads = []
+        for name, func in (("history index", HISTORY_INDEX.close),
+                           ("history store", HISTORY_STORE.close)):
+            thread = threading.Thread(target=self._close_timed,
+                                      args=(name, func),
+                                      name="nuqql-history-close", daemon=True)
+            thread.start()
+            threads.append(thread)
+        self._close_timed("history files", HISTORY_WRITER.close)
+        self._close_timed("history reader", HISTORY_READER.close)
+        for thread in threads:
+            thread.join()
+
+    def begin_stop(self) -> None:
+        """
+        Let the thread finish all submitted jobs, close all history files and
+        databases, and stop without waiting for it, e.g., to close the
+        history while other parts of nuqql shut down
+        """
+
+        if not self.thread or self.stopping:
+            return
+
+        logger.debug("stopping history thread")
+        self.jobs.put((self._close, (), None))
+        self.jobs.put(None)
+        self.stopping = True
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """
+        Finish all submitted jobs, close all history files and databases, and
+        stop the thread. Wait at most timeout seconds if timeout is given.
+        Return whether the thread stopped in time.
+        """
+
+        if not self.thread:
+            self._close()
+            return True
+
+        self.begin_stop()
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            logger.error("history thread did not stop in time")
+            return False
+        self.thread = None
+        self.stopping = False
+        return True
+
+
+# worker for the history I/O of all conversations
+HISTORY_WORKER = HistoryWorker()
@@ -0,0 +1,280 @@
+"""
+History writer: writes lines to the history files of all conversations
+"""
+
+import collections
+import logging
+import os
+import pathlib
+import time
+
+from typing import Dict, List, Optional, Set, TextIO, TYPE_CHECKING
+
+import nuqql.config
+from .historyindex import HISTORY_INDEX
+from .historystate import HISTORY_STATE
+from .historystore import HISTORY_STORE
+
+if TYPE_CHECKING:   # imports for typing
+    from .historyoffsets import HistoryOffsets  # noqa
+
+logger = logging.getLogger(__name__)
+
+# durability levels of history writes
+DURABILITY_LEVELS = ("none", "flush", "fsync")
+
+
+class HistoryWriter:
+    """
+    Writer for history files with a pool of open files. Files are opened on
+    the first write and the least recently used files are closed if there are
+    too many open files. Writes are collected and committed in groups after
+    the configured flush interval or if too much data is pending.
+    """
+
+    def __init__(self) -> None:
+        self.files: "collections.OrderedDict[str, TextIO]" = \
+            collections.OrderedDict()
+
+        # pending lines of history files, pending contents of files that are
+        # replaced completely (lastread files), and offsets indexes of the
+        # history files with pending lines
+        self.pending: Dict[str, List[str]] = {}
+        self.pending_replace: Dict[str, str] = {}
+        self.pending_offsets: Set["HistoryOffsets"] = set()
+        self.pending_size = 0
+        self.pending_since = 0.0
+
+    @staticmethod
+    def _get_max_files() -> int:
+        """
+        Get maximum number of open history files
+        """
+
+        return max(nuqql.config.get_history_setting("max_open_files"), 1)
+
+    @staticmethod
+    def _get_durability() -> str:
+        """
+        Get durability of history writes
+        """
+
+        durability = nuqql.config.get("history")["durability"]
+        if durability not in DURABILITY_LEVELS:
+            logger.error("invalid history durability %s", durability)
+            return "flush"
+        return durability
+
+    def _get_file(self, file_name: str) -> TextIO:
+        """
+        Get open file for file_name, open it if necessary
+        """
+
+        # file already open, mark it as recently used
+        out_file = self.files.get(file_name)
+        if out_file:
+            self.files.move_to_end(file_name)
+            return out_file
+
+        # close least recently used files
+        max_files = self._get_max_files()
+        while len(self.files) >= max_files:
+            old_name, old_file = self.files.popitem(last=False)
+            logger.debug("closing history file %s", old_name)
+            old_file.close()
+
+        # open file, make sure directory exists
+        logger.debug("opening history file %s", file_name)
+        pathlib.Path(file_name).parent.mkdir(parents=True, exist_ok=True)
+        out_file = open(file_name, "a", encoding="UTF-8", newline="")
+        self.files[file_name] = out_file
+        return out_file
+
+    def _add_pending(self, size: int) -> None:
+        """
+        Account for size bytes of new pending data, commit if there is too
+        much pending data
+        """
+
+        if not self.pending_since:
+            self.pending_since = time.monotonic()
+        self.pending_size += size
+        if self.pending_size >= \
+           nuqql.config.get_history_setting("flush_size"):
+            self.commit()
+
+    def write(self, file_name: str, line: str,
+              offsets: Optional["HistoryOffsets"] = None) -> None:
+        """
+        Append line to history file file_name. The offsets index of the file
+        is saved after the line is written.
+        """
+
+        self.pending.setdefault(file_name, []).append(line + "\r\n")
+        if offsets:
+            self.pending_offsets.add(offsets)
+        self._add_pending(len(line) + 2)
+
+    def replace(self, file_name: str, data: str) -> None:
+        """
+        Replace contents of file file_name with data
+        """
+
+        self.pending_replace[file_name] = data
+        self._add_pending(len(data))
+
+    def get_pending_replace(self, file_name: str) -> Optional[str]:
+        """
+        Get pending contents of file file_name, None if there are none
+        """
+
+        return self.pending_replace.get(file_name)
+
+    def _write_pending(self, file_name: str, durability: str) -> None:
+        """
+        Write pending lines of history file file_name
+        """
+
+        lines = self.pending.pop(file_name, None)
+        if not lines:
+            return
+
+        try:
+            out_file = self._get_file(file_name)
+            out_file.write("".join(lines))
+            if durability != "none":
+                out_file.flush()
+            if durability == "fsync":
+                os.fsync(out_file.fileno())
+        except OSError as error:
+            logger.error("error writing history file %s: %s", file_name,
+                         error)
+
+    @staticmethod
+    def _write_replace(file_name: str, data: str, durability: str) -> None:
+        """
+        Replace contents of file file_name with data. Write a temporary file
+        and replace the file atomically, so it is never left empty or
+        incomplete. Sync the temporary file only with fsync durability.
+        """
+
+        try:
+            pathlib.Path(file_name).parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = file_name + ".tmp"
+            with open(tmp_file, "w", encoding="UTF-8", newline="") as out_file:
+                out_file.write(data)
+                if durability == "fsync":
+                    out_file.flush()
+                    os.fsync(out_file.fileno())
+            os.replace(tmp_file, file_name)
+        except OSError as error:
+            logger.error("error writing file %s: %s", file_name, error)
+
+    def _commit_files(self) -> None:
+        """
+        Write pending data to the history files and the offsets indexes
+        """
+
+        durability = self._get_durability()
+        if self.pending or self.pending_replace:
+            logger.debug("committing %d bytes to %d history files",
+                         self.pending_size,
+                         len(self.pending) + len(self.pending_replace))
+        for file_name in list(self.pending):
+            self._write_pending(file_name, durability)
+        for file_name, data in self.pending_replace.items():
+            self._write_replace(file_name, data, durability)
+        self.pending_replace = {}
+        for offsets in self.pending_offsets:
+            offsets.save()
+        self.pending_offsets = set()
+        self.pending_size = 0
+        self.pending_since = 0.0
+
+    def commit(self) -> None:
+        """
+        Write all pending data to the history files, the offsets indexes, the
+        full-text index, the history store, and the history state
+        """
+
+        self._commit_files()
+        HISTORY_INDEX.flush()
+        HISTORY_STORE.flush()
+        HISTORY_STATE.save()
+
+    def _has_pending(self) -> bool:
+        """
+        Check if there is pending data in the writer, the full-text index, the
+        history store, or the history state
+        """
+
+        return bool(self.pending_size or HISTORY_INDEX.pending or
+                    HISTORY_STORE.pending or HISTORY_STORE.pending_lastread or
+                    HISTORY_STATE.changed)
+
+    def commit_if_due(self) -> None:
+        """
+        Commit pending data if the flush interval expired
+        """
+
+        if not self._has_pending():
+            self.pending_since = 0.0
+            return
+
+        now = time.monotonic()
+        if not self.pending_since:
+            self.pending_since = now
+        interval = nuqql.config.get_history_setting("flush_interval") / 1000
+        if now - self.pending_since >= interval:
+            self.commit()
+
+    def close_file(self, file_name: str) -> None:
+        """
+        Write pending lines of history file file_name and close it, e.g.,
+        before it is rotated
+        """
+
+        self.sync_file(file_name)
+        out_file = self.files.pop(file_name, None)
+        if out_file:
+            logger.debug("closing history file %s", file_name)
+            out_file.close()
+
+    def sync_file(self, file_name: str) -> None:
+        """
+        Make sure all pending lines of history file file_name are written to
+        the file, e.g., before reading it
+        """
+
+        if file_name in self.pending:
+            self._write_pending(file_name, self._get_durability())
+        out_file = self.files.get(file_name)
+        if out_file:
+            out_file.flush()
+
+    def sync(self) -> None:
+        """
+        Commit all pending data and make sure it is readable from the files
+        """
+
+        self.commit()
+        for out_file in self.files.values():
+            out_file.flush()
+
+    def close(self) -> None:
+        """
+        Write pending data to the history files, the offsets indexes, and the
+        history state, and close all open history files. Pending data of the
+        full-text index and the history store is written when they are closed
+        """
+
+        self._commit_files()
+        HISTORY_STATE.save()
+        logger.debug("closing all history files")
+        while self.files:
+            _file_name, out_file = self.files.popitem()
+            out_file.close()
+
+
+# writer for the history files of all conversations
+HISTORY_WRITER = HistoryWriter()
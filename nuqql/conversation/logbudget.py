@@ -0,0 +1,68 @@
+"""
+Log budget: message budgets of the conversation logs
+"""
+
+import logging
+
+import nuqql.config
+
+logger = logging.getLogger(__name__)
+
+# minimum number of entries kept in each log if the global message budget is
+# exceeded, so conversations still show their latest messages
+LOG_MIN_ENTRIES = 100
+
+
+class LogBudget:
+    """
+    Message budgets of the conversation logs and the number of entries in all
+    logs. Entries are counted when they are added to or removed from a log,
+    so logs only need to be trimmed after a budget was exceeded.
+    """
+
+    def __init__(self) -> None:
+        self.max_messages = 0
+        self.max_total = 0
+        self.total = 0
+        self.exceeded = False
+
+    def init(self) -> None:
+        """
+        Read message budgets from the history settings
+        """
+
+        self.max_messages = max(
+            nuqql.config.get_history_setting("max_messages"),
+            LOG_MIN_ENTRIES)
+        self.max_total = nuqql.config.get_history_setting(
+            "max_total_messages")
+        logger.debug("log budgets: %d messages per log, %d messages total",
+                     self.max_messages, self.max_total)
+
+    def add(self, count: int, log_size: int) -> None:
+        """
+        Count count entries added to a log that now has log_size entries
+        """
+
+        self.total += count
+        if log_size > self.max_messages or self.total > self.max_total:
+            self.exceeded = True
+
+    def remove(self, count: int) -> None:
+        """
+        Count count entries removed from a log
+        """
+
+        self.total -= count
+
+    def reset(self, total: int) -> None:
+        """
+        Set number of entries in all logs after the logs were trimmed
+        """
+
+        self.total = total
+        self.exceeded = False
+
+
+# message budgets of all conversation logs
+LOG_BUDGET = LogBudget()
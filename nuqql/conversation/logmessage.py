@@ -3,20 +3,39 @@ Log message
 """
 
 import datetime
+import re
+
+from typing import List, Optional, Tuple, Union
+
+# regular expression for URLs in log messages
+URL_REGEX = re.compile(r"https?://\S+")
+
+# layout of log messages that were not laid out yet, shared by all messages
+# and never modified, layouts are replaced when they are created
+NO_LAYOUT: List[Tuple[int, int]] = []
 
 
 class LogMessage:
     """Class for log messages to be displayed in LogWins"""
 
-    def __init__(self, tstamp: datetime.datetime, sender: str, msg: str,
-                 own: bool = False) -> None:
+    # log messages of all conversations stay in memory, so avoid per
+    # instance dicts
+    __slots__ = ("epoch", "sender", "own", "msg", "is_read", "in_history",
+                 "formatted", "urls", "layout_width", "layout")
+
+    def __init__(self, tstamp: Union[datetime.datetime, int], sender: str,
+                 msg: str, own: bool = False) -> None:
         """
         Initialize log message with timestamp, sender of the message, and
-        the message itself
+        the message itself. The timestamp is either a datetime or seconds
+        since the epoch.
         """
 
-        # timestamp
-        self.tstamp = tstamp
+        # timestamp in seconds since the epoch, the datetime is only created
+        # on request
+        if isinstance(tstamp, datetime.datetime):
+            tstamp = round(tstamp.timestamp())
+        self.epoch = tstamp
 
         # sender could be us or buddy/other user, as
         # indicated by self.own (helps with coloring etc. later)
@@ -29,6 +48,34 @@ class LogMessage:
         # has message been read?
         self.is_read = False
 
+        # is message in the conversation's history file?
+        self.in_history = False
+
+        # formatted message, created when message is read for the first time
+        self.formatted = ""
+
+        # positions of URLs in formatted message, created on first request
+        self.urls: Optional[Tuple[int, ...]] = None
+
+        # layout cache: line spans of the formatted message wrapped at width
+        self.layout_width = 0
+        self.layout = NO_LAYOUT
+
+    @property
+    def tstamp(self) -> datetime.datetime:
+        """
+        Timestamp of the message as local datetime
+        """
+
+        return datetime.datetime.fromtimestamp(self.epoch)
+
+    def get_date(self) -> datetime.date:
+        """
+        Get local date of the message
+        """
+
+        return datetime.date.fromtimestamp(self.epoch)
+
     def get_short_sender(self) -> str:
         """
         Convert name to a shorter version
@@ -42,22 +89,36 @@ class LogMessage:
         Format and return log message; mark it as read
         """
 
-        # format message
-        tstamp_str = self.tstamp.strftime("%H:%M:%S")
-        msg = f"{tstamp_str} {self.get_short_sender()}: {self.msg}"
+        # format message only once, it does not change
+        if not self.formatted:
+            tstamp_str = self.tstamp.strftime("%H:%M:%S")
+            self.formatted = \
+                f"{tstamp_str} {self.get_short_sender()}: {self.msg}"
 
         # message has now been read
         if mark_read:
             self.is_read = True
 
-        return msg
+        return self.formatted
+
+    def get_urls(self) -> Tuple[int, ...]:
+        """
+        Get positions of URLs in the formatted log message
+        """
+
+        if self.urls is None:
+            prefix_len = len(self.read(mark_read=False)) - len(self.msg)
+            self.urls = tuple(prefix_len + match.start()
+                              for match in URL_REGEX.finditer(self.msg))
+
+        return self.urls
 
     def is_equal(self, other: "LogMessage") -> bool:
         """
         Check if this message and the LogMessage "other" match
         """
 
-        if self.tstamp != other.tstamp:
+        if self.epoch != other.epoch:
             return False
         if self.sender != other.sender:
             return False
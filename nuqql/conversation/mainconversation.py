@@ -4,9 +4,13 @@ special nuqql main conversation for welcome screen
 
 import logging
 
+from typing import List
+
 import nuqql.config
 
 from .conversation import Conversation
+from .logbudget import LOG_BUDGET
+from .logmessage import LogMessage
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +20,27 @@ class MainConversation(Conversation):
     Class for the main/welcome screen conversation
     """
 
+    def get_log(self) -> List[LogMessage]:
+        """
+        Get log shown in the conversation's log window
+        """
+
+        if not self.wins.log_win:
+            return []
+        return self.wins.log_win.list
+
+    def _evict_log(self, count: int) -> int:
+        """
+        Remove up to count oldest entries from the conversation's log, return
+        the number of removed entries
+        """
+
+        log = self.get_log()
+        count = min(count, len(log))
+        del log[:count]
+        LOG_BUDGET.remove(count)
+        return count
+
     def create_windows(self) -> None:
         """
         Create windows for this conversation
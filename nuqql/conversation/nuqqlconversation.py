@@ -51,7 +51,7 @@ class NuqqlConversation(Conversation):
 
         # return tuple of sort keys:
         # notify, used, type, status, name
-        return 0 - self.notification, 0, 2, 0, self.name
+        return 0 - min(self.notification, 1), 0, 2, 0, self.name
 
     def send_msg(self, msg: str) -> None:
         """
@@ -5,13 +5,46 @@ Main part of nuqql.
 import logging
 import os
 import signal
+import time
 
 import nuqql.backend
 import nuqql.config
+import nuqql.conversation
 import nuqql.ui
 
 logger = logging.getLogger(__name__)
 
+# maximum time in seconds for shutting down nuqql, history writes that are not
+# finished by then are abandoned
+SHUTDOWN_TIMEOUT = 5
+
+
+def shutdown() -> None:
+    """
+    Shut down backends and history within SHUTDOWN_TIMEOUT seconds
+    """
+
+    logger.debug("shutting down")
+    start = time.monotonic()
+
+    # commit pending history writes, close history files, history store
+    # and history index, and stop history thread while backends shut down
+    nuqql.conversation.HISTORY_WORKER.begin_stop()
+
+    # shut down backends
+    nuqql.backend.stop_backends()
+    backends_end = time.monotonic()
+    logger.debug("shutdown: stopped backends in %.3f seconds",
+                 backends_end - start)
+
+    # wait for the history thread until the shutdown deadline
+    nuqql.conversation.HISTORY_WORKER.stop(
+        max(start + SHUTDOWN_TIMEOUT - backends_end, 0))
+    end = time.monotonic()
+    logger.debug("shutdown: closed history in %.3f more seconds",
+                 end - backends_end)
+    logger.debug("shutdown: finished in %.3f seconds", end - start)
+
 
 # main loop of nuqql
 def main_loop() -> str:
@@ -31,9 +64,19 @@ def main_loop() -> str:
 
             # handle network input
             nuqql.backend.handle_network()
+
+            # restart crashed backends
+            nuqql.backend.supervise_backends()
+
+            # handle results of history reads
+            nuqql.conversation.HISTORY_WORKER.handle_results()
+
+            # keep conversation logs within their message budgets
+            if nuqql.conversation.LOG_BUDGET.exceeded:
+                nuqql.conversation.trim_logs()
     finally:
-        # shut down backends
-        nuqql.backend.stop_backends()
+        # shut down backends and history
+        shutdown()
 
     # quit nuqql
     return ""
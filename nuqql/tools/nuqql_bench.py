@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+"""
+Nuqql-bench: helper script for measuring memory usage and load time of
+conversation histories.
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from types import SimpleNamespace
+from typing import Any, List, Tuple
+
+from nuqql.config.config import DEFAULT_HISTORY_CONFIG
+from nuqql.config.configs import CONFIGS
+from nuqql.conversation.history import History, HISTORY_FILE
+from nuqql.conversation.logmessage import LogMessage
+
+# start of the generated history, seconds between its messages, and sender
+# names of received messages
+BENCH_START = 1577836800
+BENCH_INTERVAL = 60
+BENCH_SENDERS = ("alice@example.com", "bob@example.com", "carol@example.com")
+
+
+def write_history(file_name: str, count: int) -> None:
+    """
+    Write history file with count messages
+    """
+
+    with open(file_name, "w", encoding="UTF-8", newline="") as out_file:
+        for num in range(count):
+            tstamp = BENCH_START + num * BENCH_INTERVAL
+            if num % 4 == 3:
+                line = f"{tstamp} OUT you reply number {num}"
+            else:
+                sender = BENCH_SENDERS[num % len(BENCH_SENDERS)]
+                line = f"{tstamp} IN {sender} message number {num}, see " \
+                    f"https://example.com/{num} for details"
+            out_file.write(line + "\r\n")
+
+
+def load_history(conv_dir: str) -> Tuple[History, List[LogMessage]]:
+    """
+    Load all messages of the history file like a conversation does when it
+    is opened
+    """
+
+    conv: Any = SimpleNamespace(name="bench")
+    history = History(conv)
+    history.conv_path = conv_dir
+    history.log_file = conv_dir + HISTORY_FILE
+    # pylint: disable=protected-access
+    msgs = history._read_log()
+    return history, history._add_date_changes(msgs, None)
+
+
+def run_bench(count: int) -> None:
+    """
+    Create history with count messages, measure time and memory needed to
+    load it
+    """
+
+    with tempfile.TemporaryDirectory() as bench_dir:
+        CONFIGS["dir"] = bench_dir
+        CONFIGS["history"] = dict(DEFAULT_HISTORY_CONFIG)
+        CONFIGS["history"]["load_messages"] = str(count)
+
+        conv_dir = bench_dir + "/conversation/bench"
+        os.makedirs(conv_dir)
+        log_file = conv_dir + HISTORY_FILE
+        write_history(log_file, count)
+        print(f"history: {count} messages, "
+              f"{os.path.getsize(log_file)} bytes")
+
+        # create offsets index, so it does not count as load time
+        _history, log = load_history(conv_dir)
+        del _history, log
+        gc.collect()
+
+        # measure load time
+        start = time.perf_counter()
+        history, log = load_history(conv_dir)
+        load_time = time.perf_counter() - start
+        del history, log
+        gc.collect()
+
+        # measure memory of the loaded messages
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        history, log = load_history(conv_dir)
+        used = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+
+        print(f"load time: {load_time:.3f} s "
+              f"({load_time / len(log) * 1e6:.2f} us/message)")
+        print(f"memory: {used} bytes ({used / len(log):.1f} bytes/message)")
+
+
+def main() -> None:
+    """
+    Main function
+    """
+
+    parser = argparse.ArgumentParser(
+        description=("Measure memory usage and load time of nuqql "
+                     "conversation histories."))
+    parser.add_argument("--messages", type=int, default=1000000,
+                        help="number of messages in the history")
+    args = parser.parse_args()
+    run_bench(max(args.messages, 1))
+
+
+if __name__ == "__main__":
+    main()
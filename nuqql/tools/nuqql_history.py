@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+"""
+Nuqql-history: helper script for migrating nuqql conversation histories
+between history files and the history store.
+"""
+
+import argparse
+import os
+import pathlib
+
+from pathlib import Path
+from typing import List
+
+from nuqql.config.config import init_history_settings
+from nuqql.config.configs import CONFIGS
+from nuqql.conversation.history import HISTORY_FILE, LASTREAD_FILE
+from nuqql.conversation.historyarchive import HistoryArchive
+from nuqql.conversation.historyindex import HISTORY_INDEX
+from nuqql.conversation.historyoffsets import OFFSETS_FILE_SUFFIX
+from nuqql.conversation.historystore import HISTORY_STORE
+
+
+def _read_lines(file_name: str) -> List[str]:
+    """
+    Read complete lines from a history or lastread file
+    """
+
+    with open(file_name, "rb") as in_file:
+        data = in_file.read()
+    data = data[:data.rfind(b"\r\n") + 2]
+    if not data:
+        return []
+    return [line.decode(errors="replace")
+            for line in data[:-2].split(b"\r\n")]
+
+
+def import_histories() -> None:
+    """
+    Import history files of all conversations into the history store
+    """
+
+    conv_dir = str(CONFIGS["dir"]) + "/conversation"
+    for dir_path, _dirs, files in os.walk(conv_dir):
+        if "history" not in files:
+            continue
+
+        # replace history of the conversation in the store
+        conv = os.path.relpath(dir_path, conv_dir)
+        HISTORY_STORE.delete(conv)
+        archive = HistoryArchive(dir_path + HISTORY_FILE)
+        archive.load()
+        count = 0
+        for line in archive.iter_lines():
+            HISTORY_STORE.append(conv, line)
+            count += 1
+        lines = _read_lines(dir_path + HISTORY_FILE)
+        for line in lines:
+            HISTORY_STORE.append(conv, line)
+        if "lastread" in files:
+            for line in _read_lines(dir_path + LASTREAD_FILE)[:1]:
+                HISTORY_STORE.set_lastread(conv, line)
+        HISTORY_STORE.flush()
+        count += len(lines)
+        print(f"imported {count} messages of conversation {conv}")
+
+
+def export_histories(force: bool) -> None:
+    """
+    Export history of all conversations in the history store to history files
+    """
+
+    conv_dir = str(CONFIGS["dir"]) + "/conversation"
+    for conv in HISTORY_STORE.get_convs():
+        path = f"{conv_dir}/{conv}"
+        if os.path.exists(path + HISTORY_FILE) and not force:
+            print(f"skipped conversation {conv}, history file exists")
+            continue
+
+        # write history and lastread file, remove archive and outdated
+        # indexes
+        pathlib.Path(path).mkdir(parents=True, exist_ok=True)
+        count = 0
+        with open(path + HISTORY_FILE, "w", encoding="UTF-8",
+                  newline="") as out_file:
+            for line in HISTORY_STORE.get_lines(conv):
+                out_file.write(line + "\r\n")
+                count += 1
+        lastread = HISTORY_STORE.get_lastread(conv)
+        if lastread:
+            with open(path + LASTREAD_FILE, "w", encoding="UTF-8",
+                      newline="") as out_file:
+                out_file.write(lastread + "\r\n")
+        archive = HistoryArchive(path + HISTORY_FILE)
+        archive.load()
+        archive.remove()
+        try:
+            os.remove(path + HISTORY_FILE + OFFSETS_FILE_SUFFIX)
+        except FileNotFoundError:
+            pass
+        HISTORY_INDEX.remove(conv)
+        print(f"exported {count} messages of conversation {conv}")
+
+
+def main() -> None:
+    """
+    Main function
+    """
+
+    parser = argparse.ArgumentParser(
+        description=("Migrate nuqql conversation histories between history "
+                     "files and the history store."))
+    parser.add_argument("--dir", default=Path.home() / ".config/nuqql",
+                        help="nuqql directory")
+    parser.add_argument("--force", action="store_true",
+                        help="overwrite existing history files on export")
+    parser.add_argument("command", choices=["import", "export"],
+                        help=("import history files into history store or "
+                              "export history store to history files"))
+    args = parser.parse_args()
+    CONFIGS["dir"] = Path(args.dir)
+    init_history_settings()
+
+    try:
+        if args.command == "import":
+            import_histories()
+        else:
+            export_histories(args.force)
+    finally:
+        HISTORY_STORE.close()
+        HISTORY_INDEX.close()
+
+
+if __name__ == "__main__":
+    main()
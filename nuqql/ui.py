@@ -5,9 +5,11 @@ User Interface part of nuqql
 import curses
 import curses.ascii
 import datetime
+import functools
 import logging
+import sys
 
-from typing import TYPE_CHECKING, Any, Callable, Optional
+from typing import TYPE_CHECKING, Any, Callable, List, Optional
 
 import nuqql.config
 import nuqql.conversation
@@ -18,6 +20,25 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+# timeout in ms when waiting for user input
+INPUT_TIMEOUT = 10
+
+# timeout in ms when waiting for the rest of pasted text
+PASTE_TIMEOUT = 100
+
+# bracketed paste mode: terminal control sequences for enabling and disabling
+# it and markers around pasted text
+PASTE_ENABLE = "\x1b[?2004h"
+PASTE_DISABLE = "\x1b[?2004l"
+PASTE_START = list("\x1b[200~")
+PASTE_END = list("\x1b[201~")
+
+
+class PastedText(str):
+    """
+    Text pasted by the user in bracketed paste mode
+    """
+
 
 def handle_message(*args: Any) -> None:
     """
@@ -153,6 +174,21 @@ def add_buddy_to_temporary_conv(buddy: "Buddy") -> \
     return None
 
 
+def _notify_unread(conv: nuqql.conversation.Conversation, notified: int,
+                   unread: int) -> None:
+    """
+    Notify user about unread messages in the history of a new buddy's
+    conversation. The first notified unread messages were already notified
+    when they arrived.
+    """
+
+    if unread > notified:
+        # there are unread messages, notify user if
+        # conversation is inactive
+        if not conv.is_active():
+            conv.notify(unread - notified)
+
+
 def add_buddy(buddy: "Buddy") -> None:
     """
     Add a new buddy to UI
@@ -172,15 +208,10 @@ def add_buddy(buddy: "Buddy") -> None:
     # redraw list to show update
     conv.wins.list_win.redraw_pad()
 
-    # check if there are unread messages for this new buddy in the history
-    last_log_msg = conv.history.get_last_log_line()
-    last_read_msg = conv.history.get_lastread()
-    if last_log_msg:
-        if not last_read_msg or not last_log_msg.is_equal(last_read_msg):
-            # there are unread messages, notify user if
-            # conversation is inactive
-            if not conv.is_active():
-                conv.notify()
+    # count unread messages for this new buddy in the history, messages of a
+    # temporary conversation are already in the history and notified
+    conv.history.count_unread(functools.partial(_notify_unread, conv,
+                                                conv.notification))
 
     logger.debug("added buddy %s to ui", buddy.name)
 
@@ -230,6 +261,79 @@ def read_input() -> str:
     return wch
 
 
+def _find_marker(chars: List[Any], marker: List[str], start: int = 0) -> int:
+    """
+    Find index of marker in list of input characters, return -1 if not found
+    """
+
+    for index in range(start, len(chars) - len(marker) + 1):
+        if chars[index] == marker[0] and \
+           chars[index:index + len(marker)] == marker:
+            return index
+    return -1
+
+
+def _read_paste(burst: List[Any], start: int) -> PastedText:
+    """
+    Get pasted text starting at index start of the input burst, read more
+    input until the end of the pasted text if necessary. Replace pasted text
+    and markers in burst with the remaining input.
+    """
+
+    text = burst[start + len(PASTE_START):]
+    del burst[start:]
+
+    # find end of pasted text
+    end = _find_marker(text, PASTE_END)
+    if end == -1:
+        nuqql.win.MAIN_WINS["screen"].timeout(PASTE_TIMEOUT)
+        while end == -1:
+            wch = read_input()
+            if wch is None:
+                # end marker is missing, assume everything was pasted
+                logger.debug("end of pasted text not found")
+                end = len(text)
+                break
+            text.append(wch)
+            end = _find_marker(text, PASTE_END,
+                               max(len(text) - len(PASTE_END), 0))
+        nuqql.win.MAIN_WINS["screen"].timeout(INPUT_TIMEOUT)
+
+    burst.extend(text[end + len(PASTE_END):])
+    return PastedText("".join(char for char in text[:end]
+                              if isinstance(char, str)))
+
+
+def read_input_burst(char: Any) -> List[Any]:
+    """
+    Read all pending user input after char and return it as a list of
+    characters and pasted texts
+    """
+
+    burst = [char]
+    screen = nuqql.win.MAIN_WINS["screen"]
+    screen.nodelay(True)
+    while True:
+        wch = read_input()
+        if wch is None:
+            break
+        if is_input_valid(wch):
+            burst.append(wch)
+    screen.timeout(INPUT_TIMEOUT)
+
+    # look for pasted texts
+    items: List[Any] = []
+    index = _find_marker(burst, PASTE_START)
+    while index != -1:
+        items.extend(burst[:index])
+        items.append(_read_paste(burst, index))
+        burst = burst[index:]
+        index = _find_marker(burst, PASTE_START)
+    items.extend(burst)
+
+    return items
+
+
 def show_terminal_warning() -> None:
     """
     Show a warning that the terminal size is invalid, if it fits on screen
@@ -289,21 +393,68 @@ def handle_input() -> bool:
         show_terminal_warning()
         return True
 
+    # read all other pending input, e.g., pasted text, and handle it at once
+    burst = read_input_burst(char)
+    index = 0
+    while index < len(burst):
+        # stop if user quit
+        if not nuqql.win.MAIN_WINS["list"].state.active:
+            return False
+        index += _handle_burst(burst[index:])
+    return True
+
+
+def _handle_burst(burst: List[Any]) -> int:
+    """
+    Pass input burst to the active window and return the number of handled
+    characters and pasted texts
+    """
+
+    # if terminal resized, resize and redraw active windows
+    if burst[0] == curses.KEY_RESIZE:
+        _handle_char(burst[0])
+        return 1
+
+    # pass text to active input window at once
+    for conv in nuqql.conversation.CONVERSATIONS:
+        if not conv.is_input_win_active():
+            continue
+        if isinstance(burst[0], PastedText):
+            conv.wins.input_win.insert_text(burst[0])
+            return 1
+        end = 1
+        while end < len(burst) and not isinstance(burst[end], PastedText):
+            end += 1
+        return conv.wins.input_win.process_burst(burst[:end])
+
+    # pass input to other windows character by character
+    if isinstance(burst[0], PastedText):
+        for char in burst[0]:
+            _handle_char(char)
+    else:
+        _handle_char(burst[0])
+    return 1
+
+
+def _handle_char(char: Any) -> None:
+    """
+    Handle a single character of user input
+    """
+
     # if terminal resized, resize and redraw active windows
     if char == curses.KEY_RESIZE:
         nuqql.conversation.resize_main_window()
-        return True
+        return
 
     # pass user input to active conversation
     for conv in nuqql.conversation.CONVERSATIONS:
         if conv.is_active():
             conv.process_input(char)
-            return True
+            return
 
     # if no conversation is active pass input to active list window for
     # list window navigation
     nuqql.win.MAIN_WINS["list"].process_input(char)
-    return True
 
 
 def start(stdscr: Any, func: Callable) -> str:
@@ -317,17 +468,22 @@ def start(stdscr: Any, func: Callable) -> str:
     nuqql.win.MAIN_WINS["screen"] = stdscr
 
     # configuration
-    stdscr.timeout(10)
+    stdscr.timeout(INPUT_TIMEOUT)
 
     # clear everything
     stdscr.clear()
     stdscr.refresh()
 
+    # enable bracketed paste mode
+    sys.stdout.write(PASTE_ENABLE)
+    sys.stdout.flush()
+
     # disable cursor
     curses.curs_set(0)
 
     # make sure configs are loaded
     nuqql.config.init(stdscr)
+    nuqql.conversation.LOG_BUDGET.init()
 
     # create main windows, if terminal size is valid, otherwise just stop here
     if not nuqql.config.WinConfig.is_terminal_valid():
@@ -353,6 +509,11 @@ def init(func: Callable) -> None:
     """
 
     logger.debug("initializing ui")
-    retval = curses.wrapper(start, func)
+    try:
+        retval = curses.wrapper(start, func)
+    finally:
+        # disable bracketed paste mode
+        sys.stdout.write(PASTE_DISABLE)
+        sys.stdout.flush()
     if retval and retval != "":
         print(retval)
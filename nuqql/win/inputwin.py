@@ -6,9 +6,9 @@ import curses
 import logging
 import unicodedata
 
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, List
 
-from .win import Win, MAIN_WINS
+from .win import Win, MAIN_WINS, get_cell_offset
 
 if TYPE_CHECKING:   # imports for typing
     # pylint: disable=cyclic-import
@@ -27,8 +27,18 @@ class InputWin(Win):
                  title: str) -> None:
         Win.__init__(self, config, conversation, title)
 
-        # input message
-        self.msg = ""
+        # input message as list of lines and cursor position in the message
+        self.lines: List[str] = [""]
+        self.line = 0
+        self.col = 0
+
+    @property
+    def msg(self) -> str:
+        """
+        Input message
+        """
+
+        return "\n".join(self.lines)
 
     def redraw_pad(self) -> None:
         # if terminal size is invalid, stop here
@@ -45,227 +55,227 @@ class InputWin(Win):
                          pos_y + win_size_y - 2,
                          pos_x + win_size_x - 2)
 
+    def _draw_lines(self, start: int, end: int = -1) -> None:
+        """
+        Draw lines from start to end of the message in the pad. If end is not
+        given, draw all lines until the end of the message and remove old
+        lines after it. Resize pad if lines do not fit.
+        """
+
+        # make sure lines fit into the pad
+        clear = end == -1
+        if clear:
+            end = len(self.lines)
+        pad_size_y, pad_size_x = self.pad.getmaxyx()
+        size_y = max(pad_size_y, end + 1)
+        size_x = max([pad_size_x] + [get_cell_offset(line, 0, len(line)) + 2
+                                     for line in self.lines[start:end]])
+        if size_y != pad_size_y or size_x != pad_size_x:
+            self.pad.resize(size_y, size_x)
+
+        # draw lines
+        for index in range(start, end):
+            self.pad.move(index, 0)
+            self.pad.clrtoeol()
+            self.pad.insstr(index, 0, self.lines[index])
+        if clear:
+            self.pad.move(end, 0)
+            self.pad.clrtobot()
+
+    def _move_cursor(self) -> None:
+        """
+        Move cursor in pad to the current position in the message and display
+        changes in the pad
+        """
+
+        line = self.lines[self.line]
+        self.pad.move(self.line, get_cell_offset(line, 0, self.col))
+        self.redraw_pad()
+
+    def _insert(self, text: str) -> None:
+        """
+        Insert text at the current position in the message
+        """
+
+        line = self.lines[self.line]
+        parts = text.split("\n")
+        if len(parts) == 1:
+            # insert text within the current line and only draw this line
+            self.lines[self.line] = line[:self.col] + text + line[self.col:]
+            self.col += len(text)
+            self._draw_lines(self.line, self.line + 1)
+        else:
+            # text contains newlines, split current line and draw all lines
+            # starting at the current line
+            start = self.line
+            self.lines[start:start + 1] = [line[:self.col] + parts[0]] + \
+                parts[1:-1] + [parts[-1] + line[self.col:]]
+            self.line += len(parts) - 1
+            self.col = len(parts[-1])
+            self._draw_lines(start)
+
+        self._move_cursor()
+
     def _cursor_up(self, *args: Any) -> None:
-        segment = args[0]
-        if self.state.cur_y > 0:
+        if self.line > 0:
             logger.debug("moving cursor up")
-            self.pad.move(self.state.cur_y - 1,
-                          min(self.state.cur_x,
-                              len(segment[self.state.cur_y - 1])))
+            self.line -= 1
+            self.col = min(self.col, len(self.lines[self.line]))
 
         # display changes in the pad
-        self.redraw_pad()
+        self._move_cursor()
 
     def _cursor_down(self, *args: Any) -> None:
-        # pad properties
-        pad_y_max, unused_pad_x_max = self.pad.getmaxyx()
-
-        segment = args[0]
-        if self.state.cur_y < pad_y_max and \
-           self.state.cur_y < len(segment) - 1:
+        if self.line < len(self.lines) - 1:
             logger.debug("moving cursor down")
-            self.pad.move(self.state.cur_y + 1,
-                          min(self.state.cur_x,
-                              len(segment[self.state.cur_y + 1])))
+            self.line += 1
+            self.col = min(self.col, len(self.lines[self.line]))
 
         # display changes in the pad
-        self.redraw_pad()
+        self._move_cursor()
 
     def _cursor_left(self, *args: Any) -> None:
-        if self.state.cur_x > 0:
+        if self.col > 0:
             logger.debug("moving cursor left")
-            self.pad.move(self.state.cur_y, self.state.cur_x - 1)
+            self.col -= 1
 
         # display changes in the pad
-        self.redraw_pad()
+        self._move_cursor()
 
     def _cursor_right(self, *args: Any) -> None:
-        # pad properties
-        unused_pad_y_max, pad_x_max = self.pad.getmaxyx()
-
-        segment = args[0]
-        if self.state.cur_x < pad_x_max and \
-           self.state.cur_x < len(segment[self.state.cur_y]):
+        if self.col < len(self.lines[self.line]):
             logger.debug("moving cursor right")
-            self.pad.move(self.state.cur_y, self.state.cur_x + 1)
+            self.col += 1
 
         # display changes in the pad
-        self.redraw_pad()
+        self._move_cursor()
 
     def _cursor_line_start(self, *args: Any) -> None:
-        if self.state.cur_x > 0:
+        if self.col > 0:
             logger.debug("moving cursor to start of line")
-            self.pad.move(self.state.cur_y, 0)
+            self.col = 0
 
         # display changes in the pad
-        self.redraw_pad()
+        self._move_cursor()
 
     def _cursor_line_end(self, *args: Any) -> None:
-        # pad properties
-        unused_pad_y_max, pad_x_max = self.pad.getmaxyx()
-
-        segment = args[0]
-        if self.state.cur_x < pad_x_max and \
-           self.state.cur_x < len(segment[self.state.cur_y]):
+        if self.col < len(self.lines[self.line]):
             logger.debug("moving cursor to end of line")
-            self.pad.move(self.state.cur_y, len(segment[self.state.cur_y]))
+            self.col = len(self.lines[self.line])
 
         # display changes in the pad
-        self.redraw_pad()
+        self._move_cursor()
 
     def _cursor_msg_start(self, *args: Any) -> None:
-        if self.state.cur_y > 0 or self.state.cur_x > 0:
+        if self.line > 0 or self.col > 0:
             logger.debug("moving cursor to start of message")
-            self.pad.move(0, 0)
+            self.line, self.col = 0, 0
 
         # display changes in the pad
-        self.redraw_pad()
+        self._move_cursor()
 
     def _cursor_msg_end(self, *args: Any) -> None:
-        segment = args[0]
-        if self.state.cur_y < len(segment) - 1 or \
-           self.state.cur_x < len(segment[-1]):
+        if self.line < len(self.lines) - 1 or \
+           self.col < len(self.lines[-1]):
             logger.debug("moving cursor to end of message")
-            self.pad.move(len(segment) - 1, len(segment[-1]))
+            self.line = len(self.lines) - 1
+            self.col = len(self.lines[-1])
 
         # display changes in the pad
-        self.redraw_pad()
+        self._move_cursor()
 
     def _send_msg(self, *args: Any) -> None:
         # do not send empty messages
-        if self.msg == "":
+        msg = self.msg
+        if msg == "":
             return
 
-        logger.debug("sending message %s", self.msg)
+        logger.debug("sending message %s", msg)
 
         # let conversation actually send the message
-        self.conversation.send_msg(self.msg)
+        self.conversation.send_msg(msg)
 
         # reset input
-        self.msg = ""
+        self.lines = [""]
+        self.line, self.col = 0, 0
         self.pad.erase()
 
         # reset pad size
         win_size_y, win_size_x = self.win.getmaxyx()
         self.pad.resize(win_size_y - 2, win_size_x - 2)
+        self.pad.move(0, 0)
 
-        # display changes in the pad
-        self.redraw_pad()
+        # display changes in the pad, if the conversation did not switch to
+        # another window while sending the message
+        if self.state.active:
+            self.redraw_pad()
 
     def _delete_char(self, *args: Any) -> None:
-        segment = args[0]
-        if self.state.cur_x > 0:
+        line = self.lines[self.line]
+        if self.col > 0:
             # delete charater within a line
             logger.debug("deleting character")
-            segment[self.state.cur_y] = \
-                segment[self.state.cur_y][:self.state.cur_x - 1] +\
-                segment[self.state.cur_y][self.state.cur_x:]
-        elif self.state.cur_y > 0:
+            self.lines[self.line] = line[:self.col - 1] + line[self.col:]
+            self.col -= 1
+            self._draw_lines(self.line, self.line + 1)
+        elif self.line > 0:
             # delete newline
             logger.debug("deleting newline character")
-            old_prev_len = len(segment[self.state.cur_y - 1])
-            segment[self.state.cur_y - 1] = segment[self.state.cur_y - 1] +\
-                segment[self.state.cur_y]
-            segment = segment[:self.state.cur_y] + \
-                segment[self.state.cur_y + 1:]
-            # resize pad if concatenated line is longer than pad
-            pad_size_y, pad_size_x = self.pad.getmaxyx()
-            if len(segment[self.state.cur_y - 1]) + 2 > pad_size_x:
-                pad_size_x = len(segment[self.state.cur_y - 1]) + 2
-                self.pad.resize(pad_size_y, pad_size_x)
+            self.line -= 1
+            self.col = len(self.lines[self.line])
+            self.lines[self.line] += line
+            del self.lines[self.line + 1]
+            self._draw_lines(self.line)
         else:
             # at top left, do nothing
             return
 
-        # reconstruct and display message
-        self.msg = "\n".join(segment)
-        self.pad.erase()
-        self.pad.addstr(self.msg)
-        # move cursor to new position
-        if self.state.cur_x > 0:
-            self.pad.move(self.state.cur_y, self.state.cur_x - 1)
-        elif self.state.cur_y > 0:
-            self.pad.move(self.state.cur_y - 1, old_prev_len)
-
         # display changes in the pad
-        self.redraw_pad()
+        self._move_cursor()
 
     def _delete_char_right(self, *args: Any) -> None:
-        # argument is segemented message, i.e. lines of the message
-        segment = args[0]
-
-        # delete character
-        if self.state.cur_x < len(segment[self.state.cur_y]):
+        line = self.lines[self.line]
+        if self.col < len(line):
             # delete charater within a line
             logger.debug("deleting right character")
-            segment[self.state.cur_y] = \
-                segment[self.state.cur_y][:self.state.cur_x] +\
-                segment[self.state.cur_y][self.state.cur_x + 1:]
-        elif self.state.cur_y < len(segment) - 1:
+            self.lines[self.line] = line[:self.col] + line[self.col + 1:]
+            self._draw_lines(self.line, self.line + 1)
+        elif self.line < len(self.lines) - 1:
             # delete newline
             logger.debug("deleting right newline character")
-            segment[self.state.cur_y] = segment[self.state.cur_y] +\
-                segment[self.state.cur_y + 1]
-            del segment[self.state.cur_y + 1]
-            # resize pad if concatenated line is longer than pad
-            pad_size_y, pad_size_x = self.pad.getmaxyx()
-            if len(segment[self.state.cur_y]) + 2 > pad_size_x:
-                pad_size_x = len(segment[self.state.cur_y]) + 2
-                self.pad.resize(pad_size_y, pad_size_x)
+            self.lines[self.line] += self.lines[self.line + 1]
+            del self.lines[self.line + 1]
+            self._draw_lines(self.line)
         else:
             # at bottom right, do nothing
             return
 
-        # reconstruct and display message
-        self.msg = "\n".join(segment)
-        self.pad.erase()
-        self.pad.addstr(self.msg)
-
-        # move cursor to new position
-        self.pad.move(self.state.cur_y, self.state.cur_x)
-
         # display changes in the pad
-        self.redraw_pad()
+        self._move_cursor()
 
     def _delete_line_end(self, *args: Any) -> None:
-        segment = args[0]
-
         # delete from cursor to end of line
         logger.debug("deleting from cursor to end of line")
-        segment[self.state.cur_y] = \
-            segment[self.state.cur_y][:self.state.cur_x]
-
-        # reconstruct message
-        self.msg = "\n".join(segment)
-        self.pad.erase()
-        self.pad.addstr(self.msg)
+        self.lines[self.line] = self.lines[self.line][:self.col]
+        self._draw_lines(self.line, self.line + 1)
 
         # display changes in the pad
-        self.redraw_pad()
+        self._move_cursor()
 
     def _delete_line(self, *args: Any) -> None:
-        segment = args[0]
-
         # delete the current line
         logger.debug("deleting current line")
-        del segment[self.state.cur_y]
-
-        # reconstruct message
-        self.msg = "\n".join(segment)
-        self.pad.erase()
-        self.pad.addstr(self.msg)
+        del self.lines[self.line]
+        if not self.lines:
+            self.lines = [""]
+        self._draw_lines(self.line)
 
         # move cursor to new position
-        if len(segment) <= self.state.cur_y:
-            self.state.cur_y = max(0, len(segment) - 1)
-        if not segment:
-            self.state.cur_x = 0
-        elif len(segment[self.state.cur_y]) < self.state.cur_x:
-            self.state.cur_x = len(segment[self.state.cur_y])
-        self.pad.move(self.state.cur_y, self.state.cur_x)
+        self.line = min(self.line, len(self.lines) - 1)
+        self.col = min(self.col, len(self.lines[self.line]))
 
         # display changes in the pad
-        self.redraw_pad()
+        self._move_cursor()
 
     def go_back(self, *_args: Any) -> None:
         """
@@ -302,8 +312,7 @@ class InputWin(Win):
 
         logger.debug("jumping to log and starting url search")
         self._go_log()
-        self.conversation.wins.log_win.search_text = "http"
-        self.conversation.wins.log_win.search_next()
+        self.conversation.wins.log_win.search_url()
 
     def _go_next(self, *args: Any) -> None:
         """
@@ -354,50 +363,65 @@ class InputWin(Win):
         self.go_back()
         self.conversation.wins.list_win.go_conv()
 
+    def insert_text(self, text: str) -> None:
+        """
+        Insert text, e.g., pasted by the user, at once
+        """
+
+        # convert line breaks and tabs, remove other control characters
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+        text = text.replace("\t", "    ")
+        text = "".join(char for char in text if char == "\n" or
+                       unicodedata.category(char)[0] != "C")
+        if text:
+            logger.debug("inserting text of length %d", len(text))
+            self._insert(text)
+
+    def process_burst(self, chars: List[Any]) -> int:
+        """
+        Process a burst of user input characters. Consecutive text characters
+        are inserted at once. Stop if the window becomes inactive, e.g., after
+        going back to the list window, and return the number of processed
+        characters.
+        """
+
+        text: List[str] = []
+        count = 0
+        for char in chars:
+            if not self.state.active:
+                break
+            count += 1
+
+            # collect text characters
+            if isinstance(char, str) and not self.is_keybind(char) and \
+               (char == "\n" or unicodedata.category(char)[0] != "C"):
+                text.append(char)
+                continue
+
+            # insert collected text before handling special keys
+            if text:
+                self._insert("".join(text))
+                text = []
+            self.process_input(char)
+
+        if text:
+            self._insert("".join(text))
+        return count
+
     def _tab(self, *args: Any) -> None:
         # convert tab to spaces
-        for _i in range(4):
-            self.process_input(" ")
+        self._insert("    ")
 
     def process_input(self, char: str) -> None:
         """
         Process user input (character)
         """
 
-        segments = self.msg.split("\n")
-        self.state.cur_y, self.state.cur_x = self.pad.getyx()
-        pad_size_y, pad_size_x = self.pad.getmaxyx()
-
         # look for special key mappings in keymap or process as text
-        if not self.handle_keybinds(char, segments):
-            # insert new character into segments
+        if not self.handle_keybinds(char):
+            # insert new character into message
             if not isinstance(char, str):
                 return
             if char != "\n" and unicodedata.category(char)[0] == "C":
                 return
-            # make sure new char fits in the pad
-            if len(segments) == pad_size_y - 1 and char == "\n":
-                pad_size_y += 1
-                self.pad.resize(pad_size_y, pad_size_x)
-            if len(segments[self.state.cur_y]) == pad_size_x - 1 and \
-               char != "\n":
-                pad_size_x += 1
-                self.pad.resize(pad_size_y, pad_size_x)
-
-            segments[self.state.cur_y] = \
-                segments[self.state.cur_y][:self.state.cur_x] + char +\
-                segments[self.state.cur_y][self.state.cur_x:]
-            # reconstruct orginal message for output in pad
-            self.msg = "\n".join(segments)
-            # reconstruct segments in case newline character was entered
-            segments = self.msg.split("\n")
-            # output new message in pad
-            self.pad.erase()
-            self.pad.addstr(self.msg)
-            # move cursor to new position
-            if char == "\n":
-                self.pad.move(self.state.cur_y + 1, 0)
-            else:
-                self.pad.move(self.state.cur_y, self.state.cur_x + 1)
-            # display changes in the pad
-            self.redraw_pad()
+            self._insert(char)
@@ -3,12 +3,16 @@ Nuqql UI Log Windows
 """
 
 import curses
+import functools
 import logging
+import re
 
 from types import SimpleNamespace
-from typing import TYPE_CHECKING, Any, List
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Pattern, \
+    Tuple
 
-from .win import Win, MAIN_WINS
+from .win import Win, MAIN_WINS, get_cell_offset, get_char_index, \
+    get_line_spans
 
 if TYPE_CHECKING:   # imports for typing
     # pylint: disable=cyclic-import
@@ -18,6 +22,10 @@ if TYPE_CHECKING:   # imports for typing
 
 logger = logging.getLogger(__name__)
 
+# maximum number of pages of older messages one search step loads from the
+# history before it stops, searching again continues with older messages
+SEARCH_MAX_PAGES = 10
+
 
 class LogWin(Win):
     """
@@ -31,9 +39,24 @@ class LogWin(Win):
         # list entries/message log
         self.list: List["LogMessage"] = []
 
-        # string to search for
+        # string to search for and its precompiled regular expression
         self.search_input = ""
         self.search_text = ""
+        self.search_matcher: Optional[Pattern] = None
+
+        # status shown in the window border, older messages being loaded, and
+        # search step waiting for older messages
+        self.status_shown = False
+        self.loading = False
+        self.search_loading = False
+
+        # index of URLs in the log: message index and position of each URL,
+        # number of indexed messages, and current position in the index.
+        # If search_urls is set, search functions jump through the URLs
+        self.url_index: List[Tuple[int, int]] = []
+        self.url_index_end = 0
+        self.url_cur = -1
+        self.search_urls = False
         self.search_keyfunc = {
             "DEL_CHAR":     self._process_search_input_del_char,
             "ENTER":        self._process_search_input_enter,
@@ -43,12 +66,15 @@ class LogWin(Win):
         # user's view of the log
         self.view = SimpleNamespace(
             begin=-1,
-            cur=-1
+            cur=-1,
+            # end of printed log slice, pad width and view size of last redraw
+            end=0,
+            width=-1,
+            size=-1,
+            # pad lines of messages printed as new (unread) messages
+            unread=[],
         )
 
-        # set window timeout for _search_abort()
-        self.win.timeout(0)
-
     def add(self, entry: "LogMessage") -> None:
         """
         Add entry to internal list
@@ -81,79 +107,85 @@ class LogWin(Win):
 
         return log_slice
 
-    def _print_msg(self, msg: str, last: bool = False,
-                   output: bool = True) -> int:
-        """
-        Print a single log message. Handle newlines in the log message and add
-        additional line breaks for parts of the log message that are too long
-        for the log window's pad width.
-        """
-
-        # get size of the pad
-        max_y, max_x = self.pad.getmaxyx()
-
-        # split the message at newlines and handle each line separately
-        num_output = 0
-        lines = msg.split("\n")
-        for index, line in enumerate(lines):
-            first = True
-            while first or line:
-                # always print the first part of a line, even if it's empty.
-                first = False
-                if output:
-                    self.pad.insnstr(max_y - 1, 0, line, max_x)
-                num_output += 1
-
-                # drop all characters we printed from the current line
-                line = line[max_x:]
-                if not line and index == len(lines) - 1 and last:
-                    # if we printed the last part of the last line of the last
-                    # message, do not increase pad size and do not move cursor
-                    break
+    @staticmethod
+    def _get_msg_lines(msg: "LogMessage", width: int) -> List[Tuple[int, int]]:
+        """
+        Get the lines of a log message wrapped at the log window's pad width.
+        The lines are cached in the log message and only recalculated if the
+        width changed, e.g., after a resize.
+        """
+
+        if msg.layout_width != width:
+            msg.layout = get_line_spans(msg.read(mark_read=False), width)
+            msg.layout_width = width
+
+        return msg.layout
+
+    def _get_msg_attr(self, msg: "LogMessage") -> int:
+        """
+        Get colors and attributes for a log message
+        """
+
+        if not msg.own:
+            # message from buddy
+            if msg.is_read:
+                # old message
+                return self.config.attr["log_win_text_peer_old"]
+            # new message
+            return self.config.attr["log_win_text_peer_new"]
+
+        # message from you
+        if msg.is_read:
+            # old message
+            return self.config.attr["log_win_text_self_old"]
+        # new message
+        return self.config.attr["log_win_text_self_new"]
+
+    def _print_msg(self, msg: "LogMessage", pos_y: int, width: int) -> int:
+        """
+        Print a single log message starting at line pos_y of the pad. Newlines
+        in the log message and parts of the log message that are too long for
+        the log window's pad width start a new line. Return the line after the
+        message.
+        """
 
-                # there are more parts of the current line, more lines, or more
-                # messages coming. Increase pad size and move cursor.
-                if not output:
-                    continue
-                max_y += 1
-                self.pad.resize(max_y, max_x)
+        text = msg.read()
+        for start, end in self._get_msg_lines(msg, width):
+            self.pad.insstr(pos_y, 0, text[start:end])
+            pos_y += 1
 
-        self.pad.move(max_y - 1, max_x - 1)
-        return num_output
+        return pos_y
 
     def _print_log(self, props: SimpleNamespace) -> None:
         """
-        dump log messages and resize pad according to new lines added
+        dump log messages and resize pad according to lines of the messages
         """
 
-        # get the current slice of the log and start with a fresh pad size
+        # get the current slice of the log and resize the pad once, so all
+        # lines of the messages fit into it
         log_slice = self._get_log_view(props)
-        self.pad.resize(1, props.pad_size_x)
-
-        for index, msg in enumerate(log_slice):
-            # set colors and attributes for message:
-            if not msg.own:
-                # message from buddy
-                if msg.is_read:
-                    # old message
-                    self.pad.attrset(self.config.attr["log_win_text_peer_old"])
-                else:
-                    # new message
-                    self.pad.attrset(self.config.attr["log_win_text_peer_new"])
-            else:
-                # message from you
-                if msg.is_read:
-                    # old message
-                    self.pad.attrset(self.config.attr["log_win_text_self_old"])
-                else:
-                    # new message
-                    self.pad.attrset(self.config.attr["log_win_text_self_new"])
-
-            # output message
-            if index < len(log_slice) - 1:
-                self._print_msg(msg.read())
-            else:
-                self._print_msg(msg.read(), last=True)
+        num_lines = 0
+        for msg in log_slice:
+            num_lines += len(self._get_msg_lines(msg, props.pad_size_x))
+        max_y, max_x = max(num_lines, 1), props.pad_size_x
+        self.pad.resize(max_y, max_x)
+
+        pos_y = 0
+        self.view.unread = []
+        for msg in log_slice:
+            # set colors and attributes for message and output message
+            if not msg.is_read:
+                self.view.unread.append((pos_y, msg))
+            self.pad.attrset(self._get_msg_attr(msg))
+            pos_y = self._print_msg(msg, pos_y, max_x)
+
+        if log_slice:
+            self.pad.move(max_y - 1, max_x - 1)
+
+        # remember what is in the pad for appending new messages later
+        self.view.end = self.view.cur + len(log_slice)
+        self.view.width = max_x
+        self.view.size = props.win_size_y - props.pad_y_delta
 
     def _get_properties(self) -> SimpleNamespace:
         """
@@ -200,13 +232,11 @@ class LogWin(Win):
         # screen/pad properties
         props = self._get_properties()
 
-        # if window was resized, resize pad size according to new window size
-        if props.pad_size_x != props.win_size_x - props.pad_x_delta:
-            props.pad_size_x = props.win_size_x - props.pad_x_delta
-            self.pad.resize(props.pad_size_y, props.pad_size_x)
+        # if window was resized, use new pad width and reset pad position.
+        # The pad is resized to the new size while printing the log
+        props.pad_size_x = props.win_size_x - props.pad_x_delta
         if props.pad_size_y != props.win_size_y - props.pad_y_delta:
             props.pad_size_y = props.win_size_y - props.pad_y_delta
-            self.pad.resize(props.pad_size_y, props.pad_size_x)
             self.state.pad_y = 0  # reset pad position
 
         # print log
@@ -217,6 +247,161 @@ class LogWin(Win):
         self.state.cur_y, self.state.cur_x = self.pad.getyx()
         self._pad_refresh(props)
 
+    def append_pad(self) -> None:
+        """
+        Print messages added to the end of the log since the last redraw
+        without redrawing the whole log. Fall back to a full redraw if the
+        user is not looking at the end of the log or the window was resized.
+        """
+
+        # if terminal size is invalid, stop here
+        if not self.config.is_terminal_valid():
+            return
+
+        # screen/pad properties
+        props = self._get_properties()
+        width = props.win_size_x - props.pad_x_delta
+        view_size = props.win_size_y - props.pad_y_delta
+
+        # like a full redraw, the pad should only contain the last messages
+        # that fit into the view. Check if the pad contains the first of them
+        start = max(len(self.list) - view_size, 0)
+        if self.view.begin != -1 or \
+           self.view.width != width or \
+           self.view.size != view_size or \
+           not 0 < self.view.end <= len(self.list) or \
+           start > self.view.end:
+            self.redraw_pad()
+            return
+
+        # get lines of messages that are moved out of the pad at the top and
+        # of new messages added at the bottom
+        drop_lines = 0
+        for msg in self.list[self.view.cur:start]:
+            drop_lines += len(self._get_msg_lines(msg, width))
+        new_msgs = self.list[self.view.end:]
+        new_lines = 0
+        for msg in new_msgs:
+            new_lines += len(self._get_msg_lines(msg, width))
+
+        # scroll old messages out of the pad and make room for the new ones
+        max_y, _max_x = self.pad.getmaxyx()
+        if drop_lines:
+            self.pad.scrollok(True)
+            self.pad.scroll(drop_lines)
+            self.pad.scrollok(False)
+        pos_y = max_y - drop_lines
+        self.pad.resize(max(pos_y + new_lines, 1), width)
+
+        # messages printed as new messages before are read now, print them
+        # again with the colors of old messages like a full redraw would
+        for msg_y, msg in self.view.unread:
+            msg_y -= drop_lines
+            if msg_y < 0:
+                continue
+            for line_y in range(msg_y, msg_y + len(
+                    self._get_msg_lines(msg, width))):
+                self.pad.move(line_y, 0)
+                self.pad.clrtoeol()
+            self.pad.attrset(self._get_msg_attr(msg))
+            self._print_msg(msg, msg_y, width)
+
+        # print new messages
+        self.view.unread = []
+        for msg in new_msgs:
+            if not msg.is_read:
+                self.view.unread.append((pos_y, msg))
+            self.pad.attrset(self._get_msg_attr(msg))
+            pos_y = self._print_msg(msg, pos_y, width)
+        if pos_y > 0:
+            self.pad.move(pos_y - 1, width - 1)
+        self.view.cur = start
+        self.view.end = len(self.list)
+
+        # check if visible part of pad needs to be moved and display it
+        self.state.cur_y, self.state.cur_x = self.pad.getyx()
+        self._pad_refresh(props)
+
+    def load_older(self, callback: Optional[Callable[[int], None]] = None,
+                   tstamp: int = -1) -> bool:
+        """
+        Load older messages of the conversation, e.g., from the history file,
+        in the history thread. They are added to the beginning of the log in
+        the main loop, then callback is called with the number of added log
+        entries if the window is still active. If tstamp is given, load at
+        least all messages back to this timestamp. Return False if there are
+        no older messages or older messages are already being loaded.
+        """
+
+        if self.loading or not self.conversation.history.load_older(
+                functools.partial(self._add_loaded, callback), tstamp):
+            return False
+
+        self.loading = True
+        if self.state.active:
+            self._show_status("loading older messages...")
+        return True
+
+    def _add_loaded(self, callback: Optional[Callable[[int], None]],
+                    count: int) -> None:
+        """
+        Update positions in the log after count older log entries were loaded
+        and pass count to callback
+        """
+
+        self.loading = False
+        if count:
+            self.add_older(count)
+        self._clear_status()
+        if not self.state.active:
+            # user left the window, drop pending search step
+            self.search_loading = False
+            return
+        if callback:
+            callback(count)
+
+    def add_older(self, count: int) -> None:
+        """
+        Update positions in the log after count log entries were added to
+        the beginning of the log
+        """
+
+        # messages in the log moved, update positions
+        logger.debug("added %d older log entries", count)
+        self.view.cur += count
+        self.view.end += count
+        if self.view.begin != -1:
+            self.view.begin += count
+        urls = [(index, pos) for index in range(count)
+                for pos in self.list[index].get_urls()]
+        self.url_index = urls + [(index + count, pos)
+                                 for index, pos in self.url_index]
+        self.url_index_end += count
+        self.url_cur += len(urls)
+
+    def remove_older(self, count: int) -> None:
+        """
+        Update positions in the log after count log entries were removed from
+        the beginning of the log
+        """
+
+        # messages in the log moved, update positions
+        logger.debug("removed %d older log entries", count)
+        if self.view.cur != -1:
+            self.view.cur = max(self.view.cur - count, 0)
+        self.view.end = max(self.view.end - count, 0)
+        if self.view.begin != -1:
+            self.view.begin = max(self.view.begin - count, 0)
+        removed = 0
+        while removed < len(self.url_index) and \
+                self.url_index[removed][0] < count:
+            removed += 1
+        self.url_index = [(index - count, pos)
+                          for index, pos in self.url_index[removed:]]
+        self.url_index_end = max(self.url_index_end - count, 0)
+        if self.url_cur != -1:
+            self.url_cur = max(self.url_cur - removed, 0)
+
     def _cursor_top(self, *args: Any) -> None:
         # jump to first line in log
         logger.debug("move cursor to top of log")
@@ -262,27 +447,54 @@ class LogWin(Win):
             self.state.cur_x = 0
         else:
             # we need to get more messages
-            while self.view.cur > 0:
-                self.view.begin = self.view.cur - 1
+            self._move_view_up(lines_left, props)
+            return
 
-                # get next message and see if we have enough lines
-                log_slice = self._get_log_view(props)
-                num_lines = self._print_msg(log_slice[0].read(), output=False)
-                lines_left -= num_lines
-                if lines_left <= 0:
-                    # we got all missing lines
-                    break
+        # move cursor up to previously determined position
+        self.pad.move(self.state.cur_y, self.state.cur_x)
+        props = self._get_properties()
+        self._pad_refresh(props)
 
-            # show updated log_view in pad and set cursor position
-            self.redraw_pad()
-            self.state.cur_y = max(0, 0 - lines_left)
-            self.state.cur_x = 0
+    def _move_view_up(self, lines_left: int, props: SimpleNamespace) -> None:
+        """
+        Move view up by lines_left lines and the cursor to the top of the
+        view. If the view reaches the top of the log, load older messages and
+        move the view further up when they are added.
+        """
 
-        # move cursor up to previously determined position
+        while self.view.cur > 0:
+            self.view.begin = self.view.cur - 1
+
+            # get next message and see if we have enough lines
+            log_slice = self._get_log_view(props)
+            num_lines = len(self._get_msg_lines(
+                log_slice[0], props.win_size_x - props.pad_x_delta))
+            lines_left -= num_lines
+            if lines_left <= 0:
+                # we got all missing lines
+                break
+
+        # show updated log_view in pad and set cursor position
+        self.redraw_pad()
+        self.state.cur_y = max(0, 0 - lines_left)
+        self.state.cur_x = 0
         self.pad.move(self.state.cur_y, self.state.cur_x)
         props = self._get_properties()
         self._pad_refresh(props)
 
+        if lines_left > 0:
+            self.load_older(functools.partial(self._move_view_up_loaded,
+                                              lines_left))
+
+    def _move_view_up_loaded(self, lines_left: int, count: int) -> None:
+        """
+        Continue moving view up by lines_left lines after count older log
+        entries were loaded, if the cursor is still at the top of the log
+        """
+
+        if count and self.view.cur == count and self.pad.getyx()[0] == 0:
+            self._move_view_up(lines_left, self._get_properties())
+
     def _cursor_page_down(self, *args: Any) -> None:
         # move cursor down one page until last entry in log
         logger.debug("move cursor down one page")
@@ -303,7 +515,8 @@ class LogWin(Win):
 
                 # get next message and see if we have enough lines
                 log_slice = self._get_log_view(props)
-                num_lines = self._print_msg(log_slice[-1].read(), output=False)
+                num_lines = len(self._get_msg_lines(
+                    log_slice[-1], props.win_size_x - props.pad_x_delta))
                 lines_left -= num_lines
                 if lines_left <= 0:
                     # we got all missing lines
@@ -328,6 +541,11 @@ class LogWin(Win):
             # inside current view, simply move cursor up
             self.state.cur_y, self.state.cur_x = self.state.cur_y - 1, 0
 
+        elif self.view.cur == 0:
+            # at top of the log, load older messages and move up when they
+            # are added
+            self.load_older(self._cursor_up_loaded)
+
         elif self.view.cur > 0:
             # at top of current view, move view up
             self.view.begin = self.view.cur - 1
@@ -335,7 +553,8 @@ class LogWin(Win):
             # if the previous message is multi line, only go to last line
             props = self._get_properties()
             log_slice = self._get_log_view(props)
-            num_lines = self._print_msg(log_slice[0].read(), output=False)
+            num_lines = len(self._get_msg_lines(
+                log_slice[0], props.win_size_x - props.pad_x_delta))
             self.redraw_pad()
             self.state.cur_y, self.state.cur_x = num_lines - 1, 0
 
@@ -344,6 +563,16 @@ class LogWin(Win):
         props = self._get_properties()
         self._pad_refresh(props)
 
+    def _cursor_up_loaded(self, count: int) -> None:
+        """
+        Move cursor up after count older log entries were loaded, if the
+        cursor is still at the top of the log
+        """
+
+        if count and self.view.cur == count and self.pad.getyx()[0] == 0:
+            self.state.cur_y, self.state.cur_x = 0, 0
+            self._cursor_up()
+
     def _cursor_down(self, *args: Any) -> None:
         # move cursor down until end of list
         logger.debug("move cursor down")
@@ -362,7 +591,8 @@ class LogWin(Win):
             # if the next message is multi line, only go to first line
             props = self._get_properties()
             log_slice = self._get_log_view(props)
-            num_lines = self._print_msg(log_slice[-1].read(), output=False)
+            num_lines = len(self._get_msg_lines(
+                log_slice[-1], props.win_size_x - props.pad_x_delta))
             self.redraw_pad()
             self.state.pad_y = 0    # make sure we only show up to first line
             self.state.cur_y, self.state.cur_x = \
@@ -490,6 +720,7 @@ class LogWin(Win):
         logger.debug("starting search for %s", self.search_text)
         self.search_input = ""
         self._process_search_input_show()
+        self.set_search(self.search_text)
         self._search_next()
 
     def _process_search_input_abort(self) -> None:
@@ -501,134 +732,374 @@ class LogWin(Win):
         self.search_input = ""
         self._process_search_input_show()
 
-    def _search_abort(self) -> bool:
+    def set_search(self, text: str, regex: bool = None) -> None:
+        """
+        Set text to search for and create matcher used by search functions.
+        Depending on the window settings, text is a regular expression and
+        the search ignores case.
+        """
+
+        if regex is None:
+            regex = self.config.settings["search_regex"]
+        flags = 0
+        if self.config.settings["search_ignore_case"]:
+            flags = re.IGNORECASE
+
+        self.search_text = text
+        self.search_matcher = None
+        self.search_urls = False
+        if not text:
+            return
+        if regex:
+            try:
+                self.search_matcher = re.compile(text, flags)
+                return
+            except re.error:
+                logger.debug("invalid regular expression %s, searching for "
+                             "plain text", text)
+        self.search_matcher = re.compile(re.escape(text), flags)
+
+    def _get_cursor_msg_pos(self) -> Tuple[int, int]:
+        """
+        Get index of the log message and position in the formatted message
+        at the current cursor position
+        """
+
+        width = self.pad.getmaxyx()[1]
+        line = self.state.cur_y
+        for index in range(self.view.cur, self.view.end):
+            msg = self.list[index]
+            lines = self._get_msg_lines(msg, width)
+            if line < len(lines):
+                start, end = lines[line]
+                pos = get_char_index(msg.read(mark_read=False), start, end,
+                                     self.state.cur_x)
+                return index, pos
+            line -= len(lines)
+
+        # cursor is not on a message, e.g., empty log
+        return len(self.list) - 1, -1
+
+    def _show_msg_pos(self, index: int, pos: int) -> None:
         """
-        Check if ongoing search should be aborted
+        Move the cursor to position pos of the formatted log message at index.
+        Only redraw the pad if the message is not already in it.
+        """
+
+        props = self._get_properties()
+        view_size = props.win_size_y - props.pad_y_delta
+        if not self.view.cur <= index < self.view.end:
+            # show message at the top of the view but do not move view past
+            # the end of the log
+            self.view.begin = min(index, max(len(self.list) - view_size, 0))
+            self.redraw_pad()
+
+        # find line and column of position in the pad
+        width = self.pad.getmaxyx()[1]
+        cur_y = 0
+        for msg in self.list[self.view.cur:index]:
+            cur_y += len(self._get_msg_lines(msg, width))
+        msg = self.list[index]
+        text = msg.read(mark_read=False)
+        for start, end in self._get_msg_lines(msg, width):
+            if pos < end or end == len(text):
+                self.state.cur_x = get_cell_offset(text, start, pos)
+                break
+            cur_y += 1
+        self.state.cur_y = cur_y
+
+        self.pad.move(self.state.cur_y, self.state.cur_x)
+        self._pad_refresh(props)
+
+    def _find_msg_match(self, index: int, pos: int,
+                        forward: bool) -> Optional[Tuple[int, int]]:
+        """
+        Find next match of the search matcher in the log messages starting at
+        position pos of the message at index. Search backwards to the first
+        message or forward to the last message. Return index of the message
+        and position of the match in the formatted message.
+        """
+
+        assert self.search_matcher
+        search = self.search_matcher.search
+        step = 1 if forward else -1
+        while 0 <= index < len(self.list):
+            # only look at all matches in messages that contain the text
+            msg = self.list[index]
+            text = msg.formatted or msg.read(mark_read=False)
+            if search(text):
+                found = -1
+                for match in self.search_matcher.finditer(text):
+                    if match.end() == match.start():
+                        continue
+                    if forward and match.start() > pos:
+                        return index, match.start()
+                    if not forward:
+                        if pos != -1 and match.start() >= pos:
+                            break
+                        found = match.start()
+                if found != -1:
+                    return index, found
+
+            # keep searching in next/previous message
+            index += step
+            pos = -1
+
+        return None
+
+    def show_msg(self, index: int) -> None:
+        """
+        Move view and cursor to the log message at index
+        """
+
+        logger.debug("showing log message %d", index)
+        self._show_msg_pos(index, 0)
+
+    def _search_abort(self, char: str) -> bool:
+        """
+        Check if user input char aborts the search step that is waiting for
+        older messages
         """
 
         keybinds = {
             "KEY_ESC": "GO_BACK",
         }
         keyfunc = {
-            "GO_BACK":      self._process_search_input_abort,
+            "GO_BACK":      self._search_abort_loading,
         }
-        try:
-            char = self.win.get_wch()
-            if self.handle_keybinds(
-                    char, keybinds=keybinds, keyfunc=keyfunc):
-                return True
-        except curses.error:
-            pass
-        return False
+        return self.handle_keybinds(char, keybinds=keybinds, keyfunc=keyfunc)
+
+    def _search_abort_loading(self) -> None:
+        """
+        Abort search step that is waiting for older messages
+        """
+
+        logger.debug("aborting search in older messages")
+        self.search_loading = False
+        self._show_status("search aborted")
+
+    def _show_status(self, text: str) -> None:
+        """
+        Show status, e.g., of the search, in the window border like the search
+        input
+        """
+
+        max_y, max_x = self.win.getmaxyx()
+        show = text.ljust(max_x - 4, " ")
+        self.win.addnstr(max_y - 1, 2, show, max_x - 4)
+        self.win.refresh()
+        self.status_shown = True
+
+    def _clear_status(self) -> None:
+        """
+        Remove status from the window border, keep the pad and cursor
+        """
+
+        if not self.status_shown:
+            return
+        self.status_shown = False
+        if self.state.visible:
+            self._redraw_win()
+            self._pad_refresh(self._get_properties())
+
+    def _search_older(self, callback: Callable[[int, int], None],
+                      pages: int) -> bool:
+        """
+        Continue search step in older messages: load older messages and pass
+        the number of pages loaded by the search step and the number of added
+        log entries to callback. Return False if there are no older messages.
+        """
+
+        if not self.load_older(functools.partial(self._search_loaded,
+                                                 callback, pages + 1)):
+            return False
+        self.search_loading = True
+        return True
+
+    def _search_loaded(self, callback: Callable[[int, int], None],
+                       pages: int, count: int) -> None:
+        """
+        Pass number of pages and added log entries to callback, unless the
+        search step was aborted
+        """
+
+        if not self.search_loading:
+            return
+        self.search_loading = False
+        callback(pages, count)
 
     def _search_next(self, *args: Any) -> None:
         """
         Search for next match
         """
 
-        # skip this if we are not in search mode
-        if self.search_text == "":
+        self._clear_status()
+
+        # in url search mode, jump to next url
+        if self.search_urls:
+            self._search_url_next()
             return
 
-        # init
-        props = self._get_properties()
+        # skip this if we are not in search mode or still loading older
+        # messages
+        if not self.search_matcher or not self.list or self.loading:
+            return
 
-        # search views for text until first view
-        while self.view.cur >= 0 and not self._search_abort():
-            # search current view for text until first line
-            while self.state.cur_y >= 0:
-                _cur_text = self.pad.instr(self.state.cur_y, 0)
-                cur_text = _cur_text.decode()   # type: ignore
-                cur_text = cur_text[:self.state.cur_x]
-                index = cur_text.rfind(self.search_text)
-                if index != -1:
-                    # found it, stop here
-                    self.pad.move(self.state.cur_y, index)
-                    self.state.cur_y, self.state.cur_x = self.pad.getyx()
-
-                    self._pad_refresh(props)
-                    return
-
-                # keep searching in next line
-                self.state.cur_y -= 1
-                self.state.cur_x = props.pad_size_x
-
-            # reached end of view, move view further up
-            if self.view.cur == 0:
-                # reached top already
-                break
-            self._cursor_up()
-            self.state.cur_x = self.pad.getmaxyx()[1] - 1
+        # search log messages for text, starting at the current cursor
+        # position, until first message
+        index, pos = self._get_cursor_msg_pos()
+        found = self._find_msg_match(index, pos, forward=False)
+        if found:
+            self._show_msg_pos(*found)
+            return
 
-        # make sure current cursor position is visible even if nothing found
-        self._pad_refresh(props)
+        # continue search in older messages, if there are any
+        if not self._search_older(self._search_next_loaded, 0):
+            logger.debug("no next match for %s found", self.search_text)
+            self._show_status("no more matches")
 
-    def search_next(self) -> None:
+    def _search_next_loaded(self, pages: int, count: int) -> None:
         """
-        Helper for calling search from other windows
+        Continue search for next match in count older log entries loaded by
+        the page-th page of the search step
         """
 
-        # make sure we find something on the current line
-        logger.debug("searching for next match")
-        self.state.cur_x = self.pad.getmaxyx()[1]
-        self._search_next()
+        found = None
+        if count:
+            found = self._find_msg_match(count - 1, -1, forward=False)
+        if found:
+            self._show_msg_pos(*found)
+            return
+
+        if count and pages == SEARCH_MAX_PAGES:
+            # stop at the oldest loaded message, searching again continues
+            # from there
+            logger.debug("no next match for %s found in %d pages",
+                         self.search_text, pages)
+            self.show_msg(0)
+            self._show_status("no match yet, search again to search older "
+                              "messages")
+            return
+
+        if not count or not self._search_older(self._search_next_loaded,
+                                               pages):
+            logger.debug("no next match for %s found", self.search_text)
+            self._show_status("no more matches")
+
+    def _update_url_index(self) -> None:
+        """
+        Add URLs in log messages added since the last update to the URL index
+        """
+
+        if len(self.list) < self.url_index_end:
+            # log got shorter, rebuild index
+            self.reset_url_index()
+
+        for index in range(self.url_index_end, len(self.list)):
+            for pos in self.list[index].get_urls():
+                self.url_index.append((index, pos))
+        self.url_index_end = len(self.list)
+
+    def reset_url_index(self) -> None:
+        """
+        Reset URL index, e.g., if messages in the log moved
+        """
+
+        self.url_index = []
+        self.url_index_end = 0
+        self.url_cur = -1
+
+    def _search_url_next(self) -> None:
+        """
+        Jump to next (older) URL in the log
+        """
+
+        self._update_url_index()
+        if self.url_cur > 0:
+            self.url_cur -= 1
+            self._show_msg_pos(*self.url_index[self.url_cur])
+            return
+
+        # load older messages and look for urls in them
+        if self.loading:
+            return
+        if self.url_cur != 0 or \
+           not self._search_older(self._search_url_next_loaded, 0):
+            self._show_status("no more URLs")
+
+    def _search_url_next_loaded(self, pages: int, count: int) -> None:
+        """
+        Continue jump to next (older) URL after count older log entries were
+        loaded by the page-th page of the search step
+        """
+
+        if count and self.url_cur > 0:
+            self.url_cur -= 1
+            self._show_msg_pos(*self.url_index[self.url_cur])
+            return
+
+        if count and pages == SEARCH_MAX_PAGES:
+            # stop at the oldest loaded message, searching again continues
+            # from there
+            self.show_msg(0)
+            self._show_status("no URL yet, search again to search older "
+                              "messages")
+            return
+
+        if not count or self.url_cur != 0 or \
+           not self._search_older(self._search_url_next_loaded, pages):
+            self._show_status("no more URLs")
+
+    def _search_url_prev(self) -> None:
+        """
+        Jump to previous (newer) URL in the log
+        """
+
+        self._update_url_index()
+        if self.url_cur < len(self.url_index) - 1:
+            self.url_cur += 1
+            self._show_msg_pos(*self.url_index[self.url_cur])
+
+    def search_url(self) -> None:
+        """
+        Helper for jumping to the last URL in the log from other windows.
+        Following searches jump through the other URLs.
+        """
+
+        logger.debug("searching for last url")
+        self._clear_status()
+        self.search_urls = True
+        self._update_url_index()
+        self.url_cur = len(self.url_index)
+        self._search_url_next()
 
     def _search_prev(self, *args: Any) -> None:
         """
         Search for previous match
         """
 
+        self._clear_status()
+
+        # in url search mode, jump to previous url
+        if self.search_urls:
+            self._search_url_prev()
+            return
+
         # skip this if we are not in search mode
-        if self.search_text == "":
+        if not self.search_matcher or not self.list:
             return
 
         logger.debug("searching for previous match")
 
-        # init
-        props = self._get_properties()
-        view_size = props.win_size_y - props.pad_y_delta
-
-        # if we are already on a match, skip it
-        _cur_text = self.pad.instr(self.state.cur_y, 0)
-        cur_text = _cur_text.decode()   # type: ignore
-        cur_text = cur_text[self.state.cur_x:]
-        cur_text = cur_text[:len(self.search_text)]
-        if cur_text == self.search_text:
-            self.state.cur_x += len(self.search_text)
-
-        # search views for text until last view
-        while (self.view.cur <= max(0, len(self.list) - view_size) and
-               not self._search_abort()):
-            # search current view for text until end of view
-            while self.state.cur_y <= self.pad.getmaxyx()[0]:
-                _cur_text = self.pad.instr(self.state.cur_y, 0)
-                cur_text = _cur_text.decode()   # type: ignore
-                cur_text = cur_text[self.state.cur_x:]
-                index = cur_text.find(self.search_text)
-
-                # found it, stop here
-                if index != -1:
-                    self.pad.move(self.state.cur_y, self.state.cur_x + index)
-                    self.state.cur_y, self.state.cur_x = self.pad.getyx()
-
-                    self._pad_refresh(props)
-                    return
-
-                # keep searching
-                self.state.cur_y += 1
-                self.state.cur_x = 0    # set it to first position in line
-
-            # reached end of view, move view further down
-            if self.view.cur == max(0, len(self.list) - view_size):
-                # reached bottom already
-                pad_size_y, pad_size_x = self.pad.getmaxyx()
-                self.pad.move(pad_size_y - 1, pad_size_x - 1)
-                self.state.cur_y, self.state.cur_x = self.pad.getyx()
-                break
-            self._cursor_down()
+        # search log messages for text, starting after the current cursor
+        # position, until last message
+        index, pos = self._get_cursor_msg_pos()
+        found = self._find_msg_match(index, pos, forward=True)
+        if found:
+            self._show_msg_pos(*found)
+            return
 
-        # make sure current cursor position is visible even if nothing found
-        self._pad_refresh(props)
+        logger.debug("no previous match for %s found", self.search_text)
 
     def process_input(self, char: str) -> None:
         """
@@ -637,6 +1108,10 @@ class LogWin(Win):
 
         self.state.cur_y, self.state.cur_x = self.pad.getyx()
 
+        # check if user aborts search step waiting for older messages
+        if self.search_loading and self._search_abort(char):
+            return
+
         # check if we are in search input mode
         if self.search_input:
             # search input: look for special key mapping or process as text
@@ -4,6 +4,8 @@ Nuqql UI Windows
 
 import curses
 import logging
+import re
+import unicodedata
 
 from types import SimpleNamespace
 from typing import TYPE_CHECKING, Any, Callable, Dict, List, Tuple
@@ -18,6 +20,98 @@ MAIN_WINS: Dict[str, Any] = {}
 
 logger = logging.getLogger(__name__)
 
+# characters that might not use exactly one cell on the terminal
+_SPECIAL_WIDTH_CHARS = re.compile("[\u0300-\U0010ffff]")
+
+
+def _get_key(char: Any) -> Any:
+    """
+    Get key code of input character
+    """
+
+    try:
+        return ord(char)
+    except (TypeError, ValueError):
+        return char
+
+
+def _get_char_width(char: str) -> int:
+    """
+    Get the number of terminal cells used by a character
+    """
+
+    # combining and format characters, e.g., accents or zero width joiners
+    if unicodedata.category(char) in ("Mn", "Me", "Cf"):
+        return 0
+
+    # wide and full width characters, e.g., East Asian characters or emoji
+    if unicodedata.east_asian_width(char) in ("W", "F"):
+        return 2
+
+    return 1
+
+
+def get_line_spans(text: str, width: int) -> List[Tuple[int, int]]:
+    """
+    Split text at newlines and wrap lines that do not fit into width terminal
+    cells. Return start and end index in text of every resulting line.
+    """
+
+    spans = []
+    line_start = 0
+    for line in text.split("\n"):
+        line_end = line_start + len(line)
+        span_start = line_start
+        if not _SPECIAL_WIDTH_CHARS.search(line):
+            # every character uses exactly one cell, just cut the line. Always
+            # add the first part of a line, even if it's empty.
+            while True:
+                span_end = min(span_start + width, line_end)
+                spans.append((span_start, span_end))
+                if span_end == line_end:
+                    break
+                span_start = span_end
+        else:
+            # check width of every character and wrap line if necessary
+            cells = 0
+            for index, char in enumerate(line, line_start):
+                char_width = _get_char_width(char)
+                if cells + char_width > width and index > span_start:
+                    spans.append((span_start, index))
+                    span_start, cells = index, 0
+                cells += char_width
+            spans.append((span_start, line_end))
+
+        # skip newline character
+        line_start = line_end + 1
+
+    return spans
+
+
+def get_char_index(text: str, start: int, end: int, cells: int) -> int:
+    """
+    Get the index of the character in text[start:end] that is shown at the
+    terminal cell with offset cells from start
+    """
+
+    for index in range(start, end):
+        cells -= _get_char_width(text[index])
+        if cells < 0:
+            return index
+    return end
+
+
+def get_cell_offset(text: str, start: int, index: int) -> int:
+    """
+    Get the number of terminal cells used by the characters in
+    text[start:index]
+    """
+
+    line = text[start:index]
+    if not _SPECIAL_WIDTH_CHARS.search(line):
+        return len(line)
+    return sum(_get_char_width(char) for char in line)
+
 
 class Win:
     """
@@ -426,6 +520,18 @@ class Win:
 
         # implemented in sub classes
 
+    def is_keybind(self, char: Any, keybinds: Dict[str, str] = None) -> bool:
+        """
+        Check if char is a special key with a key binding
+        """
+
+        if not keybinds:
+            keybinds = self.config.keybinds
+
+        cint = _get_key(char)
+        return cint in self.config.keymap and \
+            self.config.keymap[cint] in keybinds
+
     def handle_keybinds(self, *args: Any, keybinds: Dict[str, str] = None,
                         keyfunc: Dict[str, Callable] = None) -> bool:
         """
@@ -442,12 +548,8 @@ class Win:
             keyfunc = self.keyfunc
 
         # look for special key mappings in keymap
-        try:
-            cint = ord(char)
-        except (TypeError, ValueError):
-            cint = char
-        if cint in self.config.keymap and \
-           self.config.keymap[cint] in keybinds:
+        if self.is_keybind(char, keybinds):
+            cint = _get_key(char)
             logger.debug("handling keybind %d", cint)
             func = keyfunc[keybinds[self.config.keymap[cint]]]
             func(*args[1:])     # call function with remaining arguments
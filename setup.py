@@ -58,7 +58,8 @@ setup(
     packages=find_packages(include=["nuqql", "nuqql.*"]),
     entry_points={
         "console_scripts": ["nuqql = nuqql.main:run",
-                            "nuqql-keys = nuqql.tools.nuqql_keys:main"]
+                            "nuqql-keys = nuqql.tools.nuqql_keys:main",
+                            "nuqql-history = nuqql.tools.nuqql_history:main"]
     },
     classifiers=CLASSIFIERS,
     python_requires='>=3.6',